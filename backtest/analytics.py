@@ -0,0 +1,200 @@
+"""
+绩效分析
+
+全部基于 NumPy 数组计算，不逐点循环：
+- 权益指标（收益、Sharpe、Sortino、Calmar、最大回撤及持续期、敞口、滚动 Sharpe）
+  支持一维单条曲线，也支持二维 (曲线数, 时点数) 一次批量计算（如参数扫描的全部资金曲线）
+- 成交指标（胜率、盈亏比、平均持仓时间、换手率）基于成交数组，只在成交点上循环
+
+返回数值结果；format_metrics 另外生成用于打印/报表的格式化视图。
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from backtest.vectorized import trade_states
+
+# 格式化时按百分比显示的指标
+PERCENT_METRICS = ("total_return", "annual_return", "max_drawdown", "win_rate", "exposure")
+
+
+def _returns(equity: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return equity[..., 1:] / equity[..., :-1] - 1
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """逐点回撤 (peak - equity) / peak"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return (peak - equity) / peak
+
+
+def max_drawdown_duration(equity: np.ndarray, peak: np.ndarray | None = None) -> np.ndarray:
+    """
+    最长的水下持续期（两次创新高之间的时点数）。
+    在每行末尾补一个"新高"标记后，相邻新高标记的最大间隔减一即为持续期，按行用 reduceat 取最大值。
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if peak is None:
+        peak = np.maximum.accumulate(equity, axis=-1)
+    rows = equity.reshape(-1, equity.shape[-1])
+    n = rows.shape[1]
+    flags = np.ones((rows.shape[0], n + 1), dtype=bool)
+    np.greater_equal(rows, peak.reshape(rows.shape), out=flags[:, :n])
+    position = np.flatnonzero(flags)
+    gaps = np.diff(position)
+    starts = np.searchsorted(position[:-1] // (n + 1), np.arange(rows.shape[0]))
+    duration = np.maximum.reduceat(gaps, starts) - 1
+    return duration.reshape(equity.shape[:-1])
+
+
+def rolling_sharpe(equity: np.ndarray, window: int, risk_free: float = 0.02, annual_days: int = 240) -> np.ndarray:
+    """
+    滚动 Sharpe，用累加和计算滚动均值和方差，结果与收益序列等长，前 window-1 个为 NaN
+    """
+    returns = _returns(np.asarray(equity, dtype=np.float64))
+    n = returns.shape[-1]
+    out = np.full(returns.shape, np.nan)
+    if window < 2 or n < window:
+        return out
+    pad = np.zeros(returns.shape[:-1] + (1,))
+    s1 = np.concatenate([pad, np.cumsum(returns, axis=-1)], axis=-1)
+    s2 = np.concatenate([pad, np.cumsum(returns ** 2, axis=-1)], axis=-1)
+    total = s1[..., window:] - s1[..., :-window]
+    total_sq = s2[..., window:] - s2[..., :-window]
+    mean = total / window
+    var = np.maximum(total_sq - total * mean, 0) / (window - 1)
+    out[..., window - 1:] = (mean - risk_free / annual_days) / (np.sqrt(var) + 1e-9) * np.sqrt(annual_days)
+    return out
+
+
+def equity_metrics(equity: np.ndarray, initial_cash: float, risk_free: float = 0.02, annual_days: int = 240,
+                   margin: np.ndarray | None = None) -> dict:
+    """
+    :param equity: 一维 (时点数,) 或二维 (曲线数, 时点数) 的权益
+    :param margin: 与 equity 同形状的占用保证金，用来计算敞口（有持仓的时点占比）
+    :return: {指标: 标量或 (曲线数,) 数组}
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.shape[-1] < 2:
+        # 不足两个时点没有收益序列，全部指标为 NaN
+        nan = np.full(equity.shape[:-1], np.nan)
+        keys = ("total_return", "annual_return", "sharpe", "sortino", "max_drawdown", "max_drawdown_duration",
+                "calmar", "volatility") + (("exposure",) if margin is not None else ())
+        return {key: nan.item() if equity.ndim == 1 else nan.copy() for key in keys}
+    returns = _returns(equity)
+    rf = risk_free / annual_days
+    # 短而高频的曲线年化时 (1 + mean) ** annual_days 可能溢出为 inf
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        mean = returns.mean(axis=-1)
+        # 两遍法方差，复用同一块临时内存计算下行偏差
+        buffer = returns - mean[..., None]
+        std = np.sqrt(np.einsum("...i,...i->...", buffer, buffer) / (returns.shape[-1] - 1))
+        np.subtract(returns, rf, out=buffer)
+        np.minimum(buffer, 0, out=buffer)
+        downside = np.sqrt(np.einsum("...i,...i->...", buffer, buffer) / returns.shape[-1])
+        del buffer
+        annual_return = (1 + mean) ** annual_days - 1
+        peak = np.maximum.accumulate(equity, axis=-1)
+        max_dd = 1 - (equity / peak).min(axis=-1)
+        metrics = {
+            "total_return": equity[..., -1] / initial_cash - 1,
+            "annual_return": annual_return,
+            "sharpe": (mean - rf) / (std + 1e-9) * np.sqrt(annual_days),
+            "sortino": (mean - rf) / (downside + 1e-9) * np.sqrt(annual_days),
+            "max_drawdown": max_dd,
+            "max_drawdown_duration": max_drawdown_duration(equity, peak),
+            "calmar": np.where(max_dd > 0, annual_return / max_dd, np.nan),
+            "volatility": std * np.sqrt(annual_days),
+        }
+    if margin is not None:
+        metrics["exposure"] = (np.asarray(margin) > 0).mean(axis=-1)
+    if equity.ndim == 1:
+        metrics = {key: np.asarray(value).item() for key, value in metrics.items()}
+    return metrics
+
+
+def trade_metrics(symbol: np.ndarray, datetime: np.ndarray, volume: np.ndarray, price: np.ndarray,
+                  sizes: dict[str, float] | None = None, mean_equity: float | None = None) -> dict:
+    """
+    :param symbol/datetime/price: 逐笔成交，datetime 为 int64 纳秒，按时间升序
+    :param volume: 带方向的成交量（买正卖负）
+    :param sizes: {symbol: 合约乘数}
+    :param mean_equity: 平均权益，用于计算换手率（成交额 / 平均权益）
+    胜率、盈亏比按平仓成交（含部分平仓）的已实现盈亏（不含手续费，与 oms 的 realized_pnl 一致）统计；
+    持仓时间为每笔平仓成交与最近一次开仓之间的时长
+    """
+    sizes = sizes or {}
+    symbol = np.asarray(symbol)
+    datetime = np.asarray(datetime, dtype=np.int64)
+    volume = np.asarray(volume, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+
+    pnl_parts = []
+    holding_parts = []
+    notional = 0.0
+    for name in np.unique(symbol):
+        idx = np.flatnonzero(symbol == name)
+        size = sizes.get(name, 1)
+        state = trade_states(volume[idx], price[idx], size, 0, 0, 0)
+        notional += float((np.abs(volume[idx]) * price[idx]).sum() * size)
+
+        after = state["volume"]
+        before = np.r_[0.0, after[:-1]]
+        # 减少持仓的成交都算平仓（部分平仓、全平、反手）
+        closes = (before != 0) & ((np.sign(after) != np.sign(before)) | (np.abs(after) < np.abs(before)))
+        opens = (after != 0) & (np.sign(after) != np.sign(before))
+        pnl_parts.append(np.diff(state["realized_pnl"], prepend=0.0)[closes])
+
+        # 每次平仓对应最近一次开仓
+        position = np.arange(len(idx))
+        last_open = np.maximum.accumulate(np.where(opens, position, 0))
+        close_at = np.flatnonzero(closes)
+        holding_parts.append(datetime[idx][close_at] - datetime[idx][last_open[close_at - 1]])
+
+    pnl = np.concatenate(pnl_parts) if pnl_parts else np.zeros(0)
+    holding = np.concatenate(holding_parts) if holding_parts else np.zeros(0, dtype=np.int64)
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    return {
+        "trade_count": int(len(volume)),
+        "round_trips": int(len(pnl)),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else np.nan,
+        "profit_factor": float(gross_profit / gross_loss) if gross_loss > 0 else np.nan,
+        "avg_holding_seconds": float(holding.mean() / 1e9) if len(holding) else np.nan,
+        "turnover": notional / mean_equity if mean_equity else np.nan,
+    }
+
+
+def analyze(equity: np.ndarray, initial_cash: float, risk_free: float = 0.02, annual_days: int = 240,
+            margin: np.ndarray | None = None, trades: dict[str, np.ndarray] | None = None,
+            sizes: dict[str, float] | None = None, rolling_window: int | None = None) -> dict:
+    """
+    单条资金曲线的完整指标
+    :param trades: {"symbol","datetime","volume","price"} 成交数组，见 trade_metrics
+    :param rolling_window: 给定时额外返回 rolling_sharpe 数组
+    """
+    metrics = equity_metrics(equity, initial_cash, risk_free, annual_days, margin)
+    if trades is not None:
+        metrics.update(trade_metrics(trades["symbol"], trades["datetime"], trades["volume"], trades["price"],
+                                     sizes=sizes, mean_equity=float(np.mean(equity))))
+    if rolling_window is not None:
+        metrics["rolling_sharpe"] = rolling_sharpe(equity, rolling_window, risk_free, annual_days)
+    return metrics
+
+
+def format_metrics(metrics: dict) -> dict:
+    """格式化视图：比例显示为百分比字符串，持仓时间显示为时长，数组指标不输出"""
+    view = {}
+    for key, value in metrics.items():
+        if isinstance(value, np.ndarray):
+            continue
+        if key in PERCENT_METRICS:
+            view[key] = f"{value * 100:.2f}%"
+        elif key == "avg_holding_seconds":
+            view["avg_holding_time"] = str(pd.Timedelta(seconds=value)) if np.isfinite(value) else "nan"
+        else:
+            view[key] = value
+    return view
@@ -1,5 +1,9 @@
+import copy
+from datetime import timedelta
+import os
+import pickle
+import time
 import warnings
-from copy import deepcopy
 from pyecharts.globals import ThemeType
 from pyecharts.charts import Kline, Line, Bar, Grid, Tab, Page
 from pyecharts import options as opts
@@ -18,10 +22,34 @@ from coreutils.constant import Interval, Direction, OrderType, OrderStatus, LogL
 from backtest.backtest_gateway import BacktestGateway
 from backtest.backtest_oms_engine import BacktestOms
 from plotting.kline_dashboard import ChartManager, create_bar, create_line, create_kline, create_table
+from plotting.downsample import aggregate_bars, downsample_index, truncate_rows
+from plotting.lazy_html import render_lazy
 from engine.event_engine import (Event, EVENT_ORDER, EVENT_TRADE, EVENT_POSITION,
                                  EVENT_ORDER_REQ, EVENT_CANCEL_REQ, EVENT_MODIFY_REQ, EVENT_LOG, EVENT_BAR)
 from coreutils.logger import get_logger
 from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.bar_store import BarStore, peak_rss_mb
+from backtest.bar_stream import BarStream
+from backtest.tick_store import TickStore
+from backtest.intrabar import IntrabarPath, PathModel
+from backtest.scheduler import LatencyModel, SimScheduler
+from backtest.vectorized import simulate_targets
+from backtest.recorder import BacktestRecorder
+from backtest.log_sink import BacktestLogSink
+from backtest.analytics import analyze, format_metrics
+from backtest.robustness import monte_carlo
+
+# 检查点格式版本，字段变化时递增
+CHECKPOINT_VERSION = 2
+
+# 延迟消息类型（SimScheduler.handlers 的下标）和通道
+_MSG_SEND, _MSG_CANCEL, _MSG_MODIFY, _MSG_ORDER, _MSG_TRADE, _MSG_POSITION = range(6)
+_REQUEST, _REPORT = 0, 1
+
+
+def _to_ns(datetimes) -> np.ndarray:
+    """时间列转 int64 纳秒，与 recorder 时间轴一致（带时区的按 UTC，不带的原样）"""
+    return pd.DatetimeIndex(pd.to_datetime(datetimes, utc=True)).as_unit('ns').asi8
 
 
 class BacktestEngine:
@@ -50,53 +78,107 @@ class BacktestEngine:
         """
         self.gateway_name = "backtest"
 
-        # 交易所与gateway
-        self.gateway = BacktestGateway(gateway_name=self.gateway_name, backtest_engine=self)
-
-        # 撮合与资金管理
-        self.oms = BacktestOms(initial_cash=initial_cash)
-
         # 初始设置
         self.initial_cash = initial_cash
         self.risk_free = risk_free
         self.annual_days = annual_days
 
         # 历史行情 & 标的
-        self.history = list()
+        self.history: BarStore | None = None
+        # 逐笔成交 {symbol: TickStore}，设置后这些标的改为逐笔撮合
+        self.ticks: dict[str, TickStore] = {}
         self.symbols: list[str] = []
-        self.update_datetime = None
-        self.current_datetime = None
-        self._kline_data: pd.DataFrame = pd.DataFrame()  # 用于回测画k线图
-        # 策略实例
-        self.strategy = None
-
-        # 回测记录
-        self.account_daily: dict = {}
-        self.portfolio_daily: dict = {}
-        self.contract_daily: dict = {}
-        self.position_daily: dict = {}
-        self.trades = []
 
         # 合约参数
         self.contract_params: dict[str, dict] = {}
 
-        # daily_update
-        self._daily_update_data = []  # 用于更新equity等的数据
+        # 构造时指定的周期；为 None 时由 load_store 按数据推断，reset 后重新推断
+        self._init_intervals = (daily_update_interval, matched_interval)
         self.daily_update_interval = daily_update_interval
         self.matched_interval = matched_interval
 
-        # 回测统计
-        self.backtest_res: dict = {}
+        # 模拟延迟（set_latency）；latency 为 None 时请求和回报都同步处理
+        self.latency: LatencyModel | None = None
+
+        # 多策略回测（strategy_bus）：每个策略一条事件总线和一个子账户，{策略名: 总线} / {策略名: 子账户初始资金}
+        self.buses: dict[str, BacktestEventEngine] = {}
+        self._bus_list: list[BacktestEventEngine] = []
+        self._capital: dict[str, float | None] = {}
+
+        self._init_run_state()
 
         # 日志系统
         if logger is None:
             self.logger = get_logger(name=engine_id, logfile=f'/logs/{engine_id}.log')
         else:
             self.logger = logger
+        # 回测日志先缓存，回测结束时写入 logger（set_log 可改为只保留最近若干条或关闭）
+        self.log_sink = BacktestLogSink(self.logger)
         # 事件引擎
         self.event_engine = event_engine
         self.register_event()
 
+    def _init_run_state(self):
+        """一次回放的全部可变状态：gateway 订单簿、oms 账户、记录、盯市窗口和统计结果"""
+        intrabar_path = getattr(getattr(self, "gateway", None), "intrabar_path", None)
+        initial_queue = getattr(getattr(self, "gateway", None), "initial_queue", 0.0)
+
+        # 交易所与gateway
+        self.gateway = BacktestGateway(gateway_name=self.gateway_name, backtest_engine=self)
+        self.gateway.intrabar_path = intrabar_path
+        self.gateway.initial_queue = initial_queue
+
+        # 撮合与资金管理
+        self.oms = BacktestOms(initial_cash=self.initial_cash)
+        for symbol, params in self.contract_params.items():
+            self._set_contract(symbol, params)
+
+        self.scheduler = SimScheduler([self._send_order, self.gateway.cancel_order, self.gateway.modify_order,
+                                       self._deliver_order, self._deliver_trade, self._deliver_position])
+        if self.latency is not None:
+            self.latency.reset()
+
+        self.update_datetime = None
+        self.current_datetime = None
+        # 策略实例；多策略回测时为 {策略名: 策略}
+        self.strategy = None
+        self.strategies: dict = {}
+        # 订单归属的策略 {orderid: 策略名}，_sending / _fill_owner 为正在下单 / 正在成交的订单所属策略
+        self._order_owner: dict[str, str] = {}
+        self._sending: str | None = None
+        self._fill_owner: str | None = None
+
+        # 回测记录：账户/合约/持仓按盯市时点追加到列式记录器
+        self.recorder = BacktestRecorder()
+        self.sub_recorders: dict[str, BacktestRecorder] = {}
+        for name, capital in self._capital.items():
+            self._add_sub_account(name, capital)
+        self.portfolio_daily: dict = {}
+        self.trades = []
+
+        # daily_update
+        self._daily_update_data = []  # 用于更新equity等的数据
+        self._pre_update_daily_time = None  # 当前盯市窗口的时间（分块回放时跨块保留）
+        self._updated_data = {}  # 当前盯市窗口各标的的收盘价
+        self._replay_key = None  # 最后回放的 bar 的 (end_date, interval)，检查点据此继续
+
+        # 回测统计
+        self.backtest_res: dict = {}
+        self.statistics: dict = {}
+
+    def reset(self, initial_cash: float | None = None):
+        """
+        清空上一次回放的订单、成交、账户和记录，供同一个引擎连续跑多次回测（见 BacktestContext）。
+        已加载的数据、合约参数、路径模型保留；延迟模型按 seed 重新开始。事件引擎上的处理函数不在这里清理。
+        """
+        if initial_cash is not None:
+            self.initial_cash = initial_cash
+        self.daily_update_interval, self.matched_interval = self._init_intervals
+        if self.history is not None:
+            self.load_store(self.history)
+        self.log_sink.clear()
+        self._init_run_state()
+
     # =========================
     # 参数与初始化
     # =========================
@@ -109,86 +191,216 @@ class BacktestEngine:
         """
         self.contract_params = contract_params
         for symbol, params in contract_params.items():
-            self.oms.set_contract_params(
-                symbol,
-                size=params.get("size", 1),
-                long_rate=params.get("long_rate", 0),
-                short_rate=params.get("short_rate", 0),
-                margin_rate=params.get("margin_rate", 0.1)
-            )
+            self._set_contract(symbol, params)
+
+    def _set_contract(self, symbol: str, params: dict):
+        self.oms.set_contract_params(
+            symbol,
+            size=params.get("size", 1),
+            long_rate=params.get("long_rate", 0),
+            short_rate=params.get("short_rate", 0),
+            margin_rate=params.get("margin_rate", 0.1)
+        )
+
+    def add_strategy(self, strategy, name: str | None = None):
+        """
+        登记策略实例（策略自己注册事件）；检查点通过 strategy.get_state / set_state 保存和恢复策略状态。
+        name 不为 None 时策略需建立在 strategy_bus(name) 返回的事件总线上
+        """
+        if name is None:
+            self.strategy = strategy
+            return
+        if name not in self.buses:
+            raise ValueError(f"strategy_bus({name!r}) must be created before add_strategy")
+        self.strategies[name] = strategy
+
+    def strategy_bus(self, name: str, capital: float | None = None) -> BacktestEventEngine:
+        """
+        多策略回测：返回策略 name 专用的事件总线，策略用它构建（MACDStrategy(event_engine=bus, ...)）。
+        每根 bar 只回放、撮合、盯市一次，再分发到各条总线；订单、成交、持仓回报只发给下单的策略。
+        每个策略有独立的子账户（oms.sub_accounts[name]，初始资金 capital，默认同 initial_cash），
+        self.oms 记全部成交，是组合账户。各策略的订单在同一个 gateway 撮合。
+        """
+        bus = self.buses.get(name)
+        if bus is None:
+            bus = BacktestEventEngine(timer=self.event_engine.timer)
+            self.buses[name] = bus
+            self._bus_list = list(self.buses.values())
+            self._capital[name] = capital
+            self._add_sub_account(name, capital)
+            self._register_bus(bus, name)
+        return bus
+
+    def clear_strategy_buses(self):
+        """去掉全部策略总线和子账户（已有的子账户记录随之丢弃）"""
+        for bus in self._bus_list:
+            bus.clear()
+        self.buses = {}
+        self._bus_list = []
+        self._capital = {}
+        self.strategies = {}
+        self.oms.sub_accounts = {}
+        self.sub_recorders = {}
+
+    def _add_sub_account(self, name: str, capital: float | None):
+        self.oms.add_sub_account(name, self.initial_cash if capital is None else capital)
+        self.sub_recorders[name] = BacktestRecorder()
 
     def load_data(self, data_list: list):
         """
-        加载历史数据 data_dict: {symbol: DataFrame(index=datetime, columns=['open','high','low','close','symbol',
-        'trade_date','ktype'])}
+        加载历史数据 data_list: [DataFrame(columns=['symbol','open','high','low','close','datetime','ktype'])]
+        数据以列式 BarStore 保存，run() 时才逐根生成 BarData
         """
         if not isinstance(data_list, list):
             raise TypeError('data_list must be a list')
         print(f"===========数据开始加载============")
-        required_cols = {'symbol', 'open', 'high', 'low', 'close', 'datetime', 'ktype'}
-        parts = []
-        for data in data_list:
-            if not required_cols.issubset(data.columns):
-                raise ValueError(f"loaded data must have columns {required_cols}")
-            if data.empty:
-                continue
-            if not isinstance(data['ktype'].iloc[0], Interval):
-                raise TypeError("ktype data must be Interval")
-
-            d = data.copy()
-            d.loc[:, 'datetime'] = pd.to_datetime(d['datetime'], errors='coerce')
-            d.loc[:, 'end_date'] = d['datetime'].shift(-1) - pd.Timedelta(seconds=1)
-
-            # 只丢掉时间相关的 NaT（通常是最后一行）
-            parts.append(d.dropna(subset=['datetime', 'end_date']))
-
-        df = pd.concat(parts, ignore_index=True, copy=False)
-        del parts
-        df = df.sort_values(by=['end_date', 'ktype'], ascending=True)
-
-        # 寻找最小的ktype比如同样有1m,15m选择1m作为交易所的撮合数据
-        interval_list = pd.unique(df["ktype"])
-        self.matched_interval = min(interval_list) if self.matched_interval is None else self.matched_interval
-        self.daily_update_interval = max(
-            interval_list) if self.daily_update_interval is None else self.daily_update_interval
+        start = time.perf_counter()
+        store = BarStore.from_frames(data_list)
+        self.load_store(store if self.history is None else BarStore.concat([self.history, store]))
 
-        # 准备回测画图数据
-        self.symbols = pd.unique(df['symbol']).tolist()
-        self._kline_data = df[df['ktype'] == self.daily_update_interval]
-        for dt in df.itertuples(index=False):
-            # row: (datetime, open, high, low, close, volume, symbol)
-            bar = BarData(
-                symbol=dt.symbol,
-                exchange=Exchange.HKFE,
-                datetime=dt.datetime,
-                interval=dt.ktype,
-                open_price=dt.open,
-                high_price=dt.high,
-                low_price=dt.low,
-                close_price=dt.close,
-                gateway_name=self.gateway_name,
-            )
-            self.history.append(bar)
+        rss = peak_rss_mb()
+        print(f"数据加载完成: {len(self.history)} 根K线, 用时 {time.perf_counter() - start:.2f}s, "
+              f"列存 {self.history.nbytes / 1024 / 1024:.1f}MB"
+              + (f", 进程内存峰值 {rss:.1f}MB" if rss is not None else ""))
 
         # 如果多周期发布警告
-        ktypes = pd.unique(df['ktype']).tolist()
-        if len(ktypes) > 1:
+        if len(self.history.intervals) > 1:
             warning_mesg = (f"data里面包含多个interval类型;data_list中的data必须符合以下规则："
                             f"\n 1. data中datetime列表示数据开始的时间，如15m的数据'2025-01-01 09:15:00'"
                             f"代表09:15:00到09:30:00的k线"
                             f"\n 2. 默认数据是连续的,中间没有缺失")
             warnings.warn(warning_mesg)
 
+    def load_bar_files(self, paths: list[str], start=None, end=None):
+        """
+        从内存映射K线文件（data.bar_file）加载 [start, end) 的数据
+        单个文件时价格列直接使用 memmap 视图，多个回测进程共享页缓存；多个文件时会合并拷贝一次
+        """
+        from data.bar_file import BarFile
+
+        start_time = time.perf_counter()
+        stores = [BarStore.from_bar_file(BarFile(path), start, end) for path in paths]
+        self.load_store(stores[0] if len(stores) == 1 else BarStore.concat(stores))
+        print(f"数据加载完成: {len(self.history)} 根K线, 用时 {time.perf_counter() - start_time:.2f}s")
+
+    def load_ticks(self, ticks: list[TickStore]):
+        """
+        逐笔撮合模式：有逐笔数据的标的，每根 matched_interval 的 bar 推送给策略之前，
+        先用这根 bar 时间段内的逐笔成交撮合已有订单（支持部分成交和排队），策略看到 bar 后下的单从下一根 bar 开始撮合
+        """
+        self.ticks = {t.symbol: t for t in ticks}
+
+    def set_intrabar_path(self, model: PathModel | None, fine: BarStore | None = None):
+        """
+        bar 内同时触及多个订单时按价格路径决定成交先后（见 backtest.intrabar），model 为 None 时恢复按下单顺序撮合。
+        PathModel.FINE 用 fine 中更细周期的 bar 拼接路径，例如 15m 撮合、1m 定先后，不需要回放全部 1m bar。
+        """
+        self.gateway.intrabar_path = IntrabarPath(model, fine) if model is not None else None
+
+    def set_latency(self, model: LatencyModel | None):
+        """
+        请求和回报按 model 的延迟在模拟时间上投递（见 backtest.scheduler），None 时恢复同步处理。
+        bar 撮合的粒度是整根 bar：到达时间不晚于某根 bar 收盘的请求从这根 bar 开始撮合；逐笔撮合时按到达时间精确插入。
+        """
+        self.latency = model
+        self.scheduler = SimScheduler(self.scheduler.handlers)
+
+    def set_log(self, mode: str = "buffer", level: LogLevel | None = None, capacity: int = 10_000):
+        """
+        回测日志的处理方式（见 backtest.log_sink）：buffer 缓存后批量写入 logger，ring 只保留最近 capacity 条，
+        off 全部丢弃（参数优化）。level 为 None 时使用 logger 的等级。
+        """
+        self.log_sink.flush()
+        self.log_sink = BacktestLogSink(self.logger, mode=mode, level=level, capacity=capacity)
+
+    def load_store(self, store: BarStore):
+        """
+        直接使用已经构建好的 BarStore（例如参数优化时多个进程共享的内存映射数据）
+        """
+        self.history = store
+
+        # 寻找最小的ktype比如同样有1m,15m选择1m作为交易所的撮合数据
+        interval_list = store.intervals
+        self.matched_interval = min(interval_list) if self.matched_interval is None else self.matched_interval
+        self.daily_update_interval = max(
+            interval_list) if self.daily_update_interval is None else self.daily_update_interval
+        self.symbols = list(store.symbols)
+
     # =========================
     # 核心回测逻辑
     # =========================
-    def run(self):
-        print(f"回测开始，共 {len(self.history)} 根K线")
+    def run(self, resume_from: str | bytes | None = None, extra_bars: list[pd.DataFrame] | BarStore | None = None,
+            checkpoint_path: str | None = None, checkpoint_every: int | None = None):
+        """
+        :param resume_from: 检查点（文件路径或 checkpoint() 返回的 bytes），从其后的 bar 继续回放
+        :param extra_bars: 新增数据（DataFrame 列表或 BarStore），替换已加载的历史数据；
+                           可以与已回放的部分重叠，检查点之前的 bar 会被跳过
+        :param checkpoint_path: 回放结束（最后一个盯市窗口 flush 之前）把检查点写入该文件
+        :param checkpoint_every: 每回放多少根 bar 额外写一次检查点，中断后可以从最近一次恢复
+        """
+        if extra_bars is not None:
+            self.load_store(extra_bars if isinstance(extra_bars, BarStore) else BarStore.from_frames(extra_bars))
+        if resume_from is not None:
+            self.restore_checkpoint(resume_from)
+            store = self.history.after(*self._replay_key) if self._replay_key is not None else self.history
+            print(f"从检查点 {self.update_datetime} 继续回测，共 {len(store)} 根K线")
+        else:
+            self._reset_replay()
+            store = self.history
+            print(f"回测开始，共 {len(store)} 根K线")
+        try:
+            self._replay(store, checkpoint_path, checkpoint_every)
+            if checkpoint_path is not None:
+                self.save_checkpoint(checkpoint_path)
+            self._finish_replay()
+        finally:
+            self._flush_log()
+        self.backtest_res = self.calculate_statistics()
+        print("回测结束")
 
-        pre_update_daily_time = None
-        updated_data = {}
+    def run_stream(self, stream: BarStream):
+        """
+        流式回测：逐块从 BarStream 读取并回放，峰值内存由分块大小决定，适合多年 1m 数据。
+        symbols / intervals 在开始前由 stream 给出；不保留历史行情，performance_plot 不输出分标的K线图。
+        """
+        self.history = None
+        self.symbols = list(stream.symbols)
+        self.matched_interval = min(stream.intervals) if self.matched_interval is None else self.matched_interval
+        self.daily_update_interval = max(
+            stream.intervals) if self.daily_update_interval is None else self.daily_update_interval
+        print(f"流式回测开始")
+        start = time.perf_counter()
+        n_bars = 0
+        self._reset_replay()
+        try:
+            for block in stream:
+                self._replay(block)
+                n_bars += len(block)
+            self._finish_replay()
+        finally:
+            self._flush_log()
+
+        rss = peak_rss_mb()
+        print(f"共回放 {n_bars} 根K线, 用时 {time.perf_counter() - start:.2f}s"
+              + (f", 进程内存峰值 {rss:.1f}MB" if rss is not None else ""))
+        self.backtest_res = self.calculate_statistics()
+        print("回测结束")
 
-        for bar in self.history:
+    def _reset_replay(self):
+        self._pre_update_daily_time = None
+        self._updated_data = {}
+        self._replay_key = None
+
+    def _replay(self, store: BarStore, checkpoint_path: str | None = None, checkpoint_every: int | None = None):
+        """回放一段 bar；盯市窗口状态跨段保留"""
+        pre_update_daily_time = self._pre_update_daily_time
+        updated_data = self._updated_data
+        countdown = checkpoint_every if checkpoint_path is not None else None
+        n = 0
+        if self.gateway.intrabar_path is not None:
+            self.gateway.intrabar_path.prepare(store, self.matched_interval)
+
+        for bar in store.iter_bars(self.gateway_name):
             if bar.interval == self.matched_interval:
                 self.current_datetime = bar.datetime
             self.on_bar(bar)
@@ -206,52 +418,200 @@ class BacktestEngine:
                 updated_data[bar.symbol] = bar.close_price
                 pre_update_daily_time = bar.datetime
 
+            n += 1
+            if countdown is not None:
+                countdown -= 1
+                if countdown == 0:
+                    countdown = checkpoint_every
+                    self._pre_update_daily_time = pre_update_daily_time
+                    self._updated_data = updated_data
+                    self._replay_key = store.replay_key(n - 1)
+                    self.save_checkpoint(checkpoint_path)
+
+        self._pre_update_daily_time = pre_update_daily_time
+        self._updated_data = updated_data
+        if n:
+            self._replay_key = store.replay_key(n - 1)
+
+    def _finish_replay(self):
+        # 最后一根 bar 之后到达的回报仍然记账
+        self.scheduler.drain()
         # 循环结束，flush 最后一个窗口
-        if updated_data:
-            self.update_datetime = pre_update_daily_time
-            self._update_daily(updated_data)
+        if self._updated_data:
+            self.update_datetime = self._pre_update_daily_time
+            self._update_daily(self._updated_data)
+            self._updated_data = {}
+
+    def _flush_log(self):
+        # ring 模式只在需要时查看，不自动写出
+        if self.log_sink.mode == "buffer":
+            self.log_sink.flush()
+
+    # =========================
+    # 检查点
+    # =========================
+    def checkpoint(self) -> bytes:
+        """
+        当前回放状态的快照：oms 持仓/账户/成交、gateway 未完成订单、recorder 记录、盯市窗口和策略状态。
+        所有对象在同一次 pickle 中序列化，oms 与 gateway 共享的订单对象恢复后仍是同一个。
+        """
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "replay_key": self._replay_key,
+            "pre_update_daily_time": self._pre_update_daily_time,
+            "updated_data": self._updated_data,
+            "current_datetime": self.current_datetime,
+            "update_datetime": self.update_datetime,
+            "matched_interval": self.matched_interval,
+            "daily_update_interval": self.daily_update_interval,
+            "initial_cash": self.initial_cash,
+            "oms": self.oms.get_state(),
+            "gateway": self.gateway.get_state(),
+            "recorder": self.recorder.get_state(),
+            "strategy": self.strategy.get_state() if hasattr(self.strategy, "get_state") else None,
+            "strategies": {name: strategy.get_state() for name, strategy in self.strategies.items()
+                           if hasattr(strategy, "get_state")},
+            "sub_recorders": {name: recorder.get_state() for name, recorder in self.sub_recorders.items()},
+            "order_owner": self._order_owner,
+            "latency": self.latency,
+            "scheduler": self.scheduler.get_state(),
+        }
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def save_checkpoint(self, path: str):
+        """写入临时文件后替换，中途崩溃不会留下半个检查点"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.checkpoint())
+        os.replace(tmp, path)
+
+    def restore_checkpoint(self, checkpoint: str | bytes):
+        """恢复 checkpoint() 保存的状态；策略需要是与保存时同类、已 initialize 的新实例"""
+        if isinstance(checkpoint, (str, os.PathLike)):
+            with open(checkpoint, "rb") as f:
+                checkpoint = f.read()
+        state = pickle.loads(checkpoint)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version {state.get('version')}")
+
+        self._replay_key = state["replay_key"]
+        self._pre_update_daily_time = state["pre_update_daily_time"]
+        self._updated_data = state["updated_data"]
+        self.current_datetime = state["current_datetime"]
+        self.update_datetime = state["update_datetime"]
+        self.matched_interval = state["matched_interval"]
+        self.daily_update_interval = state["daily_update_interval"]
+        self.initial_cash = state["initial_cash"]
+        self.oms.set_state(state["oms"])
+        self.gateway.set_state(state["gateway"])
+        self.recorder.set_state(state["recorder"])
+        self.latency = state.get("latency")
+        if state.get("scheduler") is not None:
+            self.scheduler.set_state(state["scheduler"])
+        if state["strategy"] is not None:
+            if not hasattr(self.strategy, "set_state"):
+                raise ValueError("checkpoint holds strategy state, call add_strategy before restoring")
+            self.strategy.set_state(state["strategy"])
+        for name, recorder_state in state["sub_recorders"].items():
+            self.sub_recorders.setdefault(name, BacktestRecorder()).set_state(recorder_state)
+        self._order_owner = state["order_owner"]
+        for name, strategy_state in state["strategies"].items():
+            if name not in self.strategies:
+                raise ValueError(f"checkpoint holds state of strategy {name!r}, call add_strategy before restoring")
+            self.strategies[name].set_state(strategy_state)
+
+    def run_vectorized(self, signals: dict[str, np.ndarray], trigger_prices: dict[str, np.ndarray] | None = None):
+        """
+        向量化快速回测，适合只输出目标仓位的信号类策略（如 MACD 金叉/死叉）
+        :param signals: {symbol: 目标仓位数组}，与该标的 matched_interval 的 bar 按时间一一对应，
+                        第 i 个值表示看到第 i 根 bar 后希望持有的净仓位（正多负空）
+        :param trigger_prices: {symbol: 数组}，可选，市价单的 trigger_price，成交价规则与 BacktestGateway 相同
+        合约参数沿用 set_contracts，统计结果写入 recorder / backtest_res，与 run() 一致
+        """
+        if self.history is None:
+            raise ValueError("load_data must be called before run_vectorized")
+        print(f"向量化回测开始，共 {len(self.history)} 根K线")
+        contract_params = {symbol: {"size": self.oms.sizes.get(symbol, 1),
+                                    "long_rate": self.oms.long_rates.get(symbol, 0),
+                                    "short_rate": self.oms.short_rates.get(symbol, 0),
+                                    "margin_rate": self.oms.margin_rates.get(symbol, 0.1)}
+                           for symbol in signals}
+        result = simulate_targets(self.history, signals, self.matched_interval, self.daily_update_interval,
+                                  contract_params, self.initial_cash, trigger_prices=trigger_prices)
+
+        self.recorder.extend(result.times, result.account, result.contracts, tz=self.history.tz)
+
+        if result.trades:
+            trade_times = self.history.to_datetime(result.trades['datetime']).to_list()
+            for n, (symbol, dt, sign, price, volume) in enumerate(zip(
+                    result.trades['symbol'], trade_times, result.trades['direction'].tolist(),
+                    result.trades['price'].tolist(), result.trades['volume'].tolist())):
+                self.oms.trade_log.append(TradeData(
+                    symbol=symbol, exchange=Exchange.HKFE, orderid=f"vec{n}", tradeid=f"vec{n}",
+                    direction=Direction.LONG if sign > 0 else Direction.SHORT,
+                    price=price, volume=volume, traded=volume, avgFillPrice=price, datetime=dt,
+                    status=OrderStatus.ALLTRADED, gateway_name=self.gateway_name))
 
         self.backtest_res = self.calculate_statistics()
         print("回测结束")
 
     def register_event(self):
-        """注册事件监听"""
+        """注册事件监听（包括各策略总线）"""
         self.event_engine.register(EVENT_ORDER_REQ, self._on_order_req)
         self.event_engine.register(EVENT_MODIFY_REQ, self._on_modify_req)
         self.event_engine.register(EVENT_CANCEL_REQ, self._on_cancel_req)
         self.event_engine.register(EVENT_LOG, self._on_log)
+        for name, bus in self.buses.items():
+            self._register_bus(bus, name)
+
+    def _register_bus(self, bus: BacktestEventEngine, name: str):
+        def on_order_req(event: Event):
+            self._on_order_req(event, name)
+
+        bus.register(EVENT_ORDER_REQ, on_order_req)
+        bus.register(EVENT_MODIFY_REQ, self._on_modify_req)
+        bus.register(EVENT_CANCEL_REQ, self._on_cancel_req)
+        bus.register(EVENT_LOG, self._on_log)
 
-    def _on_order_req(self, event: Event):
+    def _on_order_req(self, event: Event, owner: str | None = None):
         req: OrderRequest = event.data
-        log_data = LogData(msg=f"[BacktestEngine] 收到发送订单请求{req}")
-        self._on_log(Event(EVENT_LOG,log_data))
-        self.gateway.send_order(req)
+        self.log_sink.log(self.current_datetime, LogLevel.INFO, "[BacktestEngine] 收到发送订单请求%s", (req,))
+        self._request(_MSG_SEND, (owner, req), "order")
 
     def _on_cancel_req(self, event: Event):
         req: CancelRequest = event.data
-        log_data = LogData(msg=f"[BacktestEngine] 收到取消订单请求{req}")
-        self._on_log(Event(EVENT_LOG,log_data))
-        self.gateway.cancel_order(req)
+        self.log_sink.log(self.current_datetime, LogLevel.INFO, "[BacktestEngine] 收到取消订单请求%s", (req,))
+        self._request(_MSG_CANCEL, req, "cancel")
 
     def _on_modify_req(self, event: Event):
         req: ModifyRequest = event.data
-        log_data = LogData(msg=f"[BacktestEngine] 收到修改订单请求{req}")
-        self._on_log(Event(EVENT_LOG,log_data))
-        self.gateway.modify_order(req)
+        self.log_sink.log(self.current_datetime, LogLevel.INFO, "[BacktestEngine] 收到修改订单请求%s", (req,))
+        self._request(_MSG_MODIFY, req, "order")
+
+    def _request(self, kind: int, req, latency_kind: str):
+        if self.latency is None:
+            self.scheduler.handlers[kind](req)
+        else:
+            self.scheduler.submit(_REQUEST, self.latency.sample(latency_kind), kind, req)
+
+    def _report(self, kind: int, data):
+        if self.latency is None:
+            self.scheduler.handlers[kind](data)
+        else:
+            # 订单对象之后还会被 gateway 修改，回报保存当时的副本
+            self.scheduler.submit(_REPORT, self.latency.sample("report"), kind,
+                                  copy.copy(data) if kind == _MSG_ORDER else data)
 
     def _on_log(self, event: Event):
         log_data: LogData = event.data
-        if log_data.level == LogLevel.DEBUG:
-            self.logger.debug(f"BackTestTime:{self.current_datetime} {log_data.msg}")
-        elif log_data.level == LogLevel.INFO:
-            self.logger.info(f"BackTestTime:{self.current_datetime} {log_data.msg}")
-        elif log_data.level == LogLevel.WARNING:
-            self.logger.warning(f"BackTestTime:{self.current_datetime} {log_data.msg}")
-        elif log_data.level == LogLevel.ERROR:
-            self.logger.error(f"BackTestTime:{self.current_datetime} {log_data.msg}")
+        self.log_sink.log(self.current_datetime, log_data.level, log_data.msg, log_data.args)
 
     def _push_bar_event(self, bar: BarData):
-        self.event_engine.put(Event(EVENT_BAR, bar))
+        event = Event(EVENT_BAR, bar)
+        self.event_engine.put(event)
+        for bus in self._bus_list:
+            bus.put(event)
 
     def _push_order_event(self, order: OrderData):
         self.event_engine.put(Event(EVENT_ORDER, order))
@@ -263,88 +623,191 @@ class BacktestEngine:
         self.event_engine.put(Event(EVENT_POSITION, position))
 
     def on_bar(self, bar: BarData):
+        if self.event_engine.timer:
+            # 模拟定时器按 bar 收盘时间推进
+            now = bar.datetime + timedelta(seconds=bar.interval.value)
+            self.event_engine.advance_time(now)
+            for bus in self._bus_list:
+                bus.advance_time(now)
+        ticks = self.ticks.get(bar.symbol) if self.ticks else None
+        if ticks is not None and bar.interval == self.matched_interval:
+            end = bar.datetime + pd.Timedelta(seconds=bar.interval.value)
+            start, stop = ticks.searchsorted(bar.datetime), ticks.searchsorted(end)
+            if self.latency is not None:
+                start = self._ticks_until_arrivals(ticks, start, stop, end.value)
+            self.gateway.on_ticks(ticks, start, stop)
+            if self.latency is not None:
+                self.scheduler.run_until(end.value)
+            self._push_bar_event(bar)
+            return
+        if self.latency is not None:
+            # bar 收盘时刻之前到达的请求、回报先处理
+            self.scheduler.run_until(pd.Timestamp(bar.datetime).value + int(bar.interval.value * 1_000_000_000))
         self._push_bar_event(bar)
         # 主要是解决在不同频率bar顺序传入时(例如1m和15m),gateway错误采用15m数据判断开平仓
         if bar.interval == self.matched_interval:
             self.gateway.on_bar(bar)
 
+    def _ticks_until_arrivals(self, ticks: TickStore, start: int, stop: int, end: int) -> int:
+        """逐笔撮合与到达的消息按时间交替：先撮合到达时刻及之前的逐笔成交，再处理这条消息"""
+        scheduler = self.scheduler
+        while (when := scheduler.next_time()) is not None and when < end:
+            i = min(int(np.searchsorted(ticks.datetime, when, side='right')), stop)
+            if i > start:
+                self.gateway.on_ticks(ticks, start, i)
+                start = i
+            scheduler.run_next()
+        return start
+
+    def _send_order(self, item: tuple[str | None, OrderRequest]):
+        owner, req = item
+        self._sending = owner
+        try:
+            orderid = self.gateway.send_order(req)
+        finally:
+            self._sending = None
+        if owner is not None:
+            self._order_owner[orderid] = owner
+
     def on_trade(self, trade: TradeData):
-        self.oms.process_trade_event(Event(EVENT_TRADE, trade))
-        self._push_trade_event(trade)
+        # gateway 成交后紧接着发出同一订单的持仓回报
+        self._fill_owner = self._order_owner.get(trade.orderid)
+        self._report(_MSG_TRADE, trade)
 
     def on_position(self, position: PositionData):
-        self._push_position_event(position)
+        self._report(_MSG_POSITION, (self._fill_owner, position))
+
+    def _deliver_trade(self, trade: TradeData):
+        event = Event(EVENT_TRADE, trade)
+        self.oms.process_trade_event(event)
+        owner = self._order_owner.get(trade.orderid)
+        if owner is None:
+            self._push_trade_event(trade)
+        else:
+            self.oms.sub_accounts[owner].process_trade_event(event)
+            self.buses[owner].put(event)
 
     def on_order(self, order: OrderData):
-        self.oms.process_order_event(Event(EVENT_ORDER, order))
-        self._push_order_event(order)
+        self._report(_MSG_ORDER, order)
+
+    def _deliver_order(self, order: OrderData):
+        event = Event(EVENT_ORDER, order)
+        self.oms.process_order_event(event)
+        # 同步下单时 gateway.send_order 返回之前就会回报订单
+        owner = self._order_owner.get(order.orderid, self._sending)
+        if owner is None:
+            self._push_order_event(order)
+        else:
+            self.oms.sub_accounts[owner].process_order_event(event)
+            self.buses[owner].put(event)
+
+    def _deliver_position(self, item: tuple[str | None, PositionData]):
+        owner, position = item
+        if owner is None:
+            self._push_position_event(position)
+        else:
+            self.buses[owner].put(Event(EVENT_POSITION, position))
 
     # =========================
     # 逐日盯市 & 权益记录
     # =========================
     def _update_daily(self, updated_data):
         self.oms.renew_unrealized_pnl(updated_data)
-        account = deepcopy(self.oms.get_account("BACKTEST"))
-        self.account_daily[self.update_datetime] = {'cash': account.cash,
-                                                     'margin': account.margin,
-                                                     'realized_pnl': account.realized_pnl,
-                                                     'unrealized_pnl': account.unrealized_pnl,
-                                                     'equity': account.equity,
-                                                     'available': account.available}
-        self.contract_daily[self.update_datetime] = deepcopy(self.oms.get_contract_log())
-        self.position_daily[self.update_datetime] = deepcopy(self.oms.get_all_positions())
+        # 直接读取 oms 的当前状态写入列式记录器，不做 deepcopy
+        self.recorder.record(self.update_datetime, self.oms.get_account("BACKTEST"), self.oms.contracts_log,
+                             self.oms.positions)
+        for name, sub in self.oms.sub_accounts.items():
+            sub.renew_unrealized_pnl(updated_data)
+            self.sub_recorders[name].record(self.update_datetime, sub.get_account("BACKTEST"), sub.contracts_log,
+                                            sub.positions)
+
+    # 兼容旧接口：{datetime: {...}} 格式按需从 recorder 生成
+    @property
+    def account_daily(self) -> dict:
+        return self.recorder.account_dict()
+
+    @property
+    def contract_daily(self) -> dict:
+        return self.recorder.contract_dict()
+
+    @property
+    def position_daily(self) -> dict:
+        return self.recorder.position_dict()
 
     # =========================
     # 绩效分析
     # =========================
     def calculate_statistics(self):
-        df = pd.DataFrame.from_dict(self.account_daily, orient="index")
-        total_return = (df["equity"].iloc[-1] / self.initial_cash) - 1
-        daily_return = df["equity"].pct_change().dropna()
-        sharpe = (daily_return.mean() - self.risk_free / self.annual_days) / \
-                 (daily_return.std() + 1e-9) * np.sqrt(self.annual_days)
-        max_drawdown = self._calc_max_drawdown(df["equity"])
-        annual_return = ((1 + daily_return.mean()) ** self.annual_days) - 1
+        """
+        数值结果保存在 self.statistics，返回格式化后的结果（比例为百分比字符串）
+        """
+        self.statistics = self._analyze(self.oms, self.recorder, self.initial_cash)
+        stats = self.statistics
 
         print("\n===== 回测绩效 =====")
         print(f"初始资金: {self.initial_cash:.2f}")
-        print(f"结束资金: {df['equity'].iloc[-1]:.2f}")
-        print(f"总收益率: {total_return * 100:.2f}%")
-        print(f"年化收益率: {annual_return * 100:.2f}%")
-        print(f"最大回撤: {max_drawdown * 100:.2f}%")
-        print(f"Sharpe Ratio: {sharpe:.2f}")
-        return {"total_return": f"{total_return * 100:.2f}%", "annual_return": f"{annual_return * 100:.2f}%",
-                "sharpe": sharpe, "max_drawdown": f"{max_drawdown * 100:.2f}%"}
-
-    def _calc_max_drawdown(self, equity_series):
-        peak = equity_series.iloc[0]
-        max_dd = 0
-        for x in equity_series:
-            peak = max(peak, x)
-            dd = (peak - x) / peak
-            max_dd = max(max_dd, dd)
-        return max_dd
-
-    def get_trade_log_df(self):
-        # 转化trade_log成数据框
-        trade_log = pd.DataFrame([
-            {
-                "datetime": trade.datetime,
-                "symbol": trade.symbol,
-                "orderid": trade.orderid,
-                "direction": trade.direction,
-                "price": trade.price,
-                "traded": trade.traded,
-                "volume": trade.volume,
-                "avgFillPrice": trade.avgFillPrice,
-                "status": trade.status,
-            }
-            for trade in self.oms.trade_log
-        ])
+        print(f"结束资金: {self.recorder.account_column('equity')[-1]:.2f}")
+        print(f"总收益率: {stats['total_return'] * 100:.2f}%")
+        print(f"年化收益率: {stats['annual_return'] * 100:.2f}%")
+        print(f"最大回撤: {stats['max_drawdown'] * 100:.2f}% (持续 {stats['max_drawdown_duration']} 个盯市周期)")
+        print(f"Sharpe Ratio: {stats['sharpe']:.2f}  Sortino: {stats['sortino']:.2f}  Calmar: {stats['calmar']:.2f}")
+        print(f"成交 {stats['trade_count']} 笔, 平仓 {stats['round_trips']} 次, 胜率: {stats['win_rate'] * 100:.2f}%, "
+              f"盈亏比: {stats['profit_factor']:.2f}")
+        for name, sub_stats in self.strategy_statistics().items():
+            print(f"[{name}] 总收益率: {sub_stats['total_return'] * 100:.2f}%  "
+                  f"最大回撤: {sub_stats['max_drawdown'] * 100:.2f}%  Sharpe: {sub_stats['sharpe']:.2f}  "
+                  f"成交 {sub_stats['trade_count']} 笔")
+        return format_metrics(stats)
+
+    def robustness(self, n_sims: int = 10_000, **kwargs) -> dict[str, pd.DataFrame]:
+        """
+        成交重排 / 随机跳过成交 / 收益块自助法的蒙特卡洛模拟，返回各方法的指标分布（见 backtest.robustness，
+        其余参数同 monte_carlo，如 methods、skip_prob、block、workers、seed）
+        """
+        return monte_carlo(self.oms.trade_log, self.recorder, self.initial_cash, sizes=self.oms.sizes,
+                           long_rates=self.oms.long_rates, short_rates=self.oms.short_rates, n_sims=n_sims,
+                           risk_free=self.risk_free, annual_days=self.annual_days, **kwargs)
+
+    def strategy_statistics(self) -> dict[str, dict]:
+        """多策略回测各子账户的绩效（数值，同 self.statistics）"""
+        return {name: self._analyze(sub, self.sub_recorders[name], self._sub_capital(name))
+                for name, sub in self.oms.sub_accounts.items()}
+
+    def strategy_equity(self) -> pd.DataFrame:
+        """多策略回测的权益曲线：每个策略子账户一列，portfolio 列为组合账户"""
+        equity = {name: recorder.account_column("equity") for name, recorder in self.sub_recorders.items()}
+        equity["portfolio"] = self.recorder.account_column("equity")
+        return pd.DataFrame(equity, index=self.recorder.index)
+
+    def _sub_capital(self, name: str) -> float:
+        capital = self._capital.get(name)
+        return self.initial_cash if capital is None else capital
+
+    def _analyze(self, oms: BacktestOms, recorder: BacktestRecorder, initial_cash: float) -> dict:
+        trade_log = oms.trade_log
+        trades = {
+            "symbol": np.array([trade.symbol for trade in trade_log], dtype=object),
+            "datetime": pd.DatetimeIndex([trade.datetime for trade in trade_log]).asi8,
+            "volume": np.array([trade.volume if trade.direction == Direction.LONG else -trade.volume
+                                for trade in trade_log], dtype=np.float64),
+            "price": np.array([trade.price for trade in trade_log], dtype=np.float64),
+        }
+        return analyze(recorder.account_column("equity"), initial_cash,
+                       risk_free=self.risk_free, annual_days=self.annual_days,
+                       margin=recorder.account_column("margin"), trades=trades, sizes=oms.sizes)
+
+    def get_trade_log_df(self, name: str | None = None):
+        # 转化trade_log成数据框（按列构造，成交多时比逐行 dict 快）；name 为策略名时只取该子账户的成交
+        trades = (self.oms if name is None else self.oms.sub_accounts[name]).trade_log
+        trade_log = pd.DataFrame({
+            field: [getattr(trade, field) for trade in trades]
+            for field in ("datetime", "symbol", "orderid", "direction", "price", "traded", "volume",
+                          "avgFillPrice", "status")
+        })
         return trade_log
 
-    def get_account_daily_df(self):
-        account_data = pd.DataFrame.from_dict(self.account_daily, orient="index")
+    def get_account_daily_df(self, name: str | None = None):
+        account_data = (self.recorder if name is None else self.sub_recorders[name]).account_frame()
         return account_data
 
     def _prepare_plot_data(self):
@@ -358,37 +821,67 @@ class BacktestEngine:
         table_data["statistic"] = pd.DataFrame([self.backtest_res])
 
         plot_data = {}
-        # 将{'2025-01-01': {'mhi': {'vol': 1},'hsi': {'vol': 1}}}转成{'mhi':{'2025-01-01':{'vol': 1}}....}形式
-        contract_log = {}
-        for date, symbols in self.contract_daily.items():
-            for symbol, info in symbols.items():
-                contract_log.setdefault(symbol, {})[date] = info
-
-        # 准备数据
-        for symbol, info in contract_log.items():
-            spec_contract_detail = pd.DataFrame.from_dict(info, orient="index")
-            spec_contract_detail.index = pd.to_datetime(spec_contract_detail.index)
-
-            spec_trade_log = trade_log[trade_log["symbol"] == symbol].copy()
-            spec_trade_log['datetime_fit'] = pd.cut(spec_trade_log['datetime'], bins=spec_contract_detail.index,
-                                                    right=False, labels=spec_contract_detail.index[0:-1],
-                                                    ordered=False)
-
-            buy_log = spec_trade_log[spec_trade_log["direction"] == Direction.LONG] \
-                .groupby('datetime_fit', observed=False)['volume'].sum()
-
-            sell_log = spec_trade_log[spec_trade_log["direction"] == Direction.SHORT] \
-                .groupby('datetime_fit', observed=False)['volume'].sum()
-
-            spec_contract_detail['buy_log'] = buy_log
-            spec_contract_detail['sell_log'] = sell_log
+        buy_log, sell_log = self._trade_volume_by_bar(trade_log)
+        # 准备数据：每个标的直接从 recorder 取出列数据（去掉标的出现之前的时点）
+        for k, symbol in enumerate(self.recorder.symbols):
+            present = self.recorder.present(symbol)
+            spec_contract_detail = self.recorder.contract_frame(symbol)
+            spec_contract_detail['buy_log'] = buy_log[k][present]
+            spec_contract_detail['sell_log'] = sell_log[k][present]
             plot_data[symbol] = spec_contract_detail
 
         return (plot_data, table_data)
 
-    def performance_plot(self, plot_symbol_detail=True, plot_path="backtest_plot.html"):
+    def _trade_volume_by_bar(self, trade_log: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """
+        所有成交一次性对齐到 recorder 时间轴，返回 (买量, 卖量)，形状都是 (标的数, 时点数)，行顺序同 recorder.symbols。
+        成交记到该标的所在区间 [t_i, t_i+1) 的左端 t_i（t_i 为标的已出现的时点）；
+        标的出现之前、最后一个时点及之后的成交不计入。标的未出现的时点和最后一个时点为 NaN，其余无成交为 0。
+        """
+        symbols = self.recorder.symbols
+        times = self.recorder.times
+        n = len(times)
+        present = np.array([self.recorder.present(symbol) for symbol in symbols], dtype=bool).reshape(-1, n)
+        rows = np.arange(n)
+        # 每个时点往前最近一个标的已出现的时点，及每个标的最后出现的时点
+        last_seen = np.maximum.accumulate(np.where(present, rows, -1), axis=1)
+        last_row = last_seen[:, -1] if n else np.empty(0, dtype=np.int64)
+
+        totals = []
+        for direction in (Direction.LONG, Direction.SHORT):
+            total = np.zeros(len(symbols) * n)
+            if len(trade_log) and n:
+                trades = trade_log[trade_log['direction'] == direction]
+                codes = pd.Categorical(trades['symbol'], categories=symbols).codes.astype(np.int64)
+                at = np.searchsorted(times, _to_ns(trades['datetime']), side='right') - 1
+                volume = trades['volume'].to_numpy(dtype=np.float64)
+                valid = (codes >= 0) & (at >= 0)
+                codes, at, volume = codes[valid], at[valid], volume[valid]
+                row = last_seen[codes, at]
+                valid = (row >= 0) & (row != last_row[codes])
+                total += np.bincount(codes[valid] * n + row[valid], weights=volume[valid],
+                                     minlength=len(symbols) * n)
+            total = total.reshape(len(symbols), n)
+            total[~present] = np.nan
+            if n:
+                total[np.arange(len(symbols)), np.maximum(last_row, 0)] = np.nan
+            totals.append(total)
+        return totals[0], totals[1]
+
+    def performance_plot(self, plot_symbol_detail=True, plot_path="backtest_plot.html",
+                         max_points: int | None = None, lazy: bool = False):
+        """
+        :param max_points: 长回测降采样：每个图最多保留的点数，资金曲线按 LTTB 保留形状，
+                           K线按连续 bucket 合并（high/low 取极值，买卖量求和）；None 时不降采样。
+                           成交记录超过 max_points 行时表格只显示首尾各一半，完整记录写到 <plot_path>_trade_log.csv
+        :param lazy: 每个分页的数据写成单独的压缩文件（<plot_path>_files/），打开分页时才加载（见 plotting.lazy_html）
+        """
         # 1 组合权益变动页
         account_data = self.get_account_daily_df()
+        if max_points is not None:
+            account_data = account_data.iloc[downsample_index(account_data.index, [
+                account_data[col] for col in ('equity', 'cash', 'realized_pnl', 'unrealized_pnl', 'margin',
+                                              'available')], max_points)]
         x_data = account_data.index.to_list()
         # 1.1权益图
         equity_plot = create_line(x_data=x_data, y_data=account_data['equity'], y_label='equity')
@@ -412,26 +905,32 @@ class BacktestEngine:
         equity_page.add_sub_chart(realized_pnl_plot)
         equity_page.add_sub_chart(margin_plot)
 
-        backtest_plot = Tab()
-        backtest_plot.add(equity_page.output(), 'Portfolio Performance Dashboard')
+        # [(分页名, 图表 或 DataFrame)]，DataFrame 按表格输出
+        tabs = [('Portfolio Performance Dashboard', equity_page.output())]
 
         # 2. 回测统计和交易记录
         plot_data, table_data = self._prepare_plot_data()
-        statistic_data = table_data['statistic']
-        trade_log = table_data['trade_log']
-        statistic_table = create_table(statistic_data, title='statistic')
-        trade_log_table = create_table(trade_log, title='trade_log')
-
-        backtest_plot.add(statistic_table, 'Backtest Statistic')
-        backtest_plot.add(trade_log_table, 'Backtest Trade Log')
+        tabs.append(('Backtest Statistic', table_data['statistic']))
+        trade_table = table_data['trade_log']
+        if max_points is not None and len(trade_table) > max_points:
+            csv_path = f"{os.path.splitext(plot_path)[0]}_trade_log.csv"
+            trade_table.to_csv(csv_path, index=False)
+            trade_table = truncate_rows(trade_table, max_points, note=(
+                f"... 省略 {len(trade_table) - max_points} 行，完整成交记录见 {os.path.basename(csv_path)} ..."))
+        tabs.append(('Backtest Trade Log', trade_table))
 
         # 3. 分资产统计
-        if plot_symbol_detail:
-
+        if plot_symbol_detail and self.history is None:
+            print("流式回测没有保留历史行情，不输出分标的K线图")
+        elif plot_symbol_detail:
+            # 回测画k线图用盯市周期的数据
+            kline_frame = self.history.to_frame(interval=self.daily_update_interval)
+            # 按标的一次分组，不再逐个标的扫描整张表
+            kline_groups = kline_frame.groupby('symbol', sort=False).indices
             for symbol, data in plot_data.items():
                 # 准备k线数据
-                kline_data = self._kline_data[self._kline_data['symbol'
-                                              ] == symbol][['datetime', 'open', 'high', 'low', 'close']].copy()
+                kline_data = kline_frame.iloc[kline_groups.get(symbol, [])][
+                    ['datetime', 'open', 'high', 'low', 'close']].copy()
                 kline_data.columns = ['date', 'open', 'high', 'low', 'close']
                 kline_data['date'] = pd.to_datetime(kline_data['date'])
                 # 持仓和交易
@@ -440,6 +939,9 @@ class BacktestEngine:
 
                 # 数据聚合
                 plot_symbol_df = pd.merge(trade_data, kline_data, on='date', how='outer')
+                if max_points is not None:
+                    plot_symbol_df = aggregate_bars(plot_symbol_df, max_points, total=('buy_log', 'sell_log'),
+                                                    keep_last=('volume',))
                 kline_plot = create_kline(plot_symbol_df[['date', 'open', 'high', 'low', 'close']])
                 x_data = plot_symbol_df['date'].to_list()
 
@@ -459,9 +961,18 @@ class BacktestEngine:
                 symbol_detail_plot = ChartManager(theme=ThemeType.DARK, vgap_pct=7)
                 symbol_detail_plot.set_main(kline_plot)
                 symbol_detail_plot.add_sub_chart(trade_plot)
-                backtest_plot.add(symbol_detail_plot.output(), tab_name=symbol)
+                tabs.append((symbol, symbol_detail_plot.output()))
 
-        backtest_plot.render(plot_path)
+        if lazy:
+            render_lazy(tabs, plot_path)
+        else:
+            table_titles = {'Backtest Statistic': 'statistic', 'Backtest Trade Log': 'trade_log'}
+            backtest_plot = Tab()
+            for name, item in tabs:
+                if isinstance(item, pd.DataFrame):
+                    item = create_table(item, title=table_titles[name])
+                backtest_plot.add(item, name)
+            backtest_plot.render(plot_path)
         print(f"\n====================")
         print(f"回测图输出到{plot_path}")
 
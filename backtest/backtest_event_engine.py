@@ -3,13 +3,13 @@
 处理完上一事件才会接收新的事件。这一做法是为了防止在回测中，这一根k线还没处理完，下一根k线已经传过来了
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from collections.abc import Callable
-from queue import Empty, Queue
-from threading import Thread
-from time import sleep
+from datetime import timedelta
+from time import perf_counter_ns
 from typing import Any
 from engine.event_engine import EVENT_TIMER
+from engine.event_stats import EventStats
 
 
 class Event:
@@ -30,36 +30,33 @@ HandlerType = Callable[[Event], None]
 
 class BacktestEventEngine:
     """
-    Event engine distributes event object based on its type
-    to those handlers registered.
+    回测用的同步事件引擎，接口与 EventEngine 相同，但不启动任何线程：
 
-    It also generates timer event by every interval seconds,
-    which can be used for timing purpose.
+    - put 把事件放入队列；最外层的 put 用循环依次处理队列直到清空，处理函数里再 put 的事件排在队尾，
+      在当前事件的全部处理函数执行完之后处理（与实盘 EventEngine 的先进先出顺序一致），不会递归
+    - 每个事件类型的处理函数在 register 时编译成元组，分发时直接遍历
+    - 定时器可选：timer=True 时由 BacktestEngine 按 bar 时间推进模拟时钟（advance_time），
+      每经过 interval 秒补发一个 EVENT_TIMER，data 为该定时器时刻
     """
 
-    def __init__(self, interval: int = 1) -> None:
+    def __init__(self, interval: int = 1, timer: bool = False) -> None:
         """
-        Timer event is generated every 1 second by default, if
-        interval not specified.
+        :param interval: 模拟定时器间隔（秒）
+        :param timer: 是否发出模拟时间的 EVENT_TIMER
         """
         self._interval: int = interval
-        self._queue: Queue = Queue()
+        self.timer: bool = timer
+        self._next_timer = None
+        self._queue: deque = deque()
+        self._draining: bool = False
         self._active: bool = False
-        self._thread: Thread = Thread(target=self._run)
-        self._timer: Thread = Thread(target=self._run_timer)
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: list = []
-
-    def _run(self) -> None:
-        """
-        Get event from queue and then process it.
-        """
-        while self._active:
-            try:
-                event: Event = self._queue.get(block=True, timeout=1)
-                self._process(event)
-            except Empty:
-                pass
+        # 分发表：{type: (handler, ...)}，general 处理函数单独保存
+        self._dispatch: dict[str, tuple] = {}
+        self._general: tuple = ()
+        # 分发耗时统计，enable_stats 后才有
+        self.stats: EventStats | None = None
 
     def _process(self, event: Event) -> None:
         """
@@ -69,45 +66,90 @@ class BacktestEventEngine:
         Then distribute event to those general handlers which listens
         to all types.
         """
-        if event.type in self._handlers:
-            [handler(event) for handler in self._handlers[event.type]]
-
-        if self._general_handlers:
-            [handler(event) for handler in self._general_handlers]
-
-    def _run_timer(self) -> None:
-        """
-        Sleep by interval second(s) and then generate a timer event.
-        """
-        while self._active:
-            sleep(self._interval)
-            event: Event = Event(EVENT_TIMER)
-            self.put(event)
+        for handler in self._dispatch.get(event.type, ()):
+            handler(event)
+        for handler in self._general:
+            handler(event)
 
     def start(self) -> None:
         """
-        Start event engine to process events and generate timer events.
+        与 EventEngine 接口兼容；同步引擎没有需要启动的线程。
         """
         self._active = True
-        self._thread.start()
-        self._timer.start()
 
     def stop(self) -> None:
         """
         Stop event engine.
         """
         self._active = False
-        self._timer.join()
-        self._thread.join()
 
     def put(self, event: Event) -> None:
         """
         Put an event object into event queue.
-        """
-        self._queue.put(event)
-        while not self._queue.empty():
-            e = self._queue.get()
-            self._process(e)
+        正在处理事件时（处理函数里 put）只入队，由最外层循环处理。
+        """
+        queue = self._queue
+        queue.append(event)
+        if self._draining:
+            return
+        self._draining = True
+        try:
+            if self.stats is not None:
+                self._drain_timed(self.stats)
+                return
+            dispatch = self._dispatch
+            while queue:
+                e = queue.popleft()
+                for handler in dispatch.get(e.type, ()):
+                    handler(e)
+                for handler in self._general:
+                    handler(e)
+        finally:
+            self._draining = False
+
+    def _drain_timed(self, stats: EventStats) -> None:
+        """与 put 的处理循环相同，另外记录每个处理函数的耗时"""
+        queue = self._queue
+        while queue:
+            e = queue.popleft()
+            for handler in self._dispatch.get(e.type, ()) + self._general:
+                start = perf_counter_ns()
+                handler(e)
+                stats.record(e.type, handler, perf_counter_ns() - start)
+
+    def enable_stats(self, enabled: bool = True) -> EventStats | None:
+        """开启/关闭分发耗时统计（见 engine.event_stats），返回统计对象；回测同步处理，没有排队时间"""
+        if not enabled:
+            self.stats = None
+        elif self.stats is None:
+            self.stats = EventStats()
+        return self.stats
+
+    def advance_time(self, now) -> None:
+        """
+        模拟时钟推进到 now（datetime / Timestamp），补发 (上次, now] 之间每 interval 秒的 EVENT_TIMER。
+        第一次调用只设定起点。
+        """
+        if not self.timer:
+            return
+        if self._next_timer is None:
+            self._next_timer = now + timedelta(seconds=self._interval)
+            return
+        step = timedelta(seconds=self._interval)
+        while self._next_timer <= now:
+            at = self._next_timer
+            self._next_timer = at + step
+            self.put(Event(EVENT_TIMER, at))
+
+    def clear(self) -> None:
+        """注销全部处理函数、清空队列和模拟时钟，供 BacktestContext.reset 复用"""
+        self._queue.clear()
+        self._draining = False
+        self._next_timer = None
+        self._handlers.clear()
+        self._general_handlers.clear()
+        self._dispatch.clear()
+        self._general = ()
 
     def register(self, type: str, handler: HandlerType) -> None:
         """
@@ -117,6 +159,7 @@ class BacktestEventEngine:
         handler_list: list = self._handlers[type]
         if handler not in handler_list:
             handler_list.append(handler)
+            self._dispatch[type] = tuple(handler_list)
 
     def unregister(self, type: str, handler: HandlerType) -> None:
         """
@@ -129,6 +172,9 @@ class BacktestEventEngine:
 
         if not handler_list:
             self._handlers.pop(type)
+            self._dispatch.pop(type, None)
+        else:
+            self._dispatch[type] = tuple(handler_list)
 
     def register_general(self, handler: HandlerType) -> None:
         """
@@ -137,6 +183,7 @@ class BacktestEventEngine:
         """
         if handler not in self._general_handlers:
             self._general_handlers.append(handler)
+            self._general = tuple(self._general_handlers)
 
     def unregister_general(self, handler: HandlerType) -> None:
         """
@@ -144,6 +191,7 @@ class BacktestEventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+            self._general = tuple(self._general_handlers)
 
     def on_event(self, type: str, data: object = None) -> None:
         """
@@ -151,4 +199,3 @@ class BacktestEventEngine:
         """
         event: Event = Event(type, data)
         self.put(event)
-
@@ -1,6 +1,8 @@
 from datetime import datetime
 import uuid
 
+import numpy as np
+
 from sqlalchemy.sql.functions import current_date
 
 from coreutils.object import (ModifyRequest, CancelRequest,
@@ -10,6 +12,13 @@ from coreutils.object import (ModifyRequest, CancelRequest,
                               TradeData, PositionData)
 
 from coreutils.constant import Direction, OrderType, OrderStatus
+from backtest.order_book import OrderBook, MARKET_TYPES
+from backtest.tick_store import TickStore, TICK_BUY, TICK_SELL
+from backtest.intrabar import IntrabarPath
+# 逐笔撮合时向后搜索可能成交的成交笔数，窗口逐步放大
+_TICK_WINDOW = 256
+_MAX_TICK_WINDOW = 1 << 20
+
 
 class BacktestGateway:
     """
@@ -19,7 +28,7 @@ class BacktestGateway:
     3. 通过回调通知 Gateway：订单状态变化、成交回报。
 
     特点：
-    - 支持多标的，每个 symbol 独立维护订单簿。
+    - 支持多标的，每个 symbol 独立维护订单簿，另有按价格排序的索引（OrderBook），每根 bar 只检查可能成交的订单。
     - 不涉及资金计算（资金管理在 BacktestEngine）。
     - 不处理滑点、手续费逻辑（可扩展）。
     - 核心是订单生命周期管理 + 撮合逻辑。
@@ -40,6 +49,17 @@ class BacktestGateway:
         # 待激活订单：{symbol: {orderid: OrderData}}
         self.inactive_orders: dict[str, dict[str, OrderData]] = {}
 
+        # 价格索引：{symbol: OrderBook}，seq 为订单进入上面两个字典的顺序
+        self._books: dict[str, OrderBook] = {}
+        self._seq = 0
+
+        # 逐笔撮合：限价单前面排队的成交量 {orderid: volume}；initial_queue 为挂单时假定已在前面排队的量
+        self._queue_ahead: dict[str, float] = {}
+        self.initial_queue = 0.0
+
+        # bar 内价格路径（backtest.intrabar.IntrabarPath），None 时按下单顺序撮合
+        self.intrabar_path: IntrabarPath | None = None
+
         # 回测引擎
         self.backtest_engine = backtest_engine
 
@@ -63,12 +83,16 @@ class BacktestGateway:
         if symbol not in self.inactive_orders:
             self.inactive_orders[symbol] = {}
 
+        book = self._book(symbol)
         if order.type in [OrderType.LIMIT, OrderType.MARKET]:
             order.status = OrderStatus.SUBMITTING
             self.active_orders[symbol][orderid] = order
+            book.add_active(order, self._next_seq())
+            self._queue_ahead[orderid] = self.initial_queue
         elif order.type in [OrderType.STP_LMT, OrderType.STP_MKT]:
             order.status = OrderStatus.PENDING
             self.inactive_orders[symbol][orderid] = order
+            book.add_inactive(order, self._next_seq())
 
         self.on_order(order)
         return orderid
@@ -83,9 +107,12 @@ class BacktestGateway:
             order = self.active_orders[symbol].pop(oid)
         elif oid in self.inactive_orders.get(symbol, {}):
             order = self.inactive_orders[symbol].pop(oid)
+        if order:
+            self._book(symbol).remove(oid)
+            self._queue_ahead.pop(oid, None)
 
         if order and order.status not in [OrderStatus.ALLTRADED, OrderStatus.ALLCANCELLED]:
-            order.status = OrderStatus.ALLCANCELLED
+            order.status = OrderStatus.PARTCANCELLED if order.traded else OrderStatus.ALLCANCELLED
             order.datetime = self.current_date
             self.on_order(order)
 
@@ -128,6 +155,10 @@ class BacktestGateway:
         order.trigger_price = req.trigger_price
         order.status = OrderStatus.MODIFIED
         order.datetime = self.current_date
+        self._book(symbol).reindex(order, active=oid in self.active_orders.get(symbol, {}))
+        # 改单后重新排队
+        if oid in self._queue_ahead:
+            self._queue_ahead[oid] = self.initial_queue
 
         self.on_order(order)
 
@@ -135,24 +166,29 @@ class BacktestGateway:
         """
         撮合逻辑：
         - 只处理 bar.symbol 对应的订单。
+        - 由价格索引取出 [low, high] 可能触及的订单，按下单顺序逐个判断，成交规则不变。
+        - 设置了 intrabar_path 时改为沿 bar 内价格路径撮合（_match_path）。
         """
         symbol = bar.symbol
         self.current_date = bar.datetime
+        book = self._books.get(symbol)
+        if not book:
+            return
+        if self.intrabar_path is not None:
+            self._match_path(symbol, book, self.intrabar_path.path(bar))
+            return
         # Step 1: 激活止损单
-        for oid, order in list(self.inactive_orders.get(symbol, {}).items()):
-            if self._stop_trigger(order, bar):
-                order.status = OrderStatus.PENDING
-                order.datetime = self.current_date
-                # 记录触发在哪根bar
-                order.triggered_bar = bar.datetime
-
-                self.active_orders[symbol][oid] = order
-                del self.inactive_orders[symbol][oid]
-                self.on_order(order)
+        inactive = self.inactive_orders.setdefault(symbol, {})
+        for oid in book.scan(book.stop_candidates(bar.high_price, bar.low_price), self._seq):
+            order = inactive.get(oid)
+            if order is not None and self._stop_trigger(order, bar):
+                self._activate(symbol, book, order)
 
         # Step 2: 撮合激活订单
-        for oid, order in list(self.active_orders.get(symbol, {}).items()):
-            if order.status in [OrderStatus.ALLTRADED, OrderStatus.ALLCANCELLED]:
+        active = self.active_orders.setdefault(symbol, {})
+        for oid in book.scan(book.fill_candidates(bar.high_price, bar.low_price), self._seq):
+            order = active.get(oid)
+            if order is None or order.status in [OrderStatus.ALLTRADED, OrderStatus.ALLCANCELLED]:
                 continue
 
             if order.type in [OrderType.MARKET, OrderType.STP_MKT]:
@@ -162,12 +198,12 @@ class BacktestGateway:
                     close_price = min(order.trigger_price, bar.open_price)
 
                 self._fill_order(order, close_price)
-                del self.active_orders[symbol][oid]
+                self._remove_active(symbol, oid)
 
             elif order.type in [OrderType.ABS_LMT]:
                 if self._can_fill_absolute(order, bar):
                     self._fill_order(order, order.price)
-                    del self.active_orders[symbol][oid]
+                    self._remove_active(symbol, oid)
 
             elif order.type in [OrderType.LIMIT, OrderType.STP_LMT]:
                 if self._can_fill(order, bar):
@@ -178,7 +214,105 @@ class BacktestGateway:
                     else:
                         # 普通限价逻辑（允许开盘成交）
                         self._fill_order(order, self._get_fill_price(order, bar))
-                    del self.active_orders[symbol][oid]
+                    self._remove_active(symbol, oid)
+
+    def _match_path(self, symbol: str, book: OrderBook, path: list[tuple[float, bool]]):
+        """
+        沿 bar 内价格路径撮合（路径模型见 backtest.intrabar）：
+        - 跳空点（开盘）：触发所有已越过触发价的止损，按该价格成交所有可成交订单
+        - 连续段：用价格索引逐个取出途经的价位，按价位先后触发止损、成交限价，同一价位内按下单顺序
+        本根 bar 开始之后新下的订单不参与撮合，本根 bar 内触发的止损单参与。
+        """
+        cutoff = self._seq
+        triggered: set[str] = set()
+        current = None
+        for price, gap in path:
+            if gap or current is None:
+                self._match_price(symbol, book, price, True, cutoff, triggered)
+            elif price > current:
+                level = book.next_above(current)
+                while level is not None and level <= price:
+                    self._match_price(symbol, book, level, False, cutoff, triggered)
+                    level = book.next_above(level)
+            elif price < current:
+                level = book.next_below(current)
+                while level is not None and level >= price:
+                    self._match_price(symbol, book, level, False, cutoff, triggered)
+                    level = book.next_below(level)
+            current = price
+
+    def _match_price(self, symbol: str, book: OrderBook, price: float, gap: bool, cutoff: int,
+                     triggered: set[str]):
+        """价格到达 price 时撮合：gap 为 True 时限价单按 price 成交，否则按限价成交"""
+        inactive = self.inactive_orders.setdefault(symbol, {})
+        for oid in book.scan(book.stop_candidates(price, price), cutoff):
+            order = inactive.get(oid)
+            if order is not None and (price >= order.trigger_price if order.direction == Direction.LONG
+                                      else price <= order.trigger_price):
+                self._activate(symbol, book, order)
+                triggered.add(oid)
+
+        active = self.active_orders.setdefault(symbol, {})
+        for oid in book.scan(book.fill_candidates(price, price), self._seq):
+            order = active.get(oid)
+            if order is None or (book.seqs[oid] > cutoff and oid not in triggered):
+                continue
+            long = order.direction == Direction.LONG
+            if order.type == OrderType.MARKET:
+                fill_price = price
+            elif order.type == OrderType.STP_MKT:
+                fill_price = max(order.trigger_price, price) if long else min(order.trigger_price, price)
+            elif order.type == OrderType.ABS_LMT:
+                if price != order.price:
+                    continue
+                fill_price = price
+            elif price <= order.price if long else price >= order.price:
+                # 当根 bar 触发的 STP_LMT 与默认撮合一致按限价成交
+                fill_price = price if gap and oid not in triggered else order.price
+            else:
+                continue
+            self._fill_order(order, fill_price)
+            self._remove_active(symbol, oid)
+
+    def _activate(self, symbol: str, book: OrderBook, order: OrderData):
+        """止损单触发：移入 active_orders，按新的 seq 加入价格索引"""
+        oid = order.orderid
+        order.status = OrderStatus.PENDING
+        order.datetime = self.current_date
+        # 记录触发在哪根bar
+        order.triggered_bar = self.current_date
+
+        self.active_orders[symbol][oid] = order
+        del self.inactive_orders[symbol][oid]
+        book.remove(oid)
+        book.add_active(order, self._next_seq())
+        self._queue_ahead[oid] = self.initial_queue
+        self.on_order(order)
+
+    def _book(self, symbol: str) -> OrderBook:
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = OrderBook()
+        return book
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _remove_active(self, symbol: str, oid: str):
+        self.active_orders[symbol].pop(oid, None)
+        self._books[symbol].remove(oid)
+        self._queue_ahead.pop(oid, None)
+
+    def _rebuild_books(self):
+        """按字典中的顺序重建价格索引"""
+        self._books = {}
+        for symbol, orders in self.active_orders.items():
+            for order in orders.values():
+                self._book(symbol).add_active(order, self._next_seq())
+        for symbol, orders in self.inactive_orders.items():
+            for order in orders.values():
+                self._book(symbol).add_inactive(order, self._next_seq())
 
     def _stop_trigger(self, order: OrderData, bar: BarData) -> bool:
         return (order.direction == Direction.LONG and bar.high_price >= order.trigger_price) or \
@@ -206,10 +340,18 @@ class BacktestGateway:
     def _can_fill_absolute(self, order: OrderData, bar: BarData) -> bool:
         return bar.low_price <= order.price <= bar.high_price
 
-    def _fill_order(self, order: OrderData, price: float):
-        order.status = OrderStatus.ALLTRADED
-        order.traded = order.volume
-        order.avgFillPrice = price
+    def _fill_order(self, order: OrderData, price: float, volume: float | None = None):
+        """
+        成交 volume（默认为剩余未成交数量）；部分成交时订单状态为 PARTTRADED。
+        TradeData.volume 为本次成交数量（BacktestOms 按它记账），traded / avgFillPrice 为订单累计成交量和均价
+        """
+        previous = order.traded
+        if volume is None:
+            volume = order.volume - previous
+        order.traded = previous + volume
+        order.avgFillPrice = price if not previous else \
+            (order.avgFillPrice * previous + price * volume) / order.traded
+        order.status = OrderStatus.ALLTRADED if order.traded >= order.volume else OrderStatus.PARTTRADED
         order.datetime = self.current_date
 
         trade = TradeData(
@@ -220,11 +362,11 @@ class BacktestGateway:
             direction=order.direction,
             offset=order.offset,
             price=price,
-            volume=order.volume,
-            traded=order.volume,
-            avgFillPrice=price,
+            volume=volume,
+            traded=order.traded,
+            avgFillPrice=order.avgFillPrice,
             datetime=order.datetime,
-            status=OrderStatus.ALLTRADED,
+            status=order.status,
             gateway_name=self.gateway_name, reference=order.reference
         )
 
@@ -232,8 +374,110 @@ class BacktestGateway:
         self.on_order(order)
         position_data = PositionData(symbol=order.symbol,
                                      exchange=order.exchange,
-                                     direction=order.direction, volume=order.volume, gateway_name=self.gateway_name)
+                                     direction=order.direction, volume=volume, gateway_name=self.gateway_name)
         self.on_position(position_data)
+
+    # =========================
+    # 逐笔撮合
+    # =========================
+    def on_ticks(self, ticks: TickStore, start: int, stop: int):
+        """
+        用 ticks 中 [start, stop) 的逐笔成交撮合 ticks.symbol 的订单：
+        - 止损单：成交价触及触发价后激活，从下一笔开始撮合
+        - 市价单：按每笔成交价成交，数量不超过该笔成交量，可以分多笔成交
+        - 限价单：成交价穿过限价时按限价成交；成交价等于限价时，只有对手方主动成交（买单遇主动卖、
+          卖单遇主动买，中性都算）才会先消耗排在前面的量，剩余部分才轮到本订单
+        - 同一笔成交的量按下单顺序在本方订单之间分配
+        不会触及任何订单的成交用 NumPy 整段跳过，只在可能成交的那几笔上逐笔处理。
+        """
+        symbol = ticks.symbol
+        book = self._books.get(symbol)
+        price, volume, direction = ticks.price, ticks.volume, ticks.direction
+        i = start
+        while i < stop and book:
+            i = self._next_tick(book, price, i, stop)
+            if i >= stop:
+                break
+            self.current_date = ticks.to_datetime(int(ticks.datetime[i]))
+            self._match_tick(symbol, book, float(price[i]), float(volume[i]), int(direction[i]))
+            i += 1
+
+    @staticmethod
+    def _next_tick(book: OrderBook, price: np.ndarray, start: int, stop: int) -> int:
+        """从 start 开始第一笔可能触及订单的成交（价格不高于最高买价/空头触发价，或不低于最低卖价/多头触发价）"""
+        if book.market or book.absolute:
+            return start
+        low = max(book.limit_long[-1][0] if book.limit_long else -np.inf,
+                  book.stop_short[-1][0] if book.stop_short else -np.inf)
+        high = min(book.limit_short[0][0] if book.limit_short else np.inf,
+                   book.stop_long[0][0] if book.stop_long else np.inf)
+        window = _TICK_WINDOW
+        i = start
+        while i < stop:
+            end = min(stop, i + window)
+            segment = price[i:end]
+            hit = np.flatnonzero((segment <= low) | (segment >= high))
+            if len(hit):
+                return i + int(hit[0])
+            i = end
+            window = min(window * 4, _MAX_TICK_WINDOW)
+        return stop
+
+    def _match_tick(self, symbol: str, book: OrderBook, price: float, volume: float, side: int):
+        # 止损单激活，本笔成交不再用于撮合刚激活的订单
+        cutoff = self._seq
+        inactive = self.inactive_orders.setdefault(symbol, {})
+        active = self.active_orders.setdefault(symbol, {})
+        for oid in book.scan(book.stop_candidates(price, price), self._seq):
+            order = inactive.get(oid)
+            if order is None:
+                continue
+            if (order.direction == Direction.LONG and price >= order.trigger_price) or \
+                    (order.direction == Direction.SHORT and price <= order.trigger_price):
+                self._activate(symbol, book, order)
+
+        # 买卖双方各自可用的成交量
+        available = {Direction.LONG: volume, Direction.SHORT: volume}
+        for oid in book.scan(book.fill_candidates(price, price), cutoff):
+            order = active.get(oid)
+            if order is None or order.status in [OrderStatus.ALLTRADED, OrderStatus.ALLCANCELLED]:
+                continue
+            long = order.direction == Direction.LONG
+            remaining = order.volume - order.traded
+            fill_price = order.price
+            if order.type in MARKET_TYPES:
+                quantity = min(remaining, available[order.direction])
+                fill_price = price
+            elif order.type == OrderType.ABS_LMT:
+                quantity = min(remaining, available[order.direction]) if order.price == price else 0
+            elif (long and order.price > price) or (not long and order.price < price):
+                # 成交价穿过限价，排队的量已经全部成交
+                quantity = min(remaining, available[order.direction])
+            elif order.price == price and side != (TICK_BUY if long else TICK_SELL):
+                ahead = self._queue_ahead.get(oid, 0.0)
+                self._queue_ahead[oid] = max(ahead - volume, 0.0)
+                quantity = min(remaining, available[order.direction], max(volume - ahead, 0.0))
+            else:
+                quantity = 0
+            if quantity <= 0:
+                continue
+            available[order.direction] -= quantity
+            self._fill_order(order, fill_price, quantity)
+            if order.status == OrderStatus.ALLTRADED:
+                self._remove_active(symbol, oid)
+
+    def get_state(self) -> dict:
+        """检查点：未完成订单簿、逐笔排队量和当前时间"""
+        return {'active_orders': self.active_orders, 'inactive_orders': self.inactive_orders,
+                'queue_ahead': self._queue_ahead, 'current_date': self.current_date}
+
+    def set_state(self, state: dict):
+        self.active_orders = state['active_orders']
+        self.inactive_orders = state['inactive_orders']
+        self._queue_ahead = state.get('queue_ahead', {})
+        self.current_date = state['current_date']
+        self._rebuild_books()
+
     def get_orders(self) -> list[OrderData]:
         """返回所有未完成订单"""
         orders = []
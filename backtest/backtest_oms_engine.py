@@ -13,8 +13,9 @@ class BacktestOms(OmsBase):
     - 支持卖空、翻仓、均价计算、保证金管理
     """
 
-    def __init__(self, event_engine: BacktestEventEngine = BacktestEventEngine(), initial_cash: float = 1_000_000):
-        super().__init__(event_engine)
+    def __init__(self, event_engine: BacktestEventEngine | None = None, initial_cash: float = 1_000_000):
+        # BacktestEngine 直接调用 process_*_event，不传 event_engine 时使用独立的事件引擎
+        super().__init__(event_engine if event_engine is not None else BacktestEventEngine())
 
         self.gateway_name = 'BACKTEST'
 
@@ -34,6 +35,9 @@ class BacktestOms(OmsBase):
         self.short_rates: dict[str, float] = {}
         self.margin_rates: dict[str, float] = {}  # 保证金率
 
+        # 多策略回测时各策略的子账户 {策略名: BacktestOms}，本账户记全部成交，即组合账户
+        self.sub_accounts: dict[str, BacktestOms] = {}
+
     def set_contract_params(
             self, symbol: str, size: float = 1, long_rate: float = 0, short_rate: float = 0, margin_rate: float = 0
     ):
@@ -43,6 +47,17 @@ class BacktestOms(OmsBase):
         self.short_rates[symbol] = short_rate
         self.margin_rates[symbol] = margin_rate
 
+    def add_sub_account(self, name: str, initial_cash: float) -> "BacktestOms":
+        """策略子账户：独立的持仓、资金和成交记录，合约参数与组合账户共用同一份"""
+        sub = BacktestOms(initial_cash=initial_cash)
+        self._share_contract_params(sub)
+        self.sub_accounts[name] = sub
+        return sub
+
+    def _share_contract_params(self, sub: "BacktestOms"):
+        sub.sizes, sub.long_rates, sub.short_rates, sub.margin_rates = \
+            self.sizes, self.long_rates, self.short_rates, self.margin_rates
+
     def process_trade_event(self, event: Event):
         # 原生oms
         trade: TradeData = event.data
@@ -152,5 +167,22 @@ class BacktestOms(OmsBase):
                 contract_info = self.contracts_log.get(symbol)
                 contract_info['unrealized_pnl'] = float_pnl
 
+    # 检查点需要保存的状态（订单、成交、持仓、账户和合约参数）
+    STATE_FIELDS = ('orders', 'trades', 'positions', 'accounts', 'active_orders', 'contracts_log', 'trade_log',
+                    'sizes', 'long_rates', 'short_rates', 'margin_rates')
+
+    def get_state(self) -> dict:
+        state = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        state['sub_accounts'] = {name: sub.get_state() for name, sub in self.sub_accounts.items()}
+        return state
+
+    def set_state(self, state: dict):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state[name])
+        for name, sub_state in state.get('sub_accounts', {}).items():
+            sub = self.sub_accounts.get(name) or self.add_sub_account(name, 0)
+            sub.set_state(sub_state)
+            self._share_contract_params(sub)
+
     def get_trades(self) -> list[TradeData]:
         return self.trade_log
@@ -0,0 +1,431 @@
+"""
+列式K线存储 BarStore
+
+回测历史数据不再逐行转成 BarData 对象，而是保存成若干连续的 NumPy 列：
+- datetime / end_date: int64 纳秒时间戳
+- open / high / low / close / volume: float64
+- symbol_id / interval_id: 指向 symbols / intervals 表的整数编码
+
+数据按“数据源”（同一 symbol + 同一 interval）连续存放，每个数据源内部按时间升序。
+回测时对各数据源做 k 路堆归并，按 (end_date, interval) 的全局顺序懒加载，只在分发的那一刻才生成当前 BarData。
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+import sys
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+
+from coreutils.constant import Interval, Exchange
+from coreutils.object import BarData
+
+REQUIRED_COLUMNS = {'symbol', 'open', 'high', 'low', 'close', 'datetime', 'ktype'}
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+ARRAY_COLUMNS = ('datetime', 'end_date') + PRICE_COLUMNS + ('symbol_id', 'interval_id')
+
+# 逐块把数组转成 python 标量，避免一次性生成整段 list；多数据源归并时按数据源个数均分
+_ITER_CHUNK = 65_536
+_MIN_MERGE_CHUNK = 256
+
+
+class BarStore:
+    """
+    多标的、多周期的列式K线存储。
+
+    - sources: [(symbol_id, interval_id, start, stop)]，每个数据源在列中的行区间
+    - order: 全局回放顺序（按 end_date、interval 升序）的行号，只在向量化计算需要时才排序生成；
+             逐根回放用 iter_bars 的 k 路归并，不需要全局排序
+    """
+
+    def __init__(self, datetime: np.ndarray, end_date: np.ndarray,
+                 open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                 symbol_id: np.ndarray, interval_id: np.ndarray,
+                 symbols: list[str], intervals: list[Interval],
+                 sources: list[tuple[int, int, int, int]], order: np.ndarray | None = None, tz=None):
+        self.datetime = datetime
+        self.end_date = end_date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.symbol_id = symbol_id
+        self.interval_id = interval_id
+
+        self.symbols = symbols
+        self.intervals = intervals
+        self.sources = sources
+        self.tz = tz
+
+        self._order = order
+        self._fingerprint: str | None = None
+
+    @property
+    def order(self) -> np.ndarray:
+        if self._order is None:
+            # lexsort 以最后一个 key 为主键：先 end_date，再 interval，相同时按行号（与归并顺序一致）
+            self._order = np.lexsort((self.interval_id, self.end_date))
+        return self._order
+
+    # =========================
+    # 构造
+    # =========================
+    @classmethod
+    def from_frames(cls, data_list: list[pd.DataFrame]) -> "BarStore":
+        """
+        data_list 中每个 DataFrame 至少包含 'symbol','open','high','low','close','datetime','ktype'，
+        可选 'volume'。一个 DataFrame 内若混有多个 symbol/ktype，会按 (symbol, ktype) 拆成多个数据源。
+        """
+        symbols: list[str] = []
+        frames = []
+        tz = None
+        for data in data_list:
+            if not REQUIRED_COLUMNS.issubset(data.columns):
+                raise ValueError(f"loaded data must have columns {REQUIRED_COLUMNS}")
+            if data.empty:
+                continue
+            if not isinstance(data['ktype'].iloc[0], Interval):
+                raise TypeError("ktype data must be Interval")
+
+            if _is_mixed(data['symbol']) or _is_mixed(data['ktype']):
+                groups = [g for _, g in data.groupby(['symbol', 'ktype'], sort=False)]
+            else:
+                groups = [data]
+
+            for g in groups:
+                dt = pd.to_datetime(g['datetime'], errors='coerce')
+                if dt.dt.tz is not None:
+                    tz = dt.dt.tz
+                    dt = dt.dt.tz_convert(None)
+                frames.append((g, dt))
+                symbol = g['symbol'].iloc[0]
+                if symbol not in symbols:
+                    symbols.append(symbol)
+
+        intervals = sorted({g['ktype'].iloc[0] for g, _ in frames})
+        columns = {name: [] for name in ('datetime', 'end_date') + PRICE_COLUMNS + ('symbol_id', 'interval_id')}
+        sources = []
+        start = 0
+        for g, dt in frames:
+            dt64 = dt.to_numpy(dtype='datetime64[ns]')
+            valid = ~np.isnat(dt64)
+            ns = dt64[valid].view(np.int64)
+            prices = {name: g[name].to_numpy(dtype=np.float64)[valid] if name in g.columns
+                      else np.zeros(valid.sum()) for name in PRICE_COLUMNS}
+            if len(ns) > 1 and np.any(np.diff(ns) < 0):
+                sort_idx = np.argsort(ns, kind='stable')
+                ns = ns[sort_idx]
+                prices = {name: col[sort_idx] for name, col in prices.items()}
+
+            # end_date = 下一根bar开始时间 - 1s，最后一根没有 end_date，直接丢弃（与原 dropna 行为一致）
+            end_date = ns[1:] - 1_000_000_000
+            n = len(end_date)
+            if n == 0:
+                continue
+            columns['datetime'].append(ns[:-1])
+            columns['end_date'].append(end_date)
+            for name in PRICE_COLUMNS:
+                columns[name].append(prices[name][:-1])
+
+            symbol_id = symbols.index(g['symbol'].iloc[0])
+            interval_id = intervals.index(g['ktype'].iloc[0])
+            columns['symbol_id'].append(np.full(n, symbol_id, dtype=np.int32))
+            columns['interval_id'].append(np.full(n, interval_id, dtype=np.int16))
+            sources.append((symbol_id, interval_id, start, start + n))
+            start += n
+
+        if not sources:
+            raise ValueError("data_list contains no usable bars")
+
+        arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+        return cls(symbols=symbols, intervals=intervals, sources=sources, tz=tz, **arrays)
+
+    @classmethod
+    def from_bar_file(cls, bar_file, start=None, end=None) -> "BarStore":
+        """
+        由 data.bar_file.BarFile 构建，只取 [start, end) 内的 bar。
+        单标的文件的 datetime 和价格列直接是 memmap 记录的视图（零拷贝，多进程共享页缓存），
+        只有 end_date 和编码列需要新分配；多标的文件按标的重排，会拷贝一次。
+        """
+        records = bar_file.records
+        lo, hi = bar_file.index_range(start, end)
+        # 多取一根用来确定最后一根的 end_date；文件最后一根没有 end_date，丢弃
+        view = records[lo:min(hi + 1, len(records))]
+        if len(view) < 2:
+            raise ValueError(f"{bar_file.path} has no usable bars in [{start}, {end})")
+
+        symbol_ids = np.unique(view['symbol_id'])
+        if len(symbol_ids) == 1:
+            groups = [(int(symbol_ids[0]), view)]
+        else:
+            # 多标的：区间内每个标的最后一根只有在多取的那一根正好属于它时才能确定 end_date
+            in_range, extra = view[:hi - lo], view[hi - lo:]
+            groups = []
+            for symbol_id in symbol_ids:
+                rows = in_range[in_range['symbol_id'] == symbol_id]
+                if len(extra) and extra['symbol_id'][0] == symbol_id:
+                    rows = np.concatenate([rows, extra])
+                groups.append((int(symbol_id), rows))
+
+        symbols = [bar_file.symbols[symbol_id] for symbol_id, _ in groups]
+        columns = {name: [] for name in ('datetime', 'end_date') + PRICE_COLUMNS + ('symbol_id', 'interval_id')}
+        sources = []
+        row = 0
+        for k, (_, rows) in enumerate(groups):
+            count = len(rows) - 1
+            if count <= 0:
+                continue
+            columns['datetime'].append(rows['datetime'][:count])
+            columns['end_date'].append(rows['datetime'][1:count + 1] - 1_000_000_000)
+            for name in PRICE_COLUMNS:
+                columns[name].append(rows[name][:count])
+            columns['symbol_id'].append(np.full(count, k, dtype=np.int32))
+            columns['interval_id'].append(np.zeros(count, dtype=np.int16))
+            sources.append((k, 0, row, row + count))
+            row += count
+        if not sources:
+            raise ValueError(f"{bar_file.path} has no usable bars in [{start}, {end})")
+        arrays = {name: parts[0] if len(parts) == 1 else np.concatenate(parts) for name, parts in columns.items()}
+        return cls(symbols=symbols, intervals=[bar_file.interval], sources=sources, **arrays)
+
+    @classmethod
+    def concat(cls, stores: list["BarStore"]) -> "BarStore":
+        """合并多个 BarStore（重新编码 symbol/interval，并重算全局顺序）"""
+        symbols: list[str] = []
+        intervals = sorted({iv for s in stores for iv in s.intervals})
+        for s in stores:
+            for symbol in s.symbols:
+                if symbol not in symbols:
+                    symbols.append(symbol)
+
+        columns = {name: [] for name in ('datetime', 'end_date') + PRICE_COLUMNS + ('symbol_id', 'interval_id')}
+        sources = []
+        offset = 0
+        for s in stores:
+            symbol_map = np.array([symbols.index(x) for x in s.symbols], dtype=np.int32)
+            interval_map = np.array([intervals.index(x) for x in s.intervals], dtype=np.int16)
+            for name in ('datetime', 'end_date') + PRICE_COLUMNS:
+                columns[name].append(getattr(s, name))
+            columns['symbol_id'].append(symbol_map[s.symbol_id])
+            columns['interval_id'].append(interval_map[s.interval_id])
+            for symbol_id, interval_id, start, stop in s.sources:
+                sources.append((int(symbol_map[symbol_id]), int(interval_map[interval_id]),
+                                start + offset, stop + offset))
+            offset += len(s)
+
+        arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+        return cls(symbols=symbols, intervals=intervals, sources=sources, tz=stores[0].tz, **arrays)
+
+    # =========================
+    # 持久化
+    # =========================
+    def save(self, path: str):
+        """
+        每列保存为一个 .npy 文件，symbol/interval 表等元数据保存为 meta.json。
+        其他进程可以用 BarStore.load(path, mmap=True) 共享同一份页缓存，而不是各自 pickle 一份。
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        meta = {
+            "symbols": self.symbols,
+            "intervals": [iv.name for iv in self.intervals],
+            "sources": [list(src) for src in self.sources],
+            "tz": str(self.tz) if self.tz is not None else None,
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BarStore":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_COLUMNS}
+        return cls(symbols=meta["symbols"], intervals=[Interval[name] for name in meta["intervals"]],
+                   sources=[tuple(src) for src in meta["sources"]], tz=meta["tz"], **arrays)
+
+    # =========================
+    # 查询
+    # =========================
+    def __len__(self) -> int:
+        return len(self.datetime)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_COLUMNS)
+
+    def fingerprint(self) -> str:
+        """全部列和 symbol/interval 表的内容哈希（回测结果缓存的键），算一次后保存"""
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=20)
+            h.update(json.dumps([self.symbols, [iv.name for iv in self.intervals], [list(src) for src in self.sources],
+                                 str(self.tz) if self.tz is not None else None]).encode("utf-8"))
+            for name in ARRAY_COLUMNS:
+                column = np.ascontiguousarray(getattr(self, name))
+                h.update(name.encode("ascii"))
+                h.update(column.dtype.str.encode("ascii"))
+                h.update(memoryview(column).cast("B"))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def source_rows(self, symbol: str | None = None, interval: Interval | None = None) -> np.ndarray:
+        """返回符合条件的数据源行号（数据源内部按时间升序，多个数据源按存放顺序拼接）"""
+        parts = []
+        for symbol_id, interval_id, start, stop in self.sources:
+            if symbol is not None and self.symbols[symbol_id] != symbol:
+                continue
+            if interval is not None and self.intervals[interval_id] != interval:
+                continue
+            parts.append(np.arange(start, stop))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def to_ns(self, value) -> int:
+        """时间（str / datetime / Timestamp）转成与 datetime 列同一基准的 int64 纳秒"""
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        elif self.tz is not None:
+            ts = ts.tz_localize(self.tz).tz_convert('UTC').tz_localize(None)
+        return ts.value
+
+    def slice_time(self, start=None, end=None) -> "BarStore":
+        """
+        截取 datetime 落在 [start, end) 的 bar，返回新的 BarStore。
+        每个数据源用二分查找定位行区间；原 order 已生成时直接过滤，不重新排序。
+        """
+        start_ns = self.to_ns(start) if start is not None else None
+        end_ns = self.to_ns(end) if end is not None else None
+        ranges = []
+        for symbol_id, interval_id, a, b in self.sources:
+            dt = self.datetime[a:b]
+            lo = a + (int(np.searchsorted(dt, start_ns, side='left')) if start_ns is not None else 0)
+            hi = a + (int(np.searchsorted(dt, end_ns, side='left')) if end_ns is not None else b - a)
+            ranges.append((symbol_id, interval_id, lo, hi))
+        return self._subset(ranges)
+
+    def after(self, end_date: int, interval: Interval) -> "BarStore":
+        """
+        全局回放顺序中排在 (end_date, interval) 之后的 bar，用于从检查点继续回放。
+        数据源内 interval 固定，每个数据源一次二分查找即可。
+        """
+        ranges = []
+        for symbol_id, interval_id, a, b in self.sources:
+            side = 'right' if self.intervals[interval_id] <= interval else 'left'
+            lo = a + int(np.searchsorted(self.end_date[a:b], end_date, side=side))
+            ranges.append((symbol_id, interval_id, lo, b))
+        return self._subset(ranges)
+
+    def replay_key(self, position: int) -> tuple[int, Interval]:
+        """全局回放顺序中第 position 根 bar 的 (end_date, interval)"""
+        row = self.order[position]
+        return int(self.end_date[row]), self.intervals[self.interval_id[row]]
+
+    def _subset(self, ranges: list[tuple[int, int, int, int]]) -> "BarStore":
+        """按每个数据源的行区间 [lo, hi) 取子集"""
+        keep = np.zeros(len(self), dtype=bool)
+        ranges = [(symbol_id, interval_id, lo, hi) for symbol_id, interval_id, lo, hi in ranges if hi > lo]
+        for _, _, lo, hi in ranges:
+            keep[lo:hi] = True
+
+        # 原行号 -> 新行号
+        new_index = np.cumsum(keep) - 1
+        order = new_index[self._order[keep[self._order]]] if self._order is not None else None
+        sources = []
+        for symbol_id, interval_id, lo, hi in ranges:
+            sources.append((symbol_id, interval_id, int(new_index[lo]), int(new_index[hi - 1]) + 1))
+        arrays = {name: np.ascontiguousarray(getattr(self, name)[keep])
+                  for name in ('datetime', 'end_date') + PRICE_COLUMNS + ('symbol_id', 'interval_id')}
+        return BarStore(symbols=list(self.symbols), intervals=list(self.intervals), sources=sources,
+                        order=order, tz=self.tz, **arrays)
+
+    def to_datetime(self, ns: np.ndarray) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(ns.astype('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
+
+    def to_frame(self, symbol: str | None = None, interval: Interval | None = None) -> pd.DataFrame:
+        """导出为 DataFrame（列与 load_data 的输入保持一致），按全局回放顺序排列"""
+        rows = self.order
+        if symbol is not None or interval is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[self.source_rows(symbol, interval)] = True
+            rows = rows[mask[rows]]
+
+        symbols = np.array(self.symbols, dtype=object)
+        intervals = np.array(self.intervals, dtype=object)
+        return pd.DataFrame({
+            'symbol': symbols[self.symbol_id[rows]],
+            'datetime': self.to_datetime(self.datetime[rows]),
+            'open': self.open[rows],
+            'high': self.high[rows],
+            'low': self.low[rows],
+            'close': self.close[rows],
+            'volume': self.volume[rows],
+            'ktype': intervals[self.interval_id[rows]],
+            'end_date': self.to_datetime(self.end_date[rows]),
+        })
+
+    # =========================
+    # 回放
+    # =========================
+    def iter_bars(self, gateway_name: str, exchange: Exchange = Exchange.HKFE) -> Iterator[BarData]:
+        """
+        按全局顺序懒加载 BarData。
+        各数据源内部已按时间升序，用堆做 k 路归并，键为 (end_date, interval, 行号)，与 order 的排序结果一致；
+        除数据源本身外只占用 O(k) 的堆和每个数据源一小块已转换的行，第一根 bar 立即可用。
+        """
+        symbols = self.symbols
+        intervals = self.intervals
+        if len(self.sources) == 1:
+            merged = self._source_rows_iter(*self.sources[0][2:], _ITER_CHUNK)
+        else:
+            chunk = max(_MIN_MERGE_CHUNK, _ITER_CHUNK // max(len(self.sources), 1))
+            merged = heapq.merge(*(self._source_rows_iter(start, stop, chunk) for _, _, start, stop in self.sources))
+        for _, interval_id, _, dt, symbol_id, open_price, high_price, low_price, close_price, volume in merged:
+            yield BarData(
+                symbol=symbols[symbol_id],
+                exchange=exchange,
+                datetime=dt,
+                interval=intervals[interval_id],
+                volume=volume,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                gateway_name=gateway_name,
+            )
+
+    def _source_rows_iter(self, start: int, stop: int, chunk: int) -> Iterator[tuple]:
+        """单个数据源逐块转成 (end_date, interval_id, 行号, datetime, symbol_id, open, high, low, close, volume)"""
+        for pos in range(start, stop, chunk):
+            end = min(pos + chunk, stop)
+            yield from zip(self.end_date[pos:end].tolist(), self.interval_id[pos:end].tolist(), range(pos, end),
+                           self.to_datetime(self.datetime[pos:end]).to_list(), self.symbol_id[pos:end].tolist(),
+                           self.open[pos:end].tolist(), self.high[pos:end].tolist(), self.low[pos:end].tolist(),
+                           self.close[pos:end].tolist(), self.volume[pos:end].tolist())
+
+
+def _is_mixed(column: pd.Series) -> bool:
+    """列里是否不止一个取值（直接与首值比较，比 nunique 对枚举逐个求 hash 快得多）"""
+    values = column.to_numpy()
+    return bool((values != values[0]).any())
+
+
+def peak_rss_mb() -> float | None:
+    """进程内存峰值(MB)，Windows 下没有 resource 模块时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位是字节，Linux 是 KB
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
@@ -0,0 +1,133 @@
+"""
+流式K线数据 BarStream
+
+把多个按时间升序分块读取的数据源（同一 symbol + 同一 interval，例如 mhi_1m、mhi_15m 表）
+按 end_date 边读边合并，逐块产出 BarStore，供 BacktestEngine.run_stream 回放。
+
+- 每个数据源只缓存当前块和一根待定 bar（end_date 需要等下一根 bar 的开始时间才能确定）
+- 各数据源已确定 end_date 的 bar 中，取各源最后一根 end_date 的最小值为水位线，
+  只输出 end_date 不超过水位线的 bar，保证跨块的全局顺序与一次性加载完全一致
+- 峰值内存由 chunksize 决定，与数据总长度无关
+
+用法示例：
+-----------
+stream = BarStream.from_db(db_name='HKEX', symbol='HK.MHImain',
+                           tables={Interval.K_1M: 'mhi_1m', Interval.K_15M: 'mhi_15m'},
+                           start_date='2015-01-01', chunksize=200_000)
+engine.run_stream(stream)
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from backtest.bar_store import BarStore, PRICE_COLUMNS
+from coreutils.constant import Interval
+
+_FIELDS = ('datetime', 'end_date') + PRICE_COLUMNS
+
+
+class _SourceBuffer:
+    """单个数据源的读取缓冲：ready 为已确定 end_date 的 bar，pending 为最后一根待定的 bar"""
+
+    def __init__(self, chunks: Iterable[pd.DataFrame], time_column: str):
+        self.chunks = iter(chunks)
+        self.time_column = time_column
+        self.ready = {name: np.zeros(0) for name in _FIELDS}
+        self.ready['datetime'] = self.ready['end_date'] = np.zeros(0, dtype=np.int64)
+        self.pending: dict[str, np.ndarray] | None = None
+        self.exhausted = False
+
+    def pull(self):
+        """读取下一块；数据源读完后丢弃最后一根没有 end_date 的 bar（与 BarStore.from_frames 一致）"""
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            self.pending = None
+            return
+        if chunk.empty:
+            return
+        dt = pd.to_datetime(chunk[self.time_column]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        new = {'datetime': dt}
+        for name in PRICE_COLUMNS:
+            new[name] = chunk[name].to_numpy(dtype=np.float64) if name in chunk.columns else np.zeros(len(dt))
+        if self.pending is not None:
+            new = {name: np.concatenate([self.pending[name], new[name]]) for name in new}
+
+        self.pending = {name: col[-1:] for name, col in new.items()}
+        new['end_date'] = new['datetime'][1:] - 1_000_000_000
+        self.ready = {name: np.concatenate([self.ready[name], new[name][:len(new['end_date'])]])
+                      for name in _FIELDS}
+
+    def take(self, watermark: int) -> dict[str, np.ndarray]:
+        n = np.searchsorted(self.ready['end_date'], watermark, side='right')
+        out = {name: col[:n] for name, col in self.ready.items()}
+        self.ready = {name: col[n:] for name, col in self.ready.items()}
+        return out
+
+
+class BarStream:
+    """
+    :param sources: [(symbol, interval, chunks)]，chunks 为按时间升序的 DataFrame 分块迭代器，
+                    每块至少包含时间列和 open/high/low/close，可选 volume
+    :param time_column: 时间列名
+    symbols / intervals 在回放开始前就已确定，回测引擎据此选择撮合周期和盯市周期
+    """
+
+    def __init__(self, sources: list[tuple[str, Interval, Iterable[pd.DataFrame]]], time_column: str = 'datetime'):
+        self.symbols: list[str] = []
+        for symbol, _, _ in sources:
+            if symbol not in self.symbols:
+                self.symbols.append(symbol)
+        self.intervals: list[Interval] = sorted({interval for _, interval, _ in sources})
+        self.sources = sources
+        self.time_column = time_column
+
+    @classmethod
+    def from_db(cls, db_name: str, symbol: str, tables: dict[Interval, str], start_date=None, end_date=None,
+                chunksize: int = 100_000, engine=None) -> "BarStream":
+        """
+        从数据库K线表（如 mhi_1m、mhi_15m）流式读取
+        :param tables: {interval: 表名}
+        """
+        from data.db_query import stream_kline
+
+        sources = [(symbol, interval, stream_kline(db_name, table, start_date=start_date, end_date=end_date,
+                                                   chunksize=chunksize, engine=engine))
+                   for interval, table in tables.items()]
+        return cls(sources, time_column='trade_time')
+
+    def __iter__(self) -> Iterator[BarStore]:
+        buffers = [_SourceBuffer(chunks, self.time_column) for _, _, chunks in self.sources]
+        symbol_ids = [self.symbols.index(symbol) for symbol, _, _ in self.sources]
+        interval_ids = [self.intervals.index(interval) for _, interval, _ in self.sources]
+
+        while True:
+            # 每个未读完的数据源至少要有一根已确定 end_date 的 bar，才能算出水位线
+            for buffer in buffers:
+                while not buffer.exhausted and len(buffer.ready['end_date']) == 0:
+                    buffer.pull()
+            live = [buffer for buffer in buffers if not buffer.exhausted]
+            if not live and all(len(buffer.ready['end_date']) == 0 for buffer in buffers):
+                return
+            watermark = min(buffer.ready['end_date'][-1] for buffer in live) if live else np.iinfo(np.int64).max
+
+            columns = {name: [] for name in _FIELDS + ('symbol_id', 'interval_id')}
+            sources = []
+            start = 0
+            for buffer, symbol_id, interval_id in zip(buffers, symbol_ids, interval_ids):
+                part = buffer.take(watermark)
+                n = len(part['end_date'])
+                if n == 0:
+                    continue
+                for name in _FIELDS:
+                    columns[name].append(part[name])
+                columns['symbol_id'].append(np.full(n, symbol_id, dtype=np.int32))
+                columns['interval_id'].append(np.full(n, interval_id, dtype=np.int16))
+                sources.append((symbol_id, interval_id, start, start + n))
+                start += n
+            if sources:
+                yield BarStore(symbols=self.symbols, intervals=self.intervals, sources=sources,
+                               **{name: np.concatenate(parts) for name, parts in columns.items()})
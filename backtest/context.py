@@ -0,0 +1,89 @@
+"""
+回测上下文：一次回测用到的事件引擎、撮合 gateway、oms 和 logger 都归同一个 BacktestContext 所有，
+不与其他上下文共享任何对象，同一进程里可以在多个线程中同时跑多个上下文，也可以 reset 后复用。
+
+reset 只清空订单、账户、记录和事件处理函数；已加载的 BarStore、合约参数、路径模型和延迟模型保留，
+参数优化的子进程因此不必为每个参数组合重新构建引擎。
+
+用法示例：
+-----------
+from backtest.context import BacktestContext
+
+ctx = BacktestContext(initial_cash=50000, daily_update_interval=Interval.K_1H)
+ctx.engine.load_store(store)
+ctx.engine.set_contracts({"HK.MHImain": {"size": 10, "margin_rate": 0.1}})
+for fast in (8, 12):
+    ctx.reset()
+    ctx.add_strategy(MACDStrategy, symbol="HK.MHImain", work_interval=Interval.K_1H, fast=fast)
+    print(ctx.run().statistics)
+
+多策略共用一次回放（每个策略一个子账户，见 BacktestEngine.strategy_bus）：
+ctx.reset()
+for fast in (8, 12, 16):
+    ctx.add_strategy(MACDStrategy, name=f"fast{fast}", symbol="HK.MHImain", work_interval=Interval.K_1H, fast=fast)
+engine = ctx.run()
+print(engine.strategy_equity().iloc[-1], engine.strategy_statistics())
+"""
+from __future__ import annotations
+
+import logging
+
+from backtest.backtest_engine import BacktestEngine
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_gateway import BacktestGateway
+from backtest.backtest_oms_engine import BacktestOms
+from coreutils.logger import isolated_logger
+
+
+class BacktestContext:
+    """
+    :param engine_id: logger 名称
+    :param logger: 为 None 时使用不登记到 logging 全局表的 logger，并关闭回测日志（set_log("off")）
+    :param timer: 是否按模拟时间发出 EVENT_TIMER（见 BacktestEventEngine）
+    :param engine_kwargs: 传给 BacktestEngine 的其余参数（initial_cash、daily_update_interval 等）
+    """
+
+    def __init__(self, engine_id: str = 'backtest', logger: logging.Logger | None = None, timer: bool = False,
+                 **engine_kwargs):
+        self.logger = logger if logger is not None else isolated_logger(engine_id)
+        self.event_engine = BacktestEventEngine(timer=timer)
+        self.engine = BacktestEngine(event_engine=self.event_engine, engine_id=engine_id, logger=self.logger,
+                                     **engine_kwargs)
+        if logger is None:
+            # 日志没有去处，不必保存和格式化
+            self.engine.set_log("off")
+        self.strategy = None
+
+    @property
+    def gateway(self) -> BacktestGateway:
+        return self.engine.gateway
+
+    @property
+    def oms(self) -> BacktestOms:
+        return self.engine.oms
+
+    def add_strategy(self, strategy_cls, name: str | None = None, capital: float | None = None, **kwargs):
+        """
+        在本上下文的事件引擎上构建并初始化策略。
+        给出 name 时策略建立在自己的事件总线上，有独立的子账户（初始资金 capital），多个策略共用一次回放
+        """
+        event_engine = self.event_engine if name is None else self.engine.strategy_bus(name, capital)
+        strategy = strategy_cls(event_engine=event_engine, **kwargs)
+        if hasattr(strategy, "initialize"):
+            strategy.initialize()
+        self.strategy = strategy
+        self.engine.add_strategy(strategy, name)
+        return strategy
+
+    def run(self, **kwargs) -> BacktestEngine:
+        """参数同 BacktestEngine.run，返回跑完的引擎"""
+        self.engine.run(**kwargs)
+        return self.engine
+
+    def reset(self, initial_cash: float | None = None):
+        """注销上一次的策略（包括各策略总线和子账户），清空订单、账户和记录，保留已加载的数据和合约参数"""
+        self.event_engine.clear()
+        self.engine.clear_strategy_buses()
+        self.engine.reset(initial_cash)
+        self.engine.register_event()
+        self.strategy = None
@@ -0,0 +1,109 @@
+"""
+bar 内价格路径模型
+
+同一根 bar 的 [low, high] 内同时有止损和止盈时，默认撮合（BacktestGateway.intrabar_path 为 None）按下单顺序成交，
+与真实的先后无关。设置路径模型后，gateway 沿路径逐段撮合，先经过的价格先成交：
+
+- OHLC：open -> high -> low -> close
+- OLHC：open -> low -> high -> close
+- NEAREST：先走离 open 更近的极值（相等时按 OHLC）
+- FINE：用更细周期的 bar（例如 15m/1h 回测时用 1m）拼接路径，每根细 bar 内部按 NEAREST；
+        找不到细 bar 时退回 NEAREST
+
+路径为 [(price, gap)]：gap=True 的点是跳空到该价格（bar 开盘），所有可成交的订单按该价格成交；
+gap=False 表示从上一个点连续走到该价格，途经的止损按触发价、限价按限价成交。
+
+用法示例：
+-----------
+fine = BarStore.from_frames([df_1m])
+engine.set_intrabar_path(PathModel.FINE, fine)
+"""
+from __future__ import annotations
+
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from backtest.bar_store import BarStore
+from coreutils.constant import Interval
+from coreutils.object import BarData
+
+
+class PathModel(Enum):
+    OHLC = "ohlc"
+    OLHC = "olhc"
+    NEAREST = "nearest"
+    FINE = "fine"
+
+
+def bar_path(open_price: float, high: float, low: float, close: float,
+             model: PathModel = PathModel.NEAREST) -> list[tuple[float, bool]]:
+    if model == PathModel.OLHC or (model != PathModel.OHLC and open_price - low < high - open_price):
+        return [(open_price, True), (low, False), (high, False), (close, False)]
+    return [(open_price, True), (high, False), (low, False), (close, False)]
+
+
+class IntrabarPath:
+    """
+    :param model: 路径模型
+    :param fine: FINE 模式下的细周期 BarStore；每个 symbol 只用其中最小周期的数据源
+    """
+
+    def __init__(self, model: PathModel = PathModel.NEAREST, fine: BarStore | None = None):
+        if model == PathModel.FINE and fine is None:
+            raise ValueError("PathModel.FINE requires fine bars")
+        self.model = model
+        self.fine = fine
+        # {symbol: (datetime, open, high, low, close)}，细 bar 各列在 fine 中的视图
+        self._columns: dict[str, tuple[np.ndarray, ...]] = {}
+        # {symbol: {粗 bar 开始时间 ns: (lo, hi)}}，prepare 时按粗 bar 预先算好的细 bar 行区间
+        self._ranges: dict[str, dict[int, tuple[int, int]]] = {}
+        if fine is not None:
+            interval = min(fine.intervals)
+            for symbol_id, interval_id, start, stop in fine.sources:
+                if fine.intervals[interval_id] == interval:
+                    self._columns[fine.symbols[symbol_id]] = tuple(
+                        getattr(fine, name)[start:stop] for name in ('datetime', 'open', 'high', 'low', 'close'))
+
+    def prepare(self, store: BarStore, interval: Interval):
+        """回放前为 store 中 interval 周期的每根 bar 二分查找一次细 bar 的行区间，回放时只查字典"""
+        if self.model != PathModel.FINE:
+            return
+        self._ranges = {}
+        for symbol_id, interval_id, start, stop in store.sources:
+            symbol = store.symbols[symbol_id]
+            columns = self._columns.get(symbol)
+            if store.intervals[interval_id] != interval or columns is None:
+                continue
+            begin = store.datetime[start:stop]
+            lo = np.searchsorted(columns[0], begin, side='left')
+            hi = np.searchsorted(columns[0], store.end_date[start:stop], side='right')
+            self._ranges.setdefault(symbol, {}).update(zip(begin.tolist(), zip(lo.tolist(), hi.tolist())))
+
+    def path(self, bar: BarData) -> list[tuple[float, bool]]:
+        if self.model != PathModel.FINE:
+            return bar_path(bar.open_price, bar.high_price, bar.low_price, bar.close_price, self.model)
+        rows = self._fine_rows(bar)
+        if rows is None:
+            return bar_path(bar.open_price, bar.high_price, bar.low_price, bar.close_price)
+        _, open_, high, low, close = self._columns[bar.symbol]
+        lo, hi = rows
+        points = []
+        for o, h, l, c in zip(open_[lo:hi].tolist(), high[lo:hi].tolist(), low[lo:hi].tolist(),
+                              close[lo:hi].tolist()):
+            points += bar_path(o, h, l, c)
+        return points
+
+    def _fine_rows(self, bar: BarData) -> tuple[int, int] | None:
+        columns = self._columns.get(bar.symbol)
+        if columns is None:
+            return None
+        begin = pd.Timestamp(bar.datetime).value
+        rows = self._ranges.get(bar.symbol, {}).get(begin)
+        if rows is None:
+            # 未 prepare 的 bar（例如直接调用 gateway.on_bar）按周期长度二分查找
+            end = begin + int(bar.interval.value * 1_000_000_000)
+            rows = (int(np.searchsorted(columns[0], begin, side='left')),
+                    int(np.searchsorted(columns[0], end, side='left')))
+        return rows if rows[1] > rows[0] else None
@@ -0,0 +1,93 @@
+"""
+回测日志：先按等级过滤，再保存未格式化的 (回测时间, 等级, 格式串, 参数)，需要输出时才格式化
+
+实盘的 LoggerEngine 每条日志都同步写文件；回测里每次下单、成交都写一条，长回测中格式化和写文件占了相当一部分时间。
+BacktestLogSink 的三种模式：
+- buffer：写入内存缓冲，满 capacity 条或回测结束（flush）时一次写入 logger，内容与逐条写入相同
+- ring：只保留最近 capacity 条，不自动写出，需要时调用 flush / to_frame 查看（排查长回测最后阶段的问题）
+- off：丢弃全部日志，参数优化时使用
+
+参数延迟格式化：msg 是 % 格式串，args 为参数，低于 level 或 off 时不会调用参数的 __repr__。
+
+用法示例：
+-----------
+engine.set_log(mode="ring", level=LogLevel.WARNING, capacity=10_000)
+engine.run()
+engine.log_sink.to_frame().to_parquet("backtest_log.parquet")
+"""
+from __future__ import annotations
+
+import logging
+from collections import deque
+
+import pandas as pd
+
+from coreutils.constant import LogLevel
+
+# LogLevel -> logging 的数值等级
+LEVELS = {LogLevel.DEBUG: logging.DEBUG, LogLevel.INFO: logging.INFO,
+          LogLevel.WARNING: logging.WARNING, LogLevel.ERROR: logging.ERROR}
+LOG_MODES = ("buffer", "ring", "off")
+
+
+class BacktestLogSink:
+    """
+    :param logger: flush 时写入的 logger
+    :param mode: buffer / ring / off
+    :param level: 低于该等级的日志直接丢弃；为 None 时使用 logger 的等级
+    :param capacity: buffer 模式下满多少条写出一次；ring 模式下保留的条数
+    """
+
+    def __init__(self, logger: logging.Logger, mode: str = "buffer", level: LogLevel | None = None,
+                 capacity: int = 10_000):
+        if mode not in LOG_MODES:
+            raise ValueError(f"unknown log mode {mode!r}, expected one of {LOG_MODES}")
+        self.logger = logger
+        self.mode = mode
+        self.level = level
+        self.capacity = capacity
+        # off 时 _min 比任何等级都高，enabled 只需一次比较
+        if mode == "off":
+            self._min = logging.CRITICAL + 1
+        else:
+            self._min = logger.getEffectiveLevel() if level is None else LEVELS[level]
+        self._records: deque = deque(maxlen=capacity if mode == "ring" else None)
+
+    def enabled(self, level: LogLevel) -> bool:
+        return LEVELS[level] >= self._min
+
+    def log(self, when, level: LogLevel, msg: str, args: tuple = ()):
+        """记录一条日志；when 为回测时间"""
+        if LEVELS[level] < self._min:
+            return
+        records = self._records
+        records.append((when, level, msg, args))
+        if self.mode == "buffer" and len(records) >= self.capacity:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def lines(self) -> list[tuple]:
+        """[(回测时间, 等级, 格式化后的消息)]"""
+        return [(when, level, _format(msg, args)) for when, level, msg, args in self._records]
+
+    def to_frame(self) -> pd.DataFrame:
+        """列式日志：time / level / msg，可以直接保存为 parquet"""
+        rows = self.lines()
+        return pd.DataFrame({"time": [r[0] for r in rows], "level": [r[1].value for r in rows],
+                             "msg": [r[2] for r in rows]})
+
+    def flush(self):
+        """把缓冲的日志按原来的格式写入 logger 并清空"""
+        logger = self.logger
+        for when, level, msg, args in self._records:
+            logger.log(LEVELS[level], "BackTestTime:%s %s", when, _format(msg, args))
+        self._records.clear()
+
+    def clear(self):
+        self._records.clear()
+
+
+def _format(msg: str, args: tuple) -> str:
+    return msg % args if args else msg
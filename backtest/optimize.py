@@ -0,0 +1,291 @@
+"""
+参数优化：多进程网格搜索
+
+用法示例：
+-----------
+from backtest.optimize import run_grid
+
+res = run_grid(MACDStrategy, {"fast": [8, 12], "slow": [26, 35]}, data=[df],
+               contracts={"HK.MHImain": {"size": 10, "margin_rate": 0.1}},
+               strategy_kwargs={"symbol": "HK.MHImain", "work_interval": Interval.K_1H},
+               engine_kwargs={"initial_cash": 50000, "daily_update_interval": Interval.K_1H},
+               workers=8, sort_by="sharpe", top_k=10)
+
+注意：Windows 下子进程以 spawn 方式启动，调用代码需要放在 if __name__ == '__main__': 里。
+
+数据只在主进程构建一次 BarStore 并保存为 .npy 列文件，子进程以内存映射方式读取，
+所有进程共享同一份页缓存，不会为每个参数组合 pickle 一遍数据。
+
+结果缓存（见 backtest.result_cache）：数据、合约、策略代码和参数都相同的组合直接取缓存的结果，
+只有未命中的组合才回测，跑完后由子进程写入缓存。不传 cache 时使用默认目录（RESULT_CACHE_DIR），cache=False 关闭。
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import signal
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from backtest.backtest_engine import BacktestEngine
+from backtest.bar_store import BarStore
+from backtest.context import BacktestContext
+from backtest.result_cache import ResultCache, cache_key, resolve_cache
+
+# 越大越好的指标降序排列，其余（如最大回撤）升序
+DESCENDING_METRICS = {"sharpe", "total_return", "annual_return"}
+
+# 子进程里共享的只读数据，以及按时间窗口截取的切片缓存（同一窗口的多个参数组合复用）
+_STORE: BarStore | None = None
+_SLICES: dict[tuple, BarStore] = {}
+_MAX_SLICES = 4
+# 子进程里复用的回测上下文 {engine_kwargs: BacktestContext}，每个任务开始前 reset
+_CONTEXTS: dict[tuple, BacktestContext] = {}
+_MAX_CONTEXTS = 4
+
+
+def expand_grid(param_grid: dict[str, list] | list[dict]) -> list[dict]:
+    """{"fast": [8, 12], "slow": [26]} -> [{"fast": 8, "slow": 26}, {"fast": 12, "slow": 26}]"""
+    if isinstance(param_grid, list):
+        return [dict(p) for p in param_grid]
+    keys = list(param_grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+
+def default_workers() -> int:
+    """可用 CPU 核数（Linux 下考虑进程的 CPU 亲和性）"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker(store_path: str):
+    global _STORE
+    _STORE = BarStore.load(store_path, mmap=True)
+    _SLICES.clear()
+    _CONTEXTS.clear()
+
+
+def _get_context(engine_kwargs: dict | None) -> BacktestContext:
+    """子进程里按 engine_kwargs 复用回测上下文，参数不可哈希时每次新建"""
+    try:
+        key = tuple(sorted((engine_kwargs or {}).items()))
+        hash(key)
+    except TypeError:
+        return BacktestContext(engine_id="backtest.optimize", **(engine_kwargs or {}))
+    if key not in _CONTEXTS:
+        if len(_CONTEXTS) >= _MAX_CONTEXTS:
+            _CONTEXTS.pop(next(iter(_CONTEXTS)))
+        _CONTEXTS[key] = BacktestContext(engine_id="backtest.optimize", **(engine_kwargs or {}))
+    return _CONTEXTS[key]
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError
+
+
+def _get_slice(store: BarStore, time_range: tuple | None) -> BarStore:
+    if time_range is None:
+        return store
+    key = (id(store), time_range)
+    if key not in _SLICES:
+        if len(_SLICES) >= _MAX_SLICES:
+            _SLICES.pop(next(iter(_SLICES)))
+        _SLICES[key] = store.slice_time(*time_range)
+    return _SLICES[key]
+
+
+def run_backtest(store: BarStore, strategy_cls, params: dict, contracts: dict[str, dict],
+                 strategy_kwargs: dict | None = None, engine_kwargs: dict | None = None,
+                 context: BacktestContext | None = None) -> BacktestEngine:
+    """
+    用给定参数跑一次完整的事件驱动回测，返回跑完的 BacktestEngine
+    :param context: 复用的回测上下文（先 reset），为 None 时新建；复用时返回的引擎在下一次运行时会被清空
+    """
+    if context is None:
+        context = BacktestContext(engine_id="backtest.optimize", **(engine_kwargs or {}))
+    else:
+        context.reset()
+    context.add_strategy(strategy_cls, **(strategy_kwargs or {}), **params)
+    context.engine.load_store(store)
+    context.engine.set_contracts(contracts)
+    return context.run()
+
+
+def _run_task(strategy_cls, params: dict, contracts: dict, strategy_kwargs: dict | None = None,
+              engine_kwargs: dict | None = None, timeout: float | None = None, store: BarStore | None = None,
+              time_range: tuple | None = None, keep_account: bool = False, cache: ResultCache | None = None,
+              key: str | None = None) -> dict:
+    """
+    子进程中执行的单个任务：返回参数 + 数值化的统计结果
+    :param time_range: (start, end)，只回测这段时间的 bar（walk-forward 的样本内/样本外窗口）
+    :param keep_account: 是否把 account_daily 数据框一并返回
+    :param cache: 回测成功后把结果写入该缓存（键为 key）
+    """
+    store = _get_slice(store if store is not None else _STORE, time_range)
+    row = dict(params)
+    start = time.perf_counter()
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = run_backtest(store, strategy_cls, params, contracts, strategy_kwargs, engine_kwargs,
+                                  context=_get_context(engine_kwargs))
+        row.update(engine.statistics)
+        if keep_account:
+            row["account"] = engine.get_account_daily_df()
+        row["status"] = "ok"
+        if cache is not None:
+            row["cached"] = False
+            # 缓存写不进去（如磁盘满）不影响本次结果
+            with contextlib.suppress(OSError):
+                cache.put_engine(key, engine)
+    except TimeoutError:
+        row["status"] = "timeout"
+    except Exception as e:
+        row["status"] = f"error: {e!r}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    row["elapsed"] = time.perf_counter() - start
+    return row
+
+
+def _cached_row(cache: ResultCache, key: str, task: dict) -> dict | None:
+    """缓存命中时按 _run_task 的格式返回结果行"""
+    start = time.perf_counter()
+    row = dict(task["params"])
+    if task.get("keep_account"):
+        result = cache.get(key)
+        if result is None:
+            return None
+        row.update(result.statistics)
+        row["account"] = result.account_daily
+    else:
+        statistics = cache.get_statistics(key)
+        if statistics is None:
+            return None
+        row.update(statistics)
+    row["status"] = "ok"
+    row["cached"] = True
+    row["elapsed"] = time.perf_counter() - start
+    return row
+
+
+def execute_tasks(tasks: list[dict], store: BarStore, workers: int | None = None,
+                  progress: bool | Callable[[int, int, dict], None] = True,
+                  cache: ResultCache | str | bool | None = None) -> list[dict]:
+    """
+    执行一批回测任务，返回与 tasks 顺序一致的结果。
+    每个 task 是 _run_task 的关键字参数（store 除外）；workers > 1 时数据通过内存映射共享给子进程。
+    :param cache: 结果缓存（或缓存目录），命中的任务不再回测，结果行带 cached 列；
+                  None 使用默认缓存（RESULT_CACHE_DIR），False 不使用缓存
+    """
+    report = _print_progress if progress is True else (progress or None)
+    workers = workers or default_workers()
+    tasks = list(tasks)
+    rows: list[dict | None] = [None] * len(tasks)
+    done = 0
+    pending = list(range(len(tasks)))
+    cache = resolve_cache(cache)
+    if cache is not None:
+        pending = []
+        for n, task in enumerate(tasks):
+            key = cache_key(store, task["strategy_cls"], task["params"], task["contracts"],
+                            task.get("strategy_kwargs"), task.get("engine_kwargs"), task.get("time_range"))
+            rows[n] = _cached_row(cache, key, task)
+            if rows[n] is None:
+                tasks[n] = dict(task, cache=cache, key=key)
+                pending.append(n)
+            else:
+                done += 1
+                if report:
+                    report(done, len(tasks), rows[n])
+    if not pending:
+        return rows
+
+    if workers == 1:
+        try:
+            for n in pending:
+                rows[n] = _run_task(store=store, **tasks[n])
+                done += 1
+                if report:
+                    report(done, len(tasks), rows[n])
+        finally:
+            # 主进程里不保留引擎（及其引用的数据）
+            _CONTEXTS.clear()
+        return rows
+
+    store_path = tempfile.mkdtemp(prefix="bt_store_")
+    try:
+        store.save(store_path)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(store_path,)) as executor:
+            futures = {executor.submit(_run_task, **tasks[n]): n for n in pending}
+            for future in as_completed(futures):
+                n = futures[future]
+                rows[n] = future.result()
+                done += 1
+                if report:
+                    report(done, len(tasks), rows[n])
+    finally:
+        shutil.rmtree(store_path, ignore_errors=True)
+    return rows
+
+
+def sort_results(result: pd.DataFrame, sort_by: str | None, ascending: bool | None = None) -> pd.DataFrame:
+    if sort_by is None or sort_by not in result.columns:
+        return result
+    if ascending is None:
+        ascending = sort_by not in DESCENDING_METRICS
+    return result.sort_values(sort_by, ascending=ascending, na_position="last", ignore_index=True)
+
+
+def _print_progress(done: int, total: int, row: dict):
+    print(f"\r[run_grid] {done}/{total} {row.get('status')} {row.get('elapsed', 0):.1f}s", end="",
+          flush=True)
+    if done == total:
+        print()
+
+
+def run_grid(strategy_cls, param_grid: dict[str, list] | list[dict], data: list[pd.DataFrame] | BarStore,
+             contracts: dict[str, dict], strategy_kwargs: dict | None = None, engine_kwargs: dict | None = None,
+             workers: int | None = None, timeout: float | None = None, sort_by: str | None = "sharpe",
+             ascending: bool | None = None, top_k: int | None = None,
+             progress: bool | Callable[[int, int, dict], None] = True,
+             cache: ResultCache | str | bool | None = None) -> pd.DataFrame:
+    """
+    多进程网格搜索
+
+    :param strategy_cls: 策略类，构造方式 strategy_cls(event_engine=..., **strategy_kwargs, **params)
+    :param param_grid: {参数名: 候选值列表} 或参数字典列表
+    :param data: load_data 格式的 DataFrame 列表，或已构建好的 BarStore
+    :param contracts: set_contracts 的合约参数
+    :param strategy_kwargs: 所有组合共享的策略参数（如 symbol、work_interval）
+    :param engine_kwargs: BacktestEngine 的构造参数（如 initial_cash、daily_update_interval）
+    :param workers: 进程数，默认 CPU 核数；1 表示在当前进程串行执行
+    :param timeout: 单次回测的超时秒数（依赖 SIGALRM，Windows 下不生效）
+    :param sort_by: 排序指标，sharpe/total_return/annual_return 降序，max_drawdown 升序
+    :param top_k: 只返回排序后的前 k 行
+    :param progress: True 打印进度，也可以传入回调 progress(done, total, row)
+    :param cache: 结果缓存（ResultCache 或目录），命中的组合直接返回缓存的统计结果；
+                  默认使用 RESULT_CACHE_DIR 下的缓存，False 不使用缓存
+    :return: DataFrame，每行一个参数组合：参数列 + 统计指标 + status + elapsed（使用缓存时另有 cached 列）
+    """
+    combos = expand_grid(param_grid)
+    store = data if isinstance(data, BarStore) else BarStore.from_frames(data)
+    tasks = [dict(strategy_cls=strategy_cls, params=params, contracts=contracts, strategy_kwargs=strategy_kwargs,
+                  engine_kwargs=engine_kwargs, timeout=timeout) for params in combos]
+    result = sort_results(pd.DataFrame(execute_tasks(tasks, store, workers, progress, cache)), sort_by, ascending)
+    if top_k is not None:
+        result = result.head(top_k)
+    return result
@@ -0,0 +1,144 @@
+"""
+按价格索引的回测订单簿
+
+BacktestGateway 的 active_orders / inactive_orders 字典之外，为每个 symbol 额外维护按价格排序的列表，
+每根 bar 只用二分查找取出 [low, high] 可能触及的订单，不再遍历全部挂单：
+
+- 止损单（待激活）：多头按 trigger_price 升序，high >= trigger 的是前缀；空头 low <= trigger 的是后缀
+- 限价单 / 触发后的 STP_LMT：多头 low <= price 的是后缀；空头 high >= price 的是前缀
+- ABS_LMT：low <= price <= high 的一段
+- 市价单 / 触发后的 STP_MKT：每根 bar 都成交，单独保存
+
+每个订单进入字典时分配递增序号 seq，候选按 seq 排序后再逐个判断成交条件，
+与原先按字典插入顺序遍历的成交顺序一致；遍历过程中回调里改价的订单会重新加入候选，
+本根 bar 开始撮合之后新下的订单不参与本根 bar 的撮合（与原先遍历字典拷贝一致）。
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterator
+from heapq import heappop, heappush
+
+from coreutils.constant import Direction, OrderType
+from coreutils.object import OrderData
+
+MARKET_TYPES = (OrderType.MARKET, OrderType.STP_MKT)
+LIMIT_TYPES = (OrderType.LIMIT, OrderType.STP_LMT)
+
+
+class OrderBook:
+    """单个 symbol 的价格索引；只保存 (价格, seq, orderid)，订单对象仍在 gateway 的字典里"""
+
+    def __init__(self):
+        self.stop_long: list[tuple] = []
+        self.stop_short: list[tuple] = []
+        self.limit_long: list[tuple] = []
+        self.limit_short: list[tuple] = []
+        self.absolute: list[tuple] = []
+        self.market: dict[str, int] = {}
+        # orderid -> (所在列表, key)，撤单/改单时定位
+        self._keys: dict[str, tuple] = {}
+        self.seqs: dict[str, int] = {}
+        # scan 进行中的候选堆、seq 上限和最后产出的 seq
+        self._pending: list[tuple[int, str]] | None = None
+        self._cutoff = 0
+        self._last = -1
+
+    def __len__(self) -> int:
+        return len(self.seqs)
+
+    def add_inactive(self, order: OrderData, seq: int):
+        """待激活的止损单，按 trigger_price 索引"""
+        side = self.stop_long if order.direction == Direction.LONG else self.stop_short
+        self._insert(side, order.trigger_price, seq, order.orderid)
+
+    def add_active(self, order: OrderData, seq: int):
+        """已激活的订单，按成交条件用到的价格索引；其他类型不会被撮合，只记录 seq"""
+        oid = order.orderid
+        if order.type in MARKET_TYPES:
+            self.market[oid] = seq
+            self._keys[oid] = (self.market, None)
+            self.seqs[oid] = seq
+        elif order.type == OrderType.ABS_LMT:
+            self._insert(self.absolute, order.price, seq, oid)
+        elif order.type in LIMIT_TYPES:
+            side = self.limit_long if order.direction == Direction.LONG else self.limit_short
+            self._insert(side, order.price, seq, oid)
+        else:
+            self._keys[oid] = (None, None)
+            self.seqs[oid] = seq
+
+    def remove(self, oid: str):
+        entry = self._keys.pop(oid, None)
+        self.seqs.pop(oid, None)
+        if entry is None:
+            return
+        side, key = entry
+        if side is self.market:
+            del self.market[oid]
+        elif side is not None:
+            i = bisect_left(side, key)
+            if i < len(side) and side[i] == key:
+                del side[i]
+
+    def reindex(self, order: OrderData, active: bool):
+        """改单后按新价格重新索引，保持原 seq"""
+        oid = order.orderid
+        seq = self.seqs.get(oid)
+        if seq is None:
+            return
+        self.remove(oid)
+        if active:
+            self.add_active(order, seq)
+        else:
+            self.add_inactive(order, seq)
+        if self._pending is not None and self._last < seq <= self._cutoff:
+            heappush(self._pending, (seq, oid))
+
+    def _insert(self, side: list, price: float, seq: int, oid: str):
+        key = (price, seq, oid)
+        insort(side, key)
+        self._keys[oid] = (side, key)
+        self.seqs[oid] = seq
+
+    # ---------- 查询：返回按 seq 排序的 (seq, orderid) ----------
+    def stop_candidates(self, high: float, low: float) -> list[tuple[int, str]]:
+        """high >= trigger 的多头止损和 low <= trigger 的空头止损"""
+        hits = self.stop_long[:bisect_right(self.stop_long, (high, float('inf')))]
+        hits += self.stop_short[bisect_left(self.stop_short, (low,)):]
+        return sorted((seq, oid) for _, seq, oid in hits)
+
+    def fill_candidates(self, high: float, low: float) -> list[tuple[int, str]]:
+        """市价单、价格落在可成交区间的限价单和 ABS_LMT"""
+        hits = self.limit_long[bisect_left(self.limit_long, (low,)):]
+        hits += self.limit_short[:bisect_right(self.limit_short, (high, float('inf')))]
+        hits += self.absolute[bisect_left(self.absolute, (low,)):bisect_right(self.absolute, (high, float('inf')))]
+        candidates = [(seq, oid) for _, seq, oid in hits]
+        candidates += [(seq, oid) for oid, seq in self.market.items()]
+        candidates.sort()
+        return candidates
+
+    def next_above(self, price: float) -> float | None:
+        """价格上行时 price 之上最近的撮合价位：多头止损触发价、空头限价、ABS_LMT"""
+        levels = [side[i][0] for side in (self.stop_long, self.limit_short, self.absolute)
+                  if (i := bisect_right(side, (price, float('inf')))) < len(side)]
+        return min(levels) if levels else None
+
+    def next_below(self, price: float) -> float | None:
+        """价格下行时 price 之下最近的撮合价位：空头止损触发价、多头限价、ABS_LMT"""
+        levels = [side[i - 1][0] for side in (self.stop_short, self.limit_long, self.absolute)
+                  if (i := bisect_left(side, (price,))) > 0]
+        return max(levels) if levels else None
+
+    def scan(self, candidates: list[tuple[int, str]], cutoff: int) -> Iterator[str]:
+        """按 seq 逐个产出 seq 不超过 cutoff 的候选 orderid，调用方在产出时再判断订单是否仍存在、是否满足成交条件"""
+        self._pending, self._cutoff, self._last = candidates, cutoff, -1
+        try:
+            while self._pending:
+                seq, oid = heappop(self._pending)
+                if seq <= self._last or seq > cutoff:
+                    continue
+                self._last = seq
+                yield oid
+        finally:
+            self._pending = None
@@ -0,0 +1,220 @@
+"""
+回测记录器
+
+逐日盯市时把账户、合约、持仓的标量字段直接追加到预分配的 NumPy 列里：
+- 不做 deepcopy，也不为每个时点创建 dict
+- 容量不够时按倍数扩容，摊还 O(1)
+- 标的可以在回测中途才出现：该标的的列在出现之前为 NaN
+时间以 int64 纳秒保存（带时区的时间按 UTC 保存，输出时再转换回原时区）。
+与原来按时间作 key 的 dict 一致，同一时间重复记录时覆盖上一行（最后一个窗口会与前一次记账同 key）。
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from coreutils.constant import Direction, Exchange
+from coreutils.object import AccountData, PositionData
+
+ACCOUNT_FIELDS = ('cash', 'margin', 'realized_pnl', 'unrealized_pnl', 'equity', 'available')
+CONTRACT_FIELDS = ('volume', 'margin', 'realized_pnl', 'unrealized_pnl', 'cost', 'turnover')
+POSITION_FIELDS = ('volume', 'price', 'margin')
+
+
+class BacktestRecorder:
+    """
+    account:   (n, len(ACCOUNT_FIELDS))
+    contracts: {symbol: (n, len(CONTRACT_FIELDS))}，标的首次成交之前为 NaN
+    positions: {symbol: (n, len(POSITION_FIELDS))}，不持仓的时点为 NaN（与 oms.positions 平仓即移除一致）
+    """
+
+    def __init__(self, capacity: int = 1024, gateway_name: str = 'BACKTEST'):
+        self.gateway_name = gateway_name
+        self._size = 0
+        self._capacity = capacity
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._account = np.empty((capacity, len(ACCOUNT_FIELDS)))
+        self._contracts: dict[str, np.ndarray] = {}
+        self._positions: dict[str, np.ndarray] = {}
+        self._exchanges: dict[str, Exchange] = {}
+        self.tz = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    # =========================
+    # 写入
+    # =========================
+    def _reserve(self, n: int):
+        if n <= self._capacity:
+            return
+        capacity = max(n, self._capacity * 2)
+        self._times = _grow(self._times, capacity)
+        self._account = _grow(self._account, capacity)
+        self._contracts = {symbol: _grow(block, capacity) for symbol, block in self._contracts.items()}
+        self._positions = {symbol: _grow(block, capacity) for symbol, block in self._positions.items()}
+        self._capacity = capacity
+
+    def _block(self, blocks: dict[str, np.ndarray], symbol: str, width: int) -> np.ndarray:
+        block = blocks.get(symbol)
+        if block is None:
+            block = blocks[symbol] = np.full((self._capacity, width), np.nan)
+        return block
+
+    def record(self, dt, account: AccountData, contracts_log: dict[str, dict],
+               positions: dict[str, PositionData]):
+        """追加一个盯市时点；直接读取 oms 的当前状态，不复制"""
+        if not isinstance(dt, pd.Timestamp):
+            dt = pd.Timestamp(dt)
+        n = self._size
+        if n and self._times[n - 1] == dt.value:
+            n -= 1
+            for block in self._positions.values():
+                block[n] = np.nan
+        self._reserve(n + 1)
+        if n == 0:
+            self.tz = dt.tz
+        self._times[n] = dt.value
+
+        self._account[n] = (account.cash, account.margin, account.realized_pnl, account.unrealized_pnl,
+                            account.equity, account.available)
+        width = len(CONTRACT_FIELDS)
+        for symbol, info in contracts_log.items():
+            self._block(self._contracts, symbol, width)[n] = (
+                info['volume'], info['margin'], info['realized_pnl'], info['unrealized_pnl'], info['cost'],
+                info['turnover'])
+        width = len(POSITION_FIELDS)
+        for symbol, pos in positions.items():
+            self._block(self._positions, symbol, width)[n] = (pos.volume, pos.price, pos.margin)
+            self._exchanges.setdefault(symbol, pos.exchange)
+        self._size = n + 1
+
+    def extend(self, times: np.ndarray, account: dict[str, np.ndarray],
+               contracts: dict[str, dict[str, np.ndarray]] | None = None, tz=None):
+        """
+        批量追加（向量化回测使用）
+        :param times: int64 纳秒（UTC）
+        :param account: {field: array}
+        :param contracts: {symbol: {field: array}}，NaN 表示该时点标的尚未出现
+        """
+        # 同一时间只保留最后一行
+        keep = np.r_[times[1:] != times[:-1], True] if len(times) else np.zeros(0, dtype=bool)
+        times = times[keep]
+        start = self._size
+        if start and len(times) and self._times[start - 1] == times[0]:
+            start -= 1
+        stop = start + len(times)
+        self._reserve(stop)
+        if start == 0:
+            self.tz = tz
+        self._times[start:stop] = times
+        self._account[start:stop] = np.column_stack([account[name][keep] for name in ACCOUNT_FIELDS])
+        for symbol, columns in (contracts or {}).items():
+            block = self._block(self._contracts, symbol, len(CONTRACT_FIELDS))
+            block[start:stop] = np.column_stack([columns[name][keep] for name in CONTRACT_FIELDS])
+        self._size = stop
+
+    # =========================
+    # 检查点
+    # =========================
+    def get_state(self) -> dict:
+        """只保存已写入的行"""
+        n = self._size
+        return {
+            'times': self._times[:n].copy(),
+            'account': self._account[:n].copy(),
+            'contracts': {symbol: block[:n].copy() for symbol, block in self._contracts.items()},
+            'positions': {symbol: block[:n].copy() for symbol, block in self._positions.items()},
+            'exchanges': dict(self._exchanges),
+            'tz': self.tz,
+        }
+
+    def set_state(self, state: dict):
+        n = len(state['times'])
+        self._size = 0
+        self._capacity = max(n, 1)
+        self._times = state['times'].copy()
+        self._account = state['account'].copy()
+        self._contracts = {symbol: block.copy() for symbol, block in state['contracts'].items()}
+        self._positions = {symbol: block.copy() for symbol, block in state['positions'].items()}
+        self._exchanges = dict(state['exchanges'])
+        self.tz = state['tz']
+        self._reserve(max(n, 1) * 2)
+        self._size = n
+
+    # =========================
+    # 读取
+    # =========================
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._contracts)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(self._times[:self._size].view('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
+
+    def account_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._account[:self._size], index=self.index, columns=list(ACCOUNT_FIELDS))
+
+    def account_column(self, name: str) -> np.ndarray:
+        """单列视图（不复制）"""
+        return self._account[:self._size, ACCOUNT_FIELDS.index(name)]
+
+    @property
+    def times(self) -> np.ndarray:
+        """时间轴视图（int64 纳秒，有时区时为 UTC）"""
+        return self._times[:self._size]
+
+    def present(self, symbol: str) -> np.ndarray:
+        """标的已出现（有合约记录）的时点"""
+        return ~np.isnan(self._contracts[symbol][:self._size, 0])
+
+    def contract_frame(self, symbol: str, dropna: bool = True) -> pd.DataFrame:
+        """单个标的的合约记录；dropna 时去掉标的出现之前的时点"""
+        frame = pd.DataFrame(self._contracts[symbol][:self._size], index=self.index, columns=list(CONTRACT_FIELDS))
+        if dropna:
+            frame = frame[self.present(symbol)]
+        return frame
+
+    def position_frame(self, symbol: str) -> pd.DataFrame:
+        """单个标的的持仓记录，不持仓的时点为 NaN"""
+        return pd.DataFrame(self._positions[symbol][:self._size], index=self.index, columns=list(POSITION_FIELDS))
+
+    # ---------- 兼容旧的 {datetime: {...}} 字典格式 ----------
+    def account_dict(self) -> dict:
+        rows = self._account[:self._size].tolist()
+        return {t: dict(zip(ACCOUNT_FIELDS, row)) for t, row in zip(self.index.to_list(), rows)}
+
+    def contract_dict(self) -> dict:
+        times = self.index.to_list()
+        result = {t: {} for t in times}
+        for symbol, block in self._contracts.items():
+            for t, row in zip(times, block[:self._size].tolist()):
+                if not np.isnan(row[0]):
+                    result[t][symbol] = dict(zip(CONTRACT_FIELDS, row))
+        return result
+
+    def position_dict(self) -> dict:
+        times = self.index.to_list()
+        result = {t: {} for t in times}
+        for symbol, block in self._positions.items():
+            for t, (volume, price, margin) in zip(times, block[:self._size].tolist()):
+                if not np.isnan(volume):
+                    result[t][symbol] = PositionData(gateway_name=self.gateway_name, symbol=symbol,
+                                                     exchange=self._exchanges.get(symbol), direction=Direction.NET,
+                                                     volume=volume, price=price, margin=margin)
+        return result
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    """扩容，新增部分浮点列填 NaN"""
+    shape = (capacity,) + array.shape[1:]
+    if array.dtype.kind == 'f':
+        new = np.full(shape, np.nan, dtype=array.dtype)
+    else:
+        new = np.empty(shape, dtype=array.dtype)
+    new[:len(array)] = array
+    return new
@@ -0,0 +1,264 @@
+"""
+回测结果缓存（按内容寻址）
+
+键是以下内容的哈希：K 线数据指纹（BarStore.fingerprint）和截取的时间范围、set_contracts 的合约参数、
+策略类（含父类）的源代码和参数、引擎设置（initial_cash、周期等 engine_kwargs）。
+改动与回测无关的代码后重跑同样的回测，直接从缓存返回；策略代码或任何参数变化时键随之变化。
+回测引擎本身的代码不在键里，修改撮合/记账逻辑后需要 clear() 缓存。
+
+每个结果保存为一个压缩的 .npz：统计指标（JSON）、account_daily 各列、成交记录各列。
+目录总大小超过 max_bytes 时按最近使用时间（读取时更新文件 mtime）淘汰最久未用的结果。
+多个进程可以同时读写同一个缓存目录：写入先写临时文件再替换，读到被淘汰的文件按未命中处理。
+
+run_grid / walk_forward 不传 cache 时使用默认目录 CacheInfo.result_cache_dir（环境变量 RESULT_CACHE_DIR，
+为空则不缓存），传 cache=False 关闭缓存。
+
+用法示例：
+-----------
+from backtest.result_cache import ResultCache
+
+cache = ResultCache("~/.cache/autotrade/results", max_bytes=2 << 30)
+res = run_grid(MACDStrategy, {"fast": [8, 12]}, data=[df], contracts=contracts, cache=cache, ...)
+res = run_grid(MACDStrategy, {"fast": [8, 12]}, data=[df], contracts=contracts, cache=False, ...)   # 不用缓存
+"""
+from __future__ import annotations
+
+import enum
+import hashlib
+import inspect
+import json
+import os
+import uuid
+import zipfile
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backtest.bar_store import BarStore
+from coreutils.config import CacheInfo
+from coreutils.constant import Direction, OrderStatus
+
+# 键的格式版本，缓存内容或键的组成变化时递增
+CACHE_VERSION = 2
+ACCOUNT_COLUMNS = ('cash', 'margin', 'realized_pnl', 'unrealized_pnl', 'equity', 'available')
+TRADE_COLUMNS = ("datetime", "symbol", "orderid", "direction", "price", "traded", "volume", "avgFillPrice", "status")
+
+
+@dataclass
+class CachedResult:
+    statistics: dict
+    account_daily: pd.DataFrame
+    trade_log: pd.DataFrame
+
+
+def _canonical(obj):
+    """参数转成可稳定序列化的形式（枚举按名称，类按模块路径）"""
+    if isinstance(obj, enum.Enum):
+        return f"{type(obj).__name__}.{obj.name}"
+    if isinstance(obj, dict):
+        return {str(key): _canonical(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if isinstance(obj, type):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if isinstance(obj, (pd.Timestamp, pd.Timedelta, pd.DateOffset)):
+        return str(obj)
+    return repr(obj)
+
+
+def strategy_source(strategy_cls) -> str:
+    """策略类及其父类（object 除外）的源代码；取不到源代码时用类的路径"""
+    parts = []
+    for cls in strategy_cls.__mro__:
+        if cls is object:
+            continue
+        try:
+            parts.append(inspect.getsource(cls))
+        except (OSError, TypeError):
+            parts.append(f"{cls.__module__}.{cls.__qualname__}")
+    return "\n".join(parts)
+
+
+def cache_key(store: BarStore, strategy_cls, params: dict, contracts: dict[str, dict],
+              strategy_kwargs: dict | None = None, engine_kwargs: dict | None = None,
+              time_range: tuple | None = None) -> str:
+    content = {
+        "version": CACHE_VERSION,
+        "data": store.fingerprint(),
+        "time_range": _canonical(time_range),
+        "contracts": _canonical(contracts),
+        "strategy": hashlib.blake2b(strategy_source(strategy_cls).encode("utf-8"), digest_size=16).hexdigest(),
+        "params": _canonical({**(strategy_kwargs or {}), **params}),
+        "engine": _canonical(engine_kwargs or {}),
+    }
+    text = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    :param path: 缓存目录，默认取环境变量 RESULT_CACHE_DIR
+    :param max_bytes: 目录总大小上限，超过时按 LRU 淘汰
+    """
+
+    def __init__(self, path: str | None = None, max_bytes: int = 1 << 30):
+        self.path = os.path.expanduser(path or CacheInfo.result_cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.npz")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._file(key))
+
+    def get(self, key: str) -> CachedResult | None:
+        file = self._file(key)
+        try:
+            with np.load(file) as data:
+                result = _decode(data)
+            # 读取即"使用"，LRU 按 mtime 淘汰
+            os.utime(file)
+        except (FileNotFoundError, zipfile.BadZipFile, KeyError, ValueError):
+            return None
+        return result
+
+    def get_statistics(self, key: str) -> dict | None:
+        """只读取统计指标（不解压资金曲线和成交记录）"""
+        file = self._file(key)
+        try:
+            with np.load(file) as data:
+                statistics = json.loads(str(data["statistics"]))
+            os.utime(file)
+        except (FileNotFoundError, zipfile.BadZipFile, KeyError, ValueError):
+            return None
+        return statistics
+
+    def put(self, key: str, statistics: dict, account_daily: pd.DataFrame, trade_log: pd.DataFrame):
+        file = self._file(key)
+        tmp = f"{file}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **_encode(statistics, account_daily, trade_log))
+        os.replace(tmp, file)
+        self._evict()
+
+    def put_engine(self, key: str, engine):
+        """保存跑完的 BacktestEngine 的统计指标、资金曲线和成交记录"""
+        self.put(key, engine.statistics, engine.get_account_daily_df(), engine.get_trade_log_df())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, file, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, file, _ in self._entries():
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+
+_default_cache = None
+
+
+def get_default_cache() -> ResultCache | None:
+    """默认目录下的缓存，RESULT_CACHE_DIR 为空时返回 None"""
+    global _default_cache
+    if not CacheInfo.result_cache_dir:
+        return None
+    if _default_cache is None or _default_cache.path != os.path.expanduser(CacheInfo.result_cache_dir):
+        _default_cache = ResultCache()
+    return _default_cache
+
+
+def resolve_cache(cache: ResultCache | str | bool | None) -> ResultCache | None:
+    """参数扫描的 cache 参数：None 用默认缓存，False 不用缓存，字符串为缓存目录"""
+    if cache is None:
+        return get_default_cache()
+    if cache is False:
+        return None
+    return ResultCache(cache) if isinstance(cache, str) else cache
+
+
+def _encode(statistics: dict, account: pd.DataFrame, trade_log: pd.DataFrame) -> dict[str, np.ndarray]:
+    stats = {key: _canonical(value) for key, value in statistics.items() if not isinstance(value, np.ndarray)}
+    index = pd.DatetimeIndex(account.index)
+    arrays = {
+        "statistics": np.array(json.dumps(stats)),
+        "account_index": index.as_unit("ns").asi8,
+        "account_tz": np.array(str(index.tz) if index.tz is not None else ""),
+    }
+    for column in ACCOUNT_COLUMNS:
+        arrays[f"account_{column}"] = account[column].to_numpy(dtype=np.float64)
+    n = len(trade_log)
+    if n:
+        dt = pd.DatetimeIndex(pd.to_datetime(trade_log["datetime"]))
+        arrays["trade_datetime"] = dt.as_unit("ns").asi8
+        arrays["trade_tz"] = np.array(str(dt.tz) if dt.tz is not None else "")
+        for column in ("symbol", "orderid"):
+            arrays[f"trade_{column}"] = trade_log[column].astype(str).to_numpy(dtype=str)
+        for column in ("direction", "status"):
+            arrays[f"trade_{column}"] = np.array([v.name if v is not None else "" for v in trade_log[column]],
+                                                 dtype=str)
+        for column in ("price", "traded", "volume", "avgFillPrice"):
+            # 保留原 dtype（成交量可能是整数），混合类型的列按浮点保存
+            values = trade_log[column].to_numpy()
+            arrays[f"trade_{column}"] = values.astype(np.float64) if values.dtype == object else values
+    return arrays
+
+
+def _decode(data) -> CachedResult:
+    statistics = json.loads(str(data["statistics"]))
+    index = pd.DatetimeIndex(data["account_index"].view("datetime64[ns]"))
+    tz = str(data["account_tz"])
+    if tz:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    account = pd.DataFrame({column: data[f"account_{column}"] for column in ACCOUNT_COLUMNS}, index=index)
+
+    if "trade_datetime" in data.files:
+        dt = pd.DatetimeIndex(data["trade_datetime"].view("datetime64[ns]"))
+        tz = str(data["trade_tz"])
+        if tz:
+            dt = dt.tz_localize("UTC").tz_convert(tz)
+        trade_log = pd.DataFrame({
+            "datetime": dt,
+            "symbol": data["trade_symbol"].astype(object),
+            "orderid": data["trade_orderid"].astype(object),
+            "direction": [Direction[name] if name else None for name in data["trade_direction"].tolist()],
+            "price": data["trade_price"],
+            "traded": data["trade_traded"],
+            "volume": data["trade_volume"],
+            "avgFillPrice": data["trade_avgFillPrice"],
+            "status": [OrderStatus[name] if name else None for name in data["trade_status"].tolist()],
+        })
+    else:
+        trade_log = pd.DataFrame({column: [] for column in TRADE_COLUMNS})
+    return CachedResult(statistics=statistics, account_daily=account, trade_log=trade_log)
@@ -0,0 +1,149 @@
+"""
+稳健性分析：对回测的成交和资金曲线做蒙特卡洛重抽样，得到回撤、Sharpe 等指标的分布（置信区间）
+
+三种模拟：
+- shuffle：逐笔净盈亏（已实现盈亏 - 手续费）随机重排顺序，总收益不变，看回撤和路径指标对成交顺序的敏感度
+- skip：每笔成交以 skip_prob 的概率被跳过（漏单、信号没执行），顺序不变
+- bootstrap：盯市周期收益的移动块自助法（block bootstrap），保留块内的自相关
+
+每种模拟按 (模拟次数, 成交数/周期数) 的二维数组批量计算，指标用 analytics.equity_metrics 一次算完一整块；
+模拟次数较多时分块，workers > 1 时各块分给进程池。随机数由 seed 派生出每块独立的序列，结果与 workers 无关。
+
+成交序列的资金曲线以成交为时点：年化按"每个盯市周期平均成交笔数"换算，与 calculate_statistics 的口径一致。
+
+用法示例：
+-----------
+from backtest.robustness import monte_carlo, summarize
+
+dist = monte_carlo(engine.oms.trade_log, engine.recorder, engine.initial_cash, sizes=engine.oms.sizes,
+                   long_rates=engine.oms.long_rates, short_rates=engine.oms.short_rates, n_sims=10_000)
+print(summarize(dist, ("max_drawdown", "sharpe")))
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.analytics import equity_metrics
+from backtest.recorder import BacktestRecorder
+from backtest.vectorized import trade_states
+from coreutils.constant import Direction
+from coreutils.object import TradeData
+
+METHODS = ("shuffle", "skip", "bootstrap")
+# 每块模拟的元素数上限（模拟次数 x 时点数），控制单块的内存
+CHUNK_ELEMENTS = 4_000_000
+
+
+def trade_pnl(trade_log: list[TradeData], sizes: dict[str, float] | None = None,
+              long_rates: dict[str, float] | None = None, short_rates: dict[str, float] | None = None) -> np.ndarray:
+    """逐笔成交的净盈亏（该笔成交带来的已实现盈亏减去手续费），按 trade_log 顺序，记账方式同 BacktestOms"""
+    sizes, long_rates, short_rates = sizes or {}, long_rates or {}, short_rates or {}
+    symbol = np.array([trade.symbol for trade in trade_log], dtype=object)
+    volume = np.array([trade.volume if trade.direction == Direction.LONG else -trade.volume
+                       for trade in trade_log], dtype=np.float64)
+    price = np.array([trade.price for trade in trade_log], dtype=np.float64)
+    pnl = np.zeros(len(trade_log))
+    for name in np.unique(symbol):
+        idx = np.flatnonzero(symbol == name)
+        state = trade_states(volume[idx], price[idx], sizes.get(name, 1), long_rates.get(name, 0),
+                             short_rates.get(name, 0), 0)
+        pnl[idx] = np.diff(state["realized_pnl"] - state["commission"], prepend=0.0)
+    return pnl
+
+
+def _pnl_equity(pnl: np.ndarray, initial_cash: float) -> np.ndarray:
+    """(模拟次数, 成交数) 的盈亏 -> 以初始资金开头的资金曲线"""
+    equity = np.empty((pnl.shape[0], pnl.shape[1] + 1))
+    equity[:, 0] = initial_cash
+    np.cumsum(pnl, axis=1, out=equity[:, 1:])
+    equity[:, 1:] += initial_cash
+    return equity
+
+
+def _simulate(method: str, data: np.ndarray, n_sims: int, seed: np.random.SeedSequence, initial_cash: float,
+              risk_free: float, annual_days: float, skip_prob: float, block: int) -> dict[str, np.ndarray]:
+    """一块模拟：返回 {指标: (n_sims,) 数组}"""
+    rng = np.random.default_rng(seed)
+    if method == "shuffle":
+        equity = _pnl_equity(rng.permuted(np.tile(data, (n_sims, 1)), axis=1), initial_cash)
+    elif method == "skip":
+        equity = _pnl_equity(np.where(rng.random((n_sims, len(data))) < skip_prob, 0.0, data), initial_cash)
+    elif method == "bootstrap":
+        # data 为盯市周期的资金曲线，按块抽取周期收益后从起点重新复利
+        returns = data[1:] / data[:-1] - 1
+        m = len(returns)
+        block = min(block, m)
+        starts = rng.integers(0, m - block + 1, (n_sims, -(-m // block)))
+        sample = returns[(starts[:, :, None] + np.arange(block)).reshape(n_sims, -1)[:, :m]]
+        equity = np.empty((n_sims, m + 1))
+        equity[:, 0] = data[0]
+        np.cumprod(1 + sample, axis=1, out=equity[:, 1:])
+        equity[:, 1:] *= data[0]
+    else:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    return equity_metrics(equity, initial_cash, risk_free, annual_days)
+
+
+def monte_carlo(trade_log: list[TradeData], recorder: BacktestRecorder, initial_cash: float,
+                sizes: dict[str, float] | None = None, long_rates: dict[str, float] | None = None,
+                short_rates: dict[str, float] | None = None, n_sims: int = 10_000,
+                methods: tuple[str, ...] = METHODS, skip_prob: float = 0.1, block: int = 20,
+                risk_free: float = 0.02, annual_days: int = 240, seed: int | None = 0,
+                workers: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    :param trade_log: BacktestOms.trade_log
+    :param recorder: 回测的 BacktestRecorder（bootstrap 用其中的 equity，成交序列的年化也按它的周期数换算）
+    :param sizes/long_rates/short_rates: 合约乘数和手续费率（BacktestOms 的同名属性）
+    :param n_sims: 每种方法的模拟次数
+    :param skip_prob: skip 模拟中每笔成交被跳过的概率
+    :param block: bootstrap 的块长（盯市周期数）
+    :param workers: 进程数，1 表示在当前进程计算
+    :return: {方法: DataFrame}，每行一次模拟，列为 equity_metrics 的指标
+    """
+    equity = np.asarray(recorder.account_column("equity"), dtype=np.float64)
+    pnl = trade_pnl(trade_log, sizes, long_rates, short_rates)
+    # 成交序列每个时点是一笔成交：每年成交笔数 = 每年盯市周期数 x 每周期平均成交数
+    trade_days = annual_days * len(pnl) / max(len(equity) - 1, 1)
+
+    jobs = []
+    for method in methods:
+        data = equity if method == "bootstrap" else pnl
+        if len(data) < 2:
+            continue
+        chunk = max(1, CHUNK_ELEMENTS // len(data))
+        sizes_ = [min(chunk, n_sims - start) for start in range(0, n_sims, chunk)]
+        seeds = np.random.SeedSequence([seed if seed is not None else np.random.SeedSequence().entropy,
+                                        METHODS.index(method)]).spawn(len(sizes_))
+        days = annual_days if method == "bootstrap" else trade_days
+        for n, child in zip(sizes_, seeds):
+            jobs.append((method, (method, data, n, child, initial_cash, risk_free, days, skip_prob, block)))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_simulate, *zip(*(args for _, args in jobs))))
+    else:
+        parts = [_simulate(*args) for _, args in jobs]
+
+    result = {}
+    for method in methods:
+        chunks = [part for (name, _), part in zip(jobs, parts) if name == method]
+        if chunks:
+            result[method] = pd.DataFrame({key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]})
+    return result
+
+
+def summarize(result: dict[str, pd.DataFrame], metrics: tuple[str, ...] | None = None,
+              quantiles: tuple[float, ...] = (0.05, 0.5, 0.95)) -> pd.DataFrame:
+    """各方法、各指标的均值和分位数，行索引为 (方法, 指标)"""
+    rows = {}
+    for method, frame in result.items():
+        frame = frame if metrics is None else frame[list(metrics)]
+        table = frame.quantile(list(quantiles)).T
+        table.columns = [f"q{q * 100:g}" for q in quantiles]
+        table.insert(0, "mean", frame.mean())
+        for metric, row in table.iterrows():
+            rows[(method, metric)] = row
+    return pd.DataFrame(rows).T
@@ -0,0 +1,151 @@
+"""
+回测模拟时钟与延迟
+
+BacktestEventEngine.put 是同步处理的，策略在 on_bar 里发出的请求立即进入 gateway，没有任何延迟。
+设置延迟模型（BacktestEngine.set_latency）后：
+- 下单 / 改单 / 撤单请求经过 order / cancel 延迟后才到达 gateway
+- 委托回报、成交回报、持仓推送经过 report 延迟后才到达 oms 和策略
+- 行情按时间推进：每根 bar 推送前先处理到期的消息；逐笔撮合时消息按到达时间插在逐笔成交之间
+
+SimScheduler 是按模拟时间（int64 纳秒）排序的最小堆，元素为 (到达时间, 序号, 消息类型, 数据) 的元组，
+消息类型是 handlers 表的下标，不保存函数对象，可以直接写入检查点。
+请求、回报各自是一条先进先出的通道：后发的消息不会早于先发的到达（撤单不会跑到下单前面）。
+延迟为 0 且通道中没有排队的消息时直接同步处理，与不设置延迟模型的结果一致。
+
+用法示例：
+-----------
+engine.set_latency(LatencyModel(order=('lognormal', 0.02, 0.5), report=0.005, seed=7))
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from heapq import heappop, heappush
+
+import numpy as np
+
+# 延迟种类；每种一个独立的随机数发生器，互不影响抽样顺序
+LATENCY_KINDS = ('order', 'cancel', 'report')
+# 每次从随机数发生器批量抽取的样本数
+_SAMPLE_BATCH = 4096
+
+
+class LatencyModel:
+    """
+    各类消息的延迟分布，单位秒：
+    - 数字：固定延迟
+    - ('uniform', low, high)
+    - ('lognormal', median, sigma)
+    - ('exponential', mean)
+    - ('normal', mean, std)，小于 0 的样本按 0 处理
+    cancel 为 None 时与 order 相同。同一个 seed 得到相同的延迟序列。
+    """
+
+    def __init__(self, order=0.0, cancel=None, report=0.0, seed: int | None = 0):
+        self.specs = {'order': order, 'cancel': order if cancel is None else cancel, 'report': report}
+        for spec in self.specs.values():
+            _check_spec(spec)
+        self.seed = seed
+        self._rngs: dict[str, np.random.Generator] = {}
+        self._buffers: dict[str, list[int]] = {}
+        self.reset()
+
+    def reset(self):
+        """按 seed 重新开始延迟序列"""
+        streams = np.random.SeedSequence(self.seed).spawn(len(LATENCY_KINDS))
+        self._rngs = {kind: np.random.default_rng(s) for kind, s in zip(LATENCY_KINDS, streams)}
+        self._buffers = {kind: [] for kind in LATENCY_KINDS}
+
+    def sample(self, kind: str) -> int:
+        """抽取一个延迟，单位纳秒"""
+        spec = self.specs[kind]
+        if not isinstance(spec, tuple):
+            return int(spec * 1_000_000_000)
+        buffer = self._buffers[kind]
+        if not buffer:
+            buffer.extend(_draw(self._rngs[kind], spec, _SAMPLE_BATCH)[::-1].tolist())
+        return buffer.pop()
+
+
+def _check_spec(spec):
+    if isinstance(spec, tuple):
+        if spec[0] not in ('uniform', 'lognormal', 'exponential', 'normal'):
+            raise ValueError(f"unknown latency distribution {spec[0]!r}")
+    elif spec < 0:
+        raise ValueError("latency must be non-negative")
+
+
+def _draw(rng: np.random.Generator, spec: tuple, n: int) -> np.ndarray:
+    name, *args = spec
+    if name == 'uniform':
+        seconds = rng.uniform(args[0], args[1], n)
+    elif name == 'lognormal':
+        seconds = args[0] * np.exp(rng.normal(0.0, args[1], n))
+    elif name == 'exponential':
+        seconds = rng.exponential(args[0], n)
+    else:
+        seconds = rng.normal(args[0], args[1], n)
+    return np.maximum(seconds * 1e9, 0).astype(np.int64)
+
+
+class SimScheduler:
+    """
+    :param handlers: 消息类型 -> 处理函数，消息类型即该列表的下标
+    :param channels: 通道数；同一通道内按发出顺序到达
+    """
+
+    def __init__(self, handlers: list[Callable], channels: int = 2):
+        self.handlers = handlers
+        self.now = 0
+        self._heap: list[tuple] = []
+        self._seq = 0
+        # 每个通道最后一条消息的到达时间
+        self._tails = [0] * channels
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def submit(self, channel: int, delay: int, kind: int, data):
+        """经过 delay 纳秒后在 channel 上投递；能立即投递时同步处理"""
+        when = self.now + delay
+        tail = self._tails[channel]
+        if when <= self.now and tail <= self.now:
+            self.handlers[kind](data)
+            return
+        when = max(when, tail)
+        self._tails[channel] = when
+        heappush(self._heap, (when, self._seq, kind, data))
+        self._seq += 1
+
+    def next_time(self) -> int | None:
+        return self._heap[0][0] if self._heap else None
+
+    def run_next(self):
+        when, _, kind, data = heappop(self._heap)
+        self.now = max(self.now, when)
+        self.handlers[kind](data)
+
+    def run_until(self, when: int):
+        """处理到达时间不晚于 when 的全部消息，然后把时钟推进到 when（时钟不会倒退）"""
+        heap = self._heap
+        handlers = self.handlers
+        while heap and heap[0][0] <= when:
+            at, _, kind, data = heappop(heap)
+            if at > self.now:
+                self.now = at
+            handlers[kind](data)
+        if when > self.now:
+            self.now = when
+
+    def drain(self):
+        """处理全部未到达的消息"""
+        while self._heap:
+            self.run_next()
+
+    def get_state(self) -> dict:
+        return {'now': self.now, 'heap': list(self._heap), 'seq': self._seq, 'tails': list(self._tails)}
+
+    def set_state(self, state: dict):
+        self.now = state['now']
+        self._heap = state['heap']
+        self._seq = state['seq']
+        self._tails = state['tails']
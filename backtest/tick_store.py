@@ -0,0 +1,89 @@
+"""
+列式逐笔成交 TickStore
+
+mhi_tick 表（time, price, volume, ticker_direction）转成 NumPy 列，供 BacktestGateway 的逐笔撮合使用：
+    datetime:  int64 纳秒（带时区的时间按 UTC 保存）
+    price / volume: float64
+    direction: int8，主动买 1 / 主动卖 -1 / 中性 0（ticker_direction 为 BUY / SELL / NEUTRAL）
+每个 symbol 一个 TickStore，按时间升序。千万级逐笔只占几百 MB，撮合时不为每笔成交创建 TickData。
+
+用法示例：
+-----------
+ticks = TickStore.from_db('HKEX', 'HK.MHImain', start_date='2024-01-01', end_date='2024-02-01')
+engine.load_ticks([ticks])
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+TICK_BUY = 1
+TICK_SELL = -1
+TICK_NEUTRAL = 0
+DIRECTION_CODES = {'BUY': TICK_BUY, 'SELL': TICK_SELL, 'NEUTRAL': TICK_NEUTRAL}
+
+
+class TickStore:
+
+    def __init__(self, symbol: str, datetime: np.ndarray, price: np.ndarray, volume: np.ndarray,
+                 direction: np.ndarray | None = None, tz=None):
+        self.symbol = symbol
+        self.datetime = datetime
+        self.price = price
+        self.volume = volume
+        self.direction = direction if direction is not None else np.zeros(len(datetime), dtype=np.int8)
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, symbol: str | None = None, time_column: str = 'time',
+                   symbol_column: str = 'code') -> "TickStore":
+        """
+        :param data: 至少包含时间列、price、volume，可选 ticker_direction
+        :param symbol: 默认取 symbol_column 的第一个值
+        """
+        if symbol is None:
+            symbol = str(data[symbol_column].iloc[0])
+        dt = pd.to_datetime(data[time_column])
+        tz = dt.dt.tz
+        ns = dt.dt.tz_convert('UTC').dt.tz_localize(None) if tz is not None else dt
+        datetime = ns.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = np.argsort(datetime, kind='stable')
+        if 'ticker_direction' in data.columns:
+            direction = data['ticker_direction'].map(DIRECTION_CODES).fillna(TICK_NEUTRAL).to_numpy(dtype=np.int8)
+        else:
+            direction = np.zeros(len(data), dtype=np.int8)
+        return cls(symbol, datetime[order], data['price'].to_numpy(dtype=np.float64)[order],
+                   data['volume'].to_numpy(dtype=np.float64)[order], direction[order], tz=tz)
+
+    @classmethod
+    def from_db(cls, db_name: str, symbol: str, table_name: str = 'mhi_tick', start_date=None, end_date=None,
+                chunksize: int = 1_000_000, engine=None) -> "TickStore":
+        """分块读取逐笔成交表，每块转成数组后再拼接，不保留整张表的 DataFrame"""
+        from data.db_query import stream_kline
+
+        parts = [cls.from_frame(chunk, symbol=symbol)
+                 for chunk in stream_kline(db_name, table_name, start_date=start_date, end_date=end_date,
+                                           chunksize=chunksize, engine=engine, time_column='time')
+                 if not chunk.empty]
+        if not parts:
+            return cls(symbol, np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+        return cls(symbol, *(np.concatenate([getattr(p, name) for p in parts])
+                             for name in ('datetime', 'price', 'volume', 'direction')), tz=parts[0].tz)
+
+    def __len__(self) -> int:
+        return len(self.datetime)
+
+    def to_ns(self, value) -> int:
+        ts = pd.Timestamp(value)
+        if ts.tz is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return ts.value
+
+    def to_datetime(self, ns: int) -> pd.Timestamp:
+        ts = pd.Timestamp(ns)
+        if self.tz is not None:
+            ts = ts.tz_localize('UTC').tz_convert(self.tz)
+        return ts
+
+    def searchsorted(self, value, side: str = 'left') -> int:
+        return int(np.searchsorted(self.datetime, self.to_ns(value), side=side))
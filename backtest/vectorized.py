@@ -0,0 +1,191 @@
+"""
+向量化快速回测
+
+给定每个标的在撮合周期 bar 上的目标仓位数组，直接用 NumPy 算出成交、手续费、保证金、
+已实现/浮动盈亏和权益曲线，不再经过事件引擎、策略对齐、gateway 撮合和 oms 的逐事件处理。
+
+与事件驱动路径保持一致的规则：
+- 第 i 根撮合 bar 的目标仓位在该 bar 的事件里发出，随后 gateway 用同一根 bar 撮合
+  （BacktestEngine.on_bar 先推送 bar 事件，再调用 gateway.on_bar）
+- 市价单成交价：买 max(trigger_price, open)，卖 min(trigger_price, open)，没有 trigger_price 时用 open
+- 手续费、均价、翻仓、保证金与 BacktestOms.process_trade_event 相同
+- 盯市窗口与 BacktestEngine.run 相同：遇到新窗口的第一根 daily_update_interval bar 时，
+  用上一窗口的收盘价记一次账，key 是新窗口的时间；最后一个窗口用自己的时间
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from backtest.bar_store import BarStore
+from coreutils.constant import Interval
+
+
+@dataclass
+class VectorizedResult:
+    """向量化回测结果（全部为数组，长度等于盯市次数）"""
+    times: np.ndarray
+    account: dict[str, np.ndarray]
+    # {symbol: {field: array}}，标的首笔成交之前为 NaN（与 contracts_log 首次成交才建档一致）
+    contracts: dict[str, dict[str, np.ndarray]]
+    # 成交明细：symbol / datetime(ns) / direction(+1/-1) / price / volume
+    trades: dict[str, np.ndarray] = field(default_factory=dict)
+
+
+def trade_states(delta: np.ndarray, price: np.ndarray, size: float, long_rate: float, short_rate: float,
+                  margin_rate: float) -> dict[str, np.ndarray]:
+    """
+    逐笔复现 BacktestOms 的仓位/均价/已实现盈亏。成交是稀疏的，只在成交点上循环。
+    返回每笔成交之后的累计状态。
+    """
+    n = len(delta)
+    out = {name: np.empty(n) for name in ('volume', 'price', 'margin', 'realized_pnl', 'commission', 'cost')}
+    volume = 0.0
+    avg_price = 0.0
+    realized = 0.0
+    commission = 0.0
+    cost = 0.0
+    for k, (new_volume, new_price) in enumerate(zip(delta.tolist(), price.tolist())):
+        turnover = new_price * abs(new_volume) * size
+        commission += turnover * (long_rate if new_volume > 0 else short_rate)
+        cost += turnover
+        if volume * new_volume > 0:
+            total = volume + new_volume
+            avg_price = (avg_price * abs(volume) + new_price * abs(new_volume)) / abs(total)
+        else:
+            close_qty = min(abs(volume), abs(new_volume))
+            if volume > 0:
+                realized += (new_price - avg_price) * close_qty * size
+            else:
+                realized += (avg_price - new_price) * close_qty * size
+            total = volume + new_volume
+            if abs(new_volume) >= abs(volume):
+                avg_price = new_price
+        volume = total
+        if volume == 0:
+            avg_price = 0.0
+        out['volume'][k] = volume
+        out['price'][k] = avg_price
+        out['margin'][k] = abs(volume) * new_price * size * margin_rate
+        out['realized_pnl'][k] = realized
+        out['commission'][k] = commission
+        out['cost'][k] = cost
+    return out
+
+
+def simulate_targets(store: BarStore, signals: dict[str, np.ndarray],
+                     matched_interval: Interval, daily_update_interval: Interval,
+                     contract_params: dict[str, dict], initial_cash: float,
+                     trigger_prices: dict[str, np.ndarray] | None = None) -> VectorizedResult:
+    """
+    :param signals: {symbol: 目标仓位数组}，与 store 中该标的 matched_interval 的 bar 一一对应（按时间升序）
+    :param contract_params: {symbol: {"size","long_rate","short_rate","margin_rate"}}，缺省值与 BacktestOms 一致
+    :param trigger_prices: {symbol: 数组}，对应市价单的 trigger_price（如 MACDStrategy 用信号 bar 的收盘价）
+    """
+    trigger_prices = trigger_prices or {}
+    # 每一行在全局回放顺序里的位置
+    global_pos = np.empty(len(store), dtype=np.int64)
+    global_pos[store.order] = np.arange(len(store))
+
+    # ---------- 盯市窗口 ----------
+    daily_rows = store.source_rows(interval=daily_update_interval)
+    daily_rows = daily_rows[np.argsort(global_pos[daily_rows], kind='stable')]
+    if len(daily_rows) == 0:
+        raise ValueError(f"no bars of daily_update_interval {daily_update_interval}")
+    daily_dt = store.datetime[daily_rows]
+    new_window = np.r_[True, daily_dt[1:] != daily_dt[:-1]]
+    window_id = np.cumsum(new_window) - 1
+    first_rows = daily_rows[new_window]
+    n_windows = len(first_rows)
+
+    # 第 k 次记账发生在窗口 k+1 的第一根 bar 处（最后一次在回放结束后），key 为该窗口时间
+    times = np.r_[store.datetime[first_rows[1:]], store.datetime[first_rows[-1]]]
+    snapshot_pos = np.r_[global_pos[first_rows[1:]], np.iinfo(np.int64).max]
+
+    # 窗口收盘价矩阵 [window, symbol]，同一窗口同一标的取最后一根
+    n_symbols = len(store.symbols)
+    window_close = np.full((n_windows, n_symbols), np.nan)
+    daily_symbol = store.symbol_id[daily_rows]
+    key = window_id * n_symbols + daily_symbol
+    _, last = np.unique(key[::-1], return_index=True)
+    last = len(key) - 1 - last
+    window_close[window_id[last], daily_symbol[last]] = store.close[daily_rows[last]]
+
+    # ---------- 逐标的计算 ----------
+    cash = np.full(n_windows, float(initial_cash))
+    margin_total = np.zeros(n_windows)
+    realized_total = np.zeros(n_windows)
+    unrealized_total = np.zeros(n_windows)
+    contracts = {}
+    trade_parts = []
+
+    for symbol, target in signals.items():
+        rows = store.source_rows(symbol=symbol, interval=matched_interval)
+        target = np.asarray(target, dtype=np.float64)
+        if len(target) != len(rows):
+            raise ValueError(f"signals[{symbol}] has {len(target)} values, expected {len(rows)} "
+                             f"{matched_interval} bars")
+        params = contract_params.get(symbol, {})
+        size = params.get("size", 1)
+        margin_rate = params.get("margin_rate", 0.1)
+
+        delta = np.diff(target, prepend=0.0)
+        idx = np.flatnonzero(delta)
+        trade_rows = rows[idx]
+        price = store.open[trade_rows]
+        if symbol in trigger_prices:
+            trigger = np.asarray(trigger_prices[symbol], dtype=np.float64)[idx]
+            price = np.where(delta[idx] > 0, np.maximum(trigger, price), np.minimum(trigger, price))
+        state = trade_states(delta[idx], price, size, params.get("long_rate", 0),
+                              params.get("short_rate", 0), margin_rate)
+
+        # 每次记账时已发生的成交笔数
+        n_done = np.searchsorted(global_pos[trade_rows], snapshot_pos, side='right')
+        has_trade = n_done > 0
+        last_trade = np.maximum(n_done - 1, 0)
+
+        def at(name):
+            return np.where(has_trade, state[name][last_trade], 0.0) if len(idx) else np.zeros(n_windows)
+
+        volume = at('volume')
+        close = window_close[:, store.symbols.index(symbol)]
+        priced = ~np.isnan(close) & (volume != 0)
+        unrealized = np.where(priced, (np.nan_to_num(close) - at('price')) * volume * size, 0.0)
+
+        cash += at('realized_pnl') - at('commission')
+        margin_total += at('margin')
+        realized_total += at('realized_pnl')
+        unrealized_total += unrealized
+
+        mask = np.where(has_trade, 1.0, np.nan)
+        contracts[symbol] = {
+            'volume': volume * mask,
+            'margin': at('margin') * mask,
+            'realized_pnl': at('realized_pnl') * mask,
+            'unrealized_pnl': unrealized * mask,
+            'cost': at('cost') * mask,
+            'turnover': at('cost') * mask,
+        }
+        trade_parts.append((symbol, store.datetime[trade_rows], np.sign(delta[idx]), price, np.abs(delta[idx])))
+
+    account = {
+        'cash': cash,
+        'margin': margin_total,
+        'realized_pnl': realized_total,
+        'unrealized_pnl': unrealized_total,
+        'equity': cash + unrealized_total,
+        'available': cash + unrealized_total - margin_total,
+    }
+    trades = {}
+    if trade_parts:
+        trades = {
+            'symbol': np.concatenate([np.full(len(p[1]), p[0], dtype=object) for p in trade_parts]),
+            'datetime': np.concatenate([p[1] for p in trade_parts]),
+            'direction': np.concatenate([p[2] for p in trade_parts]),
+            'price': np.concatenate([p[3] for p in trade_parts]),
+            'volume': np.concatenate([p[4] for p in trade_parts]),
+        }
+        order = np.argsort(trades['datetime'], kind='stable')
+        trades = {name: col[order] for name, col in trades.items()}
+    return VectorizedResult(times=times, account=account, contracts=contracts, trades=trades)
@@ -0,0 +1,143 @@
+"""
+Walk-forward 优化
+
+把回测数据按时间切成若干 (样本内, 样本外) 窗口：
+- rolling: 样本内窗口长度固定，整体向前滚动
+- anchored: 样本内窗口起点固定在数据开头，终点向前延伸
+
+所有窗口的样本内网格搜索一次性提交到同一个进程池，然后用每个窗口选出的最优参数并行跑样本外，
+最后把样本外的资金曲线首尾相接，拼成一条与 account_daily 列一致的资金曲线。
+
+数据只构建一次 BarStore，子进程通过内存映射共享；每个窗口只是按时间二分截取的切片，
+同一进程内同一窗口的多个参数组合复用同一个切片，不会重复 load_data。
+每个窗口都从空仓、空指标开始，指标的预热在窗口内部完成。
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backtest.bar_store import BarStore
+from backtest.optimize import expand_grid, execute_tasks, sort_results
+from backtest.result_cache import ResultCache
+
+ACCOUNT_COLUMNS = ['cash', 'margin', 'realized_pnl', 'unrealized_pnl', 'equity', 'available']
+
+
+@dataclass
+class WalkForwardResult:
+    # 每个窗口一行：时间范围、选中的参数、样本内指标、样本外指标
+    windows: pd.DataFrame
+    # 拼接后的样本外资金曲线，列与 BacktestEngine.get_account_daily_df() 相同
+    account_daily: pd.DataFrame
+    # 全部样本内网格结果（带 window 列）
+    in_sample: pd.DataFrame
+
+
+def make_windows(start, end, train, test, anchored: bool = False, step=None) -> list[tuple]:
+    """
+    生成 [(train_start, train_end, test_start, test_end)]，区间均为左闭右开
+    :param train/test/step: pd.Timedelta / pd.DateOffset 或可被 pd.tseries.frequencies.to_offset 解析的字符串，
+                            如 "180D"、"30D"；step 默认等于 test
+    """
+    train = pd.tseries.frequencies.to_offset(train) if isinstance(train, str) else train
+    test = pd.tseries.frequencies.to_offset(test) if isinstance(test, str) else test
+    step = test if step is None else (pd.tseries.frequencies.to_offset(step) if isinstance(step, str) else step)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    windows = []
+    train_start = start
+    train_end = start + train
+    while train_end < end:
+        test_end = min(train_end + test, end)
+        windows.append((train_start if not anchored else start, train_end, train_end, test_end))
+        train_end = train_end + step
+        train_start = train_start + step
+    return windows
+
+
+def stitch_accounts(accounts: list[pd.DataFrame], initial_cash: float) -> pd.DataFrame:
+    """
+    样本外资金曲线首尾相接：每段的 cash/equity/available/realized_pnl 加上前面各段累计的盈亏，
+    仓位相关的 margin/unrealized_pnl 保持原值（每段都从空仓开始）
+    """
+    parts = []
+    carried_pnl = 0.0
+    carried_realized = 0.0
+    for account in accounts:
+        if account is None or account.empty:
+            continue
+        seg = account[ACCOUNT_COLUMNS].copy()
+        for column in ('cash', 'equity', 'available'):
+            seg[column] += carried_pnl
+        seg['realized_pnl'] += carried_realized
+        carried_pnl = seg['equity'].iloc[-1] - initial_cash
+        carried_realized = seg['realized_pnl'].iloc[-1]
+        parts.append(seg)
+    if not parts:
+        return pd.DataFrame(columns=ACCOUNT_COLUMNS)
+    return pd.concat(parts)
+
+
+def walk_forward(strategy_cls, param_grid: dict[str, list] | list[dict], data: list[pd.DataFrame] | BarStore,
+                 contracts: dict[str, dict], train, test, anchored: bool = False, step=None,
+                 strategy_kwargs: dict | None = None, engine_kwargs: dict | None = None,
+                 sort_by: str = "sharpe", workers: int | None = None, timeout: float | None = None,
+                 progress: bool | Callable[[int, int, dict], None] = True,
+                 cache: ResultCache | str | bool | None = None) -> WalkForwardResult:
+    """
+    :param train/test/step: 样本内、样本外窗口长度及滚动步长，见 make_windows
+    :param anchored: True 为锚定窗口（样本内起点固定），False 为滚动窗口
+    :param sort_by: 样本内选参指标，sharpe/total_return/annual_return 取最大，max_drawdown 取最小
+    其余参数与 backtest.optimize.run_grid 相同（cache 同时用于样本内和样本外回测）
+    """
+    store = data if isinstance(data, BarStore) else BarStore.from_frames(data)
+    all_dt = store.to_datetime(np.array([store.datetime.min(), store.end_date.max()]))
+    windows = make_windows(all_dt[0], all_dt[1], train, test, anchored=anchored, step=step)
+    if not windows:
+        raise ValueError("data is shorter than one train window")
+    combos = expand_grid(param_grid)
+    common = dict(strategy_cls=strategy_cls, contracts=contracts, strategy_kwargs=strategy_kwargs,
+                  engine_kwargs=engine_kwargs, timeout=timeout)
+
+    # 1. 所有窗口的样本内网格一次提交
+    tasks = [dict(params=params, time_range=(w[0], w[1]), **common) for w in windows for params in combos]
+    rows = execute_tasks(tasks, store, workers, progress, cache)
+    in_sample = pd.DataFrame(rows)
+    in_sample.insert(0, "window", np.repeat(np.arange(len(windows)), len(combos)))
+
+    # 2. 每个窗口选参
+    best_params = []
+    best_metric = []
+    param_names = list(combos[0])
+    for n in range(len(windows)):
+        ranked = sort_results(in_sample[(in_sample["window"] == n) & (in_sample["status"] == "ok")], sort_by)
+        if ranked.empty:
+            best_params.append(None)
+            best_metric.append(np.nan)
+            continue
+        best_params.append({name: ranked[name].iloc[0] for name in param_names})
+        best_metric.append(ranked[sort_by].iloc[0])
+
+    # 3. 样本外并行回测
+    oos_index = [n for n, p in enumerate(best_params) if p is not None]
+    oos_tasks = [dict(params=best_params[n], time_range=(windows[n][2], windows[n][3]), keep_account=True, **common)
+                 for n in oos_index]
+    oos_rows = dict(zip(oos_index, execute_tasks(oos_tasks, store, workers, progress, cache)))
+
+    records = []
+    for n, (train_start, train_end, test_start, test_end) in enumerate(windows):
+        record = {"train_start": train_start, "train_end": train_end, "test_start": test_start,
+                  "test_end": test_end, "params": best_params[n], f"is_{sort_by}": best_metric[n]}
+        oos = oos_rows.get(n, {})
+        for key, value in oos.items():
+            if key not in param_names and key != "account":
+                record[f"oos_{key}"] = value
+        records.append(record)
+
+    initial_cash = (engine_kwargs or {}).get("initial_cash", 1_000_000)
+    account_daily = stitch_accounts([oos_rows[n].get("account") for n in oos_index], initial_cash)
+    return WalkForwardResult(windows=pd.DataFrame(records), account_daily=account_daily, in_sample=in_sample)
@@ -0,0 +1,97 @@
+"""
+BacktestGateway 撮合基准：每个 symbol 挂 10k 张远离市价的止损单/限价单，逐根 bar 撮合，
+对比按价格索引撮合与逐个遍历全部挂单（原实现）的耗时。
+
+用法：
+    python -m benchmarks.order_book --orders 10000 --bars 5000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtest.backtest_gateway import BacktestGateway
+from coreutils.constant import Direction, Exchange, Interval, OrderStatus, OrderType
+from coreutils.object import BarData, OrderRequest
+
+SYMBOL = "MHI"
+
+
+class _Engine:
+    def on_order(self, order):
+        pass
+
+    def on_trade(self, trade):
+        pass
+
+    def on_position(self, position):
+        pass
+
+
+class LinearGateway(BacktestGateway):
+    """原实现：每根 bar 遍历全部挂单"""
+
+    def on_bar(self, bar: BarData):
+        symbol = bar.symbol
+        self.current_date = bar.datetime
+        for oid, order in list(self.inactive_orders.get(symbol, {}).items()):
+            if self._stop_trigger(order, bar):
+                order.status = OrderStatus.PENDING
+                order.triggered_bar = bar.datetime
+                self.active_orders[symbol][oid] = order
+                del self.inactive_orders[symbol][oid]
+                self.on_order(order)
+        for oid, order in list(self.active_orders.get(symbol, {}).items()):
+            if order.type in [OrderType.LIMIT, OrderType.STP_LMT] and self._can_fill(order, bar):
+                self._fill_order(order, self._get_fill_price(order, bar))
+                del self.active_orders[symbol][oid]
+
+
+def make_bars(n_bars: int, seed: int = 0) -> list[BarData]:
+    rng = np.random.default_rng(seed)
+    close = 20000 + np.cumsum(rng.normal(0, 5, n_bars))
+    start = datetime(2024, 1, 2, 9, 15)
+    return [BarData(symbol=SYMBOL, exchange=Exchange.HKFE, datetime=start + timedelta(minutes=i),
+                    interval=Interval.K_1M, open_price=p, high_price=p + 10, low_price=p - 10, close_price=p,
+                    gateway_name="backtest") for i, p in enumerate(close.tolist())]
+
+
+def fill_book(gateway: BacktestGateway, n_orders: int, seed: int = 1):
+    """网格挂单：一半是远高于市价的多头止损，一半是远低于市价的多头限价"""
+    rng = np.random.default_rng(seed)
+    for k in range(n_orders):
+        if k % 2:
+            gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.LONG,
+                                            type=OrderType.STP_MKT, volume=1,
+                                            trigger_price=float(21000 + rng.integers(0, 5000))))
+        else:
+            gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.LONG,
+                                            type=OrderType.LIMIT, volume=1,
+                                            price=float(19000 - rng.integers(0, 5000))))
+
+
+def bench(gateway_cls, bars: list[BarData], n_orders: int) -> float:
+    gateway = gateway_cls(gateway_name="backtest", backtest_engine=_Engine())
+    fill_book(gateway, n_orders)
+    start = time.perf_counter()
+    for bar in bars:
+        gateway.on_bar(bar)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--bars", type=int, default=5_000)
+    args = parser.parse_args()
+
+    bars = make_bars(args.bars)
+    for name, cls in (("linear", LinearGateway), ("indexed", BacktestGateway)):
+        elapsed = bench(cls, bars, args.orders)
+        print(f"{name:8s} {args.orders} 张挂单 {args.bars} 根bar: {elapsed:.3f}s, "
+              f"{args.bars / elapsed:,.0f} bars/s")
+
+
+if __name__ == "__main__":
+    main()
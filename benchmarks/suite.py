@@ -0,0 +1,273 @@
+"""
+回测吞吐量基准套件：合成数据上跑各个场景，结果写成 JSON，便于不同提交之间对比
+
+场景：
+- load_data：DataFrame -> BarStore
+- run_noop：空策略的 run() 事件循环
+- update_daily：所有标的都有持仓时的逐 bar 盯市（_update_daily）
+- macd：MACD 示例策略（1h K 线）
+- order_book：BacktestGateway 挂大量远离市价的订单时逐 bar 撮合
+- tick_matching：网格挂单的逐笔撮合
+- performance_plot：生成回测报告 HTML
+
+每个场景在单独的子进程里运行，峰值内存（peak_rss_mb）互不影响；phases 为各阶段耗时（秒）。
+
+用法：
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --bars 10000000 --symbols 10 --only load_data run_noop --out big.json
+    python -m benchmarks.suite --compare base.json --out new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from backtest.backtest_engine import BacktestEngine
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.bar_store import peak_rss_mb
+from benchmarks.synthetic import FlipStrategy, make_bar_frames, make_ticks
+from coreutils.constant import Interval
+from coreutils.logger import isolated_logger
+
+CONTRACT = {"size": 10, "margin_rate": 0.1, "long_rate": 0.00006, "short_rate": 0.00006}
+
+
+class _Phases:
+    """按阶段累计耗时"""
+
+    def __init__(self):
+        self.times: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+
+    def wrap(self, obj, method: str):
+        """把 obj.method 的调用时间记到同名阶段"""
+        func = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            with self(method.lstrip("_")):
+                return func(*args, **kwargs)
+
+        setattr(obj, method, timed)
+
+
+def _engine(frames, phases: _Phases, every: int | None = None) -> BacktestEngine:
+    ee = BacktestEventEngine()
+    FlipStrategy(ee, every)
+    engine = BacktestEngine(event_engine=ee, logger=isolated_logger("benchmark"), initial_cash=1e9)
+    engine.set_log("off")
+    with phases("load_data"):
+        engine.load_data(frames)
+    engine.set_contracts({symbol: CONTRACT for symbol in {f["symbol"].iloc[0] for f in frames}})
+    return engine
+
+
+def _generate(phases: _Phases, n_bars: int, n_symbols: int, interval=Interval.K_1M):
+    with phases("generate"):
+        return make_bar_frames(n_bars, n_symbols, interval)
+
+
+def bench_load_data(args) -> dict:
+    phases = _Phases()
+    frames = _generate(phases, args.bars, args.symbols)
+    _engine(frames, phases)
+    n = sum(len(f) for f in frames)
+    return {"bars": n, "bars_per_sec": n / phases.times["load_data"], "phases": phases.times}
+
+
+def _run_engine(args, every: int | None, n_bars: int) -> dict:
+    phases = _Phases()
+    frames = _generate(phases, n_bars, args.symbols)
+    engine = _engine(frames, phases, every)
+    phases.wrap(engine, "_update_daily")
+    with phases("run"):
+        engine.run()
+    n = sum(len(f) for f in frames)
+    return {"bars": n, "bars_per_sec": n / phases.times["run"], "trades": len(engine.oms.trade_log),
+            "phases": phases.times}
+
+
+def bench_run_noop(args) -> dict:
+    return _run_engine(args, None, args.bars)
+
+
+def bench_update_daily(args) -> dict:
+    # 开仓后一直持有（every 大于 bar 数），每根 bar 都对全部标的盯市
+    result = _run_engine(args, args.bars + 1, args.bars)
+    result["update_daily_per_sec"] = result["bars"] / args.symbols / result["phases"]["update_daily"]
+    return result
+
+
+def bench_macd(args) -> dict:
+    from strategy.example.macd import MACDStrategy
+
+    phases = _Phases()
+    frames = _generate(phases, args.macd_bars, 1, Interval.K_1H)
+    symbol = frames[0]["symbol"].iloc[0]
+    ee = BacktestEventEngine()
+    strategy = MACDStrategy(event_engine=ee, symbol=symbol, work_interval=Interval.K_1H)
+    strategy.initialize()
+    engine = BacktestEngine(event_engine=ee, logger=isolated_logger("benchmark"), initial_cash=1e6)
+    engine.set_log("off")
+    with phases("load_data"):
+        engine.load_data(frames)
+    engine.set_contracts({symbol: CONTRACT})
+    phases.wrap(engine, "_update_daily")
+    with phases("run"):
+        engine.run()
+    n = len(frames[0])
+    return {"bars": n, "bars_per_sec": n / phases.times["run"], "trades": len(engine.oms.trade_log),
+            "phases": phases.times}
+
+
+def bench_order_book(args) -> dict:
+    from backtest.backtest_gateway import BacktestGateway
+    from benchmarks.order_book import bench, make_bars
+
+    phases = _Phases()
+    with phases("generate"):
+        bars = make_bars(args.book_bars)
+    elapsed = bench(BacktestGateway, bars, args.orders)
+    phases.times["match"] = elapsed
+    return {"bars": len(bars), "orders": args.orders, "bars_per_sec": len(bars) / elapsed, "phases": phases.times}
+
+
+def bench_tick_matching(args) -> dict:
+    from benchmarks import tick_matching
+
+    phases = _Phases()
+    with phases("generate"):
+        ticks = make_ticks(args.ticks, tick_matching.SYMBOL)
+    elapsed, fills = tick_matching.bench(ticks, 200)
+    phases.times["match"] = elapsed
+    return {"ticks": len(ticks), "ticks_per_sec": len(ticks) / elapsed, "fills": fills, "phases": phases.times}
+
+
+def bench_performance_plot(args) -> dict:
+    phases = _Phases()
+    frames = _generate(phases, args.plot_bars, 1, Interval.K_15M)
+    engine = _engine(frames, phases, every=20)
+    with phases("run"):
+        engine.run()
+    with tempfile.TemporaryDirectory() as tmp:
+        with phases("performance_plot"):
+            engine.performance_plot(plot_path=os.path.join(tmp, "plot.html"))
+    n = len(frames[0])
+    return {"bars": n, "trades": len(engine.oms.trade_log), "phases": phases.times}
+
+
+SCENARIOS = {
+    "load_data": bench_load_data,
+    "run_noop": bench_run_noop,
+    "update_daily": bench_update_daily,
+    "macd": bench_macd,
+    "order_book": bench_order_book,
+    "tick_matching": bench_tick_matching,
+    "performance_plot": bench_performance_plot,
+}
+
+
+def _run_scenario(name: str, args) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = SCENARIOS[name](args)
+    result["total_sec"] = time.perf_counter() - start
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args) -> dict:
+    names = args.only or list(SCENARIOS)
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "only")},
+        "scenarios": {},
+    }
+    for name in names:
+        # 每个场景一个新进程，峰值内存只反映该场景
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(_run_scenario, name, args).result()
+        report["scenarios"][name] = result
+        print(f"{name:18s} {_headline(result)}", flush=True)
+    return report
+
+
+def _headline(result: dict) -> str:
+    rate = result.get("bars_per_sec") or result.get("ticks_per_sec")
+    unit = "bars/s" if "bars_per_sec" in result else "ticks/s"
+    text = f"{result['total_sec']:8.2f}s"
+    if rate:
+        text += f"  {rate:14,.0f} {unit}"
+    if result.get("peak_rss_mb") is not None:
+        text += f"  peak {result['peak_rss_mb']:,.0f} MB"
+    return text
+
+
+def compare(base: dict, new: dict):
+    """逐场景打印吞吐量和各阶段耗时的变化（新 / 旧）"""
+    print(f"对比 {base.get('commit')} -> {new.get('commit')}")
+    for name, result in new["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            continue
+        parts = []
+        for key in ("bars_per_sec", "ticks_per_sec"):
+            if key in result and key in old:
+                parts.append(f"{key} x{result[key] / old[key]:.2f}")
+        for phase, sec in result["phases"].items():
+            if old["phases"].get(phase):
+                parts.append(f"{phase} x{sec / old['phases'][phase]:.2f}")
+        if result.get("peak_rss_mb") and old.get("peak_rss_mb"):
+            parts.append(f"rss x{result['peak_rss_mb'] / old['peak_rss_mb']:.2f}")
+        print(f"{name:18s} " + "  ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=200_000, help="load_data / run_noop / update_daily 的总 bar 数")
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--macd-bars", type=int, default=5_000)
+    parser.add_argument("--book-bars", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=10_000, help="order_book 场景的挂单数")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--plot-bars", type=int, default=20_000)
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--out", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
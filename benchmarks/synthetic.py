@@ -0,0 +1,117 @@
+"""
+基准测试和单元测试用的合成行情与示例策略
+
+- make_bar_frames / make_ticks：固定种子的随机游走 K 线和逐笔成交，规模可以到千万根 bar、多个标的。
+  K 线按标的分块生成，每个标的一个 DataFrame（BacktestEngine.load_data 的输入格式），
+  时间连续不分交易时段，open 等于上一根的 close，high / low 包住 open 和 close。
+- TargetStrategy / FlipStrategy：按目标仓位下市价单的最简策略，直接注册在事件引擎上，每根 bar 一次回调
+"""
+import numpy as np
+import pandas as pd
+
+from backtest.tick_store import TickStore
+from coreutils.constant import Direction, Exchange, Interval, OrderType
+from coreutils.object import OrderRequest
+from engine.event_engine import Event, EVENT_BAR, EVENT_ORDER_REQ
+
+START = np.datetime64("2024-01-02T09:15", "ns")
+
+
+def symbol_names(n_symbols: int) -> list[str]:
+    return [f"SYN{k:03d}" for k in range(n_symbols)]
+
+
+def make_bar_frames(n_bars: int, n_symbols: int = 1, interval: Interval = Interval.K_1M,
+                    seed: int = 0, symbols: list[str] | None = None, sigma: float = 5.0) -> list[pd.DataFrame]:
+    """
+    共 n_bars 根 K 线，平均分给 n_symbols 个标的，每个标的一个 DataFrame
+    :param symbols: 标的名称，给出时代替 n_symbols
+    :param sigma: 每根 bar 收盘价变动的标准差
+    """
+    symbols = symbols or symbol_names(n_symbols)
+    rng = np.random.default_rng(seed)
+    per_symbol = n_bars // len(symbols)
+    step = np.int64(int(interval.value) * 1_000_000_000)
+    datetime = START.astype(np.int64) + np.arange(per_symbol, dtype=np.int64) * step
+    frames = []
+    for symbol in symbols:
+        close = 20000 + np.cumsum(rng.normal(0, sigma, per_symbol))
+        open_ = np.r_[close[0], close[:-1]]
+        spread = np.abs(rng.normal(0, sigma * 0.6, per_symbol))
+        frames.append(pd.DataFrame({
+            "symbol": symbol,
+            "datetime": datetime.view("datetime64[ns]"),
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+            "volume": rng.integers(1, 500, per_symbol).astype(np.float64),
+            "ktype": np.full(per_symbol, interval, dtype=object),
+        }))
+    return frames
+
+
+def make_ticks(n: int, symbol: str = "MHI", seed: int = 0, step_ms: int = 100) -> TickStore:
+    """每 step_ms 毫秒一笔的逐笔成交，价格每笔 ±1 或不变"""
+    rng = np.random.default_rng(seed)
+    price = 20000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], n, p=[.3, .4, .3]))
+    datetime = START.astype(np.int64) + np.arange(n, dtype=np.int64) * (step_ms * 1_000_000)
+    return TickStore(symbol, datetime, price, rng.integers(1, 10, n).astype(np.float64),
+                     rng.choice(np.array([-1, 0, 1], dtype=np.int8), n))
+
+
+class TargetStrategy:
+    """
+    按目标仓位下市价单，trigger_price 取当根收盘价
+    :param targets: 单标的的逐 bar 目标仓位序列，或 {symbol: 序列}
+    :param interval: 只在该周期的 bar 上调仓（并推进下标），None 时每根 bar 都调
+    """
+
+    def __init__(self, event_engine, targets=None, interval: Interval | None = None):
+        self.ee = event_engine
+        self.targets = targets
+        self.interval = interval
+        self.count: dict[str, int] = {}
+        self.position: dict[str, float] = {}
+        event_engine.register(EVENT_BAR, self.on_bar)
+
+    def target(self, symbol: str, n: int) -> float | None:
+        """该标的第 n 根 bar 的目标仓位，None 表示不调仓"""
+        targets = self.targets[symbol] if isinstance(self.targets, dict) else self.targets
+        return targets[n]
+
+    def on_bar(self, event: Event):
+        bar = event.data
+        if self.interval is not None and bar.interval != self.interval:
+            return
+        n = self.count.get(bar.symbol, 0)
+        self.count[bar.symbol] = n + 1
+        target = self.target(bar.symbol, n)
+        position = self.position.get(bar.symbol, 0.0)
+        if target is None or target == position:
+            return
+        self.position[bar.symbol] = target
+        delta = target - position
+        self.ee.put(Event(EVENT_ORDER_REQ, OrderRequest(
+            symbol=bar.symbol, exchange=Exchange.HKFE, type=OrderType.MARKET,
+            direction=Direction.LONG if delta > 0 else Direction.SHORT,
+            volume=abs(delta), price=bar.close_price, trigger_price=bar.close_price)))
+
+    def get_state(self) -> dict:
+        return {"count": dict(self.count), "position": dict(self.position)}
+
+    def set_state(self, state: dict):
+        self.count, self.position = dict(state["count"]), dict(state["position"])
+
+
+class FlipStrategy(TargetStrategy):
+    """每个标的每 every 根 bar 在多一手和空一手之间切换；every 为 None 时什么都不做"""
+
+    def __init__(self, event_engine, every: int | None = 3, interval: Interval | None = None):
+        super().__init__(event_engine, interval=interval)
+        self.every = every
+
+    def target(self, symbol: str, n: int) -> float | None:
+        if self.every is None or n % self.every:
+            return None
+        return 1.0 if (n // self.every) % 2 == 0 else -1.0
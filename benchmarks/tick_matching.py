@@ -0,0 +1,85 @@
+"""
+逐笔撮合基准：随机游走的逐笔成交，在市价上下挂网格限价单和止损单，
+每 1 分钟（一根 1m bar）调用一次 BacktestGateway.on_ticks，统计每秒处理的逐笔成交数。
+
+用法：
+    python -m benchmarks.tick_matching --ticks 20000000 --orders 200
+"""
+import argparse
+import time
+
+from backtest.backtest_gateway import BacktestGateway
+from backtest.tick_store import TickStore
+from coreutils.constant import Direction, Exchange, OrderType
+from coreutils.object import OrderRequest
+from benchmarks.synthetic import make_ticks
+
+SYMBOL = "MHI"
+
+
+class _Engine:
+    def __init__(self):
+        self.fills = 0
+        self.done: list = []
+
+    def on_order(self, order):
+        if not order.is_active():
+            self.done.append(order)
+
+    def on_trade(self, trade):
+        self.fills += 1
+
+    def on_position(self, position):
+        pass
+
+
+def bench(ticks: TickStore, n_orders: int) -> tuple[float, int]:
+    """逐 1 分钟撮合全部逐笔成交，返回 (耗时, 成交次数)"""
+    engine = _Engine()
+    gateway = BacktestGateway(gateway_name="backtest", backtest_engine=engine)
+    gateway.initial_queue = 20
+
+    def send(direction, order_type, price=0.0, trigger=0.0):
+        gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=direction,
+                                        type=order_type, volume=5, price=price, trigger_price=trigger))
+
+    # 网格：起始价下方每 5 点一张买单、上方一张卖单；远处各一张止损单
+    first = float(ticks.price[0])
+    for k in range(1, n_orders // 2 + 1):
+        send(Direction.LONG, OrderType.LIMIT, price=first - 5 * k)
+        send(Direction.SHORT, OrderType.LIMIT, price=first + 5 * k)
+    send(Direction.LONG, OrderType.STP_MKT, trigger=first + 10_000)
+    send(Direction.SHORT, OrderType.STP_MKT, trigger=first - 10_000)
+
+    def replenish():
+        # 全部成交的网格单在原价位重新挂出
+        for order in engine.done:
+            if order.type == OrderType.LIMIT:
+                send(order.direction, OrderType.LIMIT, price=order.price)
+        engine.done.clear()
+
+    per_bar = 600  # 每 0.1 秒一笔，1 分钟 600 笔
+    cursor = 0
+    start = time.perf_counter()
+    while cursor < len(ticks):
+        replenish()
+        stop = min(cursor + per_bar, len(ticks))
+        gateway.on_ticks(ticks, cursor, stop)
+        cursor = stop
+    return time.perf_counter() - start, engine.fills
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=20_000_000)
+    parser.add_argument("--orders", type=int, default=200, help="网格限价单数，成交后在原价位重新挂单")
+    args = parser.parse_args()
+
+    ticks = make_ticks(args.ticks, SYMBOL)
+    elapsed, fills = bench(ticks, args.orders)
+    print(f"{len(ticks):,} 笔逐笔成交, {args.orders} 张网格挂单: {elapsed:.2f}s, "
+          f"{len(ticks) / elapsed:,.0f} ticks/s, 成交 {fills:,} 次")
+
+
+if __name__ == "__main__":
+    main()
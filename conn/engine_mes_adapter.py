@@ -46,6 +46,10 @@ class EngineMesAdapter:
         回传事件：
           {"type":"log","engine":..., "ts":..., "epoch":E, "seq":S,
            "data":{"path": "...", "lines": [...], "count": N, "range": {...}}}
+
+      - cmd="stats.query" 时，回传事件引擎的分发耗时统计（见 engine.event_stats）：
+        data 示例：{"enable": true, "reset": false}   # 均可选；enable 开关统计，reset 查询后清零
+        回传事件：{"type":"stats", ..., "data":{"enabled": bool, "rows": [{type, handler, count, ...}]}}
     """
 
     # 默认每次返回的日志行上限（可按需调整）
@@ -213,6 +217,8 @@ class EngineMesAdapter:
                     self._handle_order_query(data)
                 elif cmd == "log.query":
                     self._handle_log_query(data)
+                elif cmd == "stats.query":
+                    self._handle_stats_query(data)
                 elif cmd == 'order.modify':
                     vt_orderid = data.get('vt_orderid')
                     order = self.oms.get_order(vt_orderid)
@@ -375,6 +381,24 @@ class EngineMesAdapter:
             enq_epoch = self._epoch
         self._send_q.put((f"order:{self.engine_id}", payload, enq_epoch))
 
+    # ===================== 耗时统计查询 =====================
+    def _handle_stats_query(self, data: Dict[str, Any]) -> None:
+        if "enable" in data:
+            self.event_engine.enable_stats(bool(data["enable"]))
+        stats = self.event_engine.stats
+        rows = stats.snapshot() if stats is not None else []
+        if stats is not None and data.get("reset"):
+            stats.reset()
+        payload = {
+            "type": "stats",
+            "engine": self.engine_id,
+            "ts": _now_ts(),
+            "data": {"enabled": stats is not None, "rows": rows},
+        }
+        with self._epoch_lock:
+            enq_epoch = self._epoch
+        self._send_q.put((f"order:{self.engine_id}", payload, enq_epoch))
+
         # ===================== 订单查询：处理器 =====================
 
     def _handle_order_query(self, data: Dict[str, Any]) -> None:
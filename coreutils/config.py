@@ -13,6 +13,15 @@ DatabaseInfo = SimpleNamespace(
     password=os.getenv("DB_PASSWORD", "")
 )
 
+# ===================== 本地K线缓存 =====================
+CacheInfo = SimpleNamespace(
+    bar_cache_dir=os.getenv("BAR_CACHE_DIR", os.path.join("~", ".autotrade", "bar_cache")),
+    # 实时K线同时追加写入的内存映射K线文件目录（data.bar_file），为空则不写
+    bar_file_dir=os.getenv("BAR_FILE_DIR", ""),
+    # 回测结果缓存目录（backtest.result_cache），参数扫描默认使用，为空则不缓存
+    result_cache_dir=os.getenv("RESULT_CACHE_DIR", os.path.join("~", ".autotrade", "result_cache"))
+)
+
 # ===================== 常量设置 =====================
 serverjiang = SimpleNamespace(
     proToken=os.getenv("SERVERJIANG_PROTOKEN", ""),
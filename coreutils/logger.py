@@ -143,6 +143,18 @@ def get_logger(name: str = 'main', logfile: str = 'run.log',
     return logger
 
 
+def isolated_logger(name: str = 'backtest', handler: logging.Handler | None = None,
+                    level=logging.INFO) -> logging.Logger:
+    """
+    不登记到 logging 全局表的 logger：同名的多个实例互不共享 handler，用完即可回收。
+    供同一进程里大量回测使用（BacktestContext），handler 为 None 时丢弃全部日志。
+    """
+    logger = logging.Logger(name, level)
+    logger.propagate = False
+    logger.addHandler(handler if handler is not None else logging.NullHandler())
+    return logger
+
+
 class LoggerEngine:
     def __init__(self, event_engine, engine_id, LOG_DIR=None,to_console=True):
         self.event_engine = event_engine
@@ -158,7 +170,7 @@ class LoggerEngine:
     def _on_log(self, event: Event):
         log_data: LogData = event.data
         log_level = log_data.level
-        msg = log_data.msg
+        msg = log_data.text
         if log_level == LogLevel.DEBUG:
             self.process_debug(msg)
         elif log_level == LogLevel.INFO:
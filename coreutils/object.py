@@ -297,15 +297,21 @@ class AccountData(BaseData):
 class LogData:
     """
     Log data is used for recording log messages on GUI or in log files.
+    args 不为空时 msg 是 % 格式串，由日志接收方按等级过滤后再格式化（见 text）。
     """
 
     msg: str
     level: LogLevel = LogLevel.INFO
+    args: tuple = ()
 
     def __post_init__(self) -> None:
         """"""
         self.time: Datetime = Datetime.now()
 
+    @property
+    def text(self) -> str:
+        return self.msg % self.args if self.args else self.msg
+
 @dataclass
 class ContractData(BaseData):
     """
@@ -5,10 +5,12 @@ import talib as ta
 
 # ====== 输入标准化 ======
 def _to_series(data, name="value"):
-    """确保输入是 pandas.Series"""
+    """确保输入是 pandas.Series；已经是 float64 的 Series / ndarray（包括 np.memmap 视图）不拷贝"""
     if isinstance(data, pd.Series):
-        return data.astype(float)
-    elif isinstance(data, (list, tuple, np.ndarray)):
+        return data.astype(float, copy=False)
+    elif isinstance(data, np.ndarray):
+        return pd.Series(np.asarray(data, dtype=float), name=name, copy=False)
+    elif isinstance(data, (list, tuple)):
         return pd.Series(data, name=name, dtype=float)
     elif isinstance(data, pd.DataFrame):
         warnings.warn("输入是 DataFrame，默认取第一列。建议直接传 Series。", UserWarning)
@@ -0,0 +1,211 @@
+"""
+本地K线缓存 BarCache
+
+在 fetch_kline / request_kline 之前先查本地缓存，只把缺失的时间段交给数据库或 Futu 查询：
+- 按 symbol / interval / 月 分区，每个分区一个 Parquet 文件（列式、压缩）
+- manifest.json 记录每个 (symbol, interval) 已经查询过的时间段，请求时只补齐缺口
+- 进程内用 LRU 缓存最近使用的分区，重复回测同一段数据不再读盘
+- stats 暴露命中/未命中统计
+
+目录结构：
+    {root}/manifest.json
+    {root}/{symbol}/{interval}/2024-01.parquet
+
+用法示例：
+-----------
+from data.bar_cache import cached_kline
+df = cached_kline('HKEX', 'mhi_1m', 'HK.MHImain', Interval.K_1M, '2024-01-01', '2025-01-01')
+
+# 任意数据源：fetch(start, end) 返回 [start, end) 内的数据
+cache = BarCache()
+df = cache.get('HK.MHImain', Interval.K_15M, '2024-01-01', '2025-01-01',
+               fetch=lambda s, e: FutuGateway.request_kline('HK.MHImain', '15m', str(s), str(e)))
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+
+import pandas as pd
+
+from coreutils.config import CacheInfo
+from coreutils.constant import Interval
+
+_default_cache = None
+
+
+class BarCache:
+
+    def __init__(self, root: str | None = None, max_partitions: int = 64, time_column: str = 'trade_time'):
+        """
+        :param root: 缓存目录，默认取环境变量 BAR_CACHE_DIR
+        :param max_partitions: 进程内 LRU 保留的分区（月）数
+        :param time_column: 时间列名（数据库K线表为 trade_time）
+        """
+        self.root = os.path.expanduser(root or CacheInfo.bar_cache_dir)
+        self.max_partitions = max_partitions
+        self.time_column = time_column
+        self._lru: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._manifest_path = os.path.join(self.root, 'manifest.json')
+        self._manifest: dict[str, list[list[str]]] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        # hits: 请求完全由缓存满足; misses: 需要查询数据源; fetched_*: 补缺口的次数和行数
+        # lru_hits / disk_reads: 分区从内存 / 磁盘读取的次数
+        self.stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'fetched_rows': 0, 'lru_hits': 0, 'disk_reads': 0}
+
+    # =========================
+    # 查询
+    # =========================
+    def get(self, symbol: str, interval: Interval | str, start, end,
+            fetch: Callable[[pd.Timestamp, pd.Timestamp], pd.DataFrame]) -> pd.DataFrame:
+        """
+        返回 [start, end) 内的K线，按时间升序
+        :param fetch: fetch(gap_start, gap_end) 查询数据源中 [gap_start, gap_end) 的数据
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        key = _source_key(symbol, interval)
+        gaps = self.missing_ranges(symbol, interval, start, end)
+        if gaps:
+            self.stats['misses'] += 1
+            # 未来的时间段数据还没有生成，不记为已覆盖
+            now = pd.Timestamp.now()
+            for gap_start, gap_end in gaps:
+                data = fetch(gap_start, gap_end)
+                self.stats['fetches'] += 1
+                if data is not None and not data.empty:
+                    self.stats['fetched_rows'] += len(data)
+                    self._write(key, data)
+                if gap_start < now:
+                    self._add_range(key, gap_start, min(gap_end, now))
+            self._save_manifest()
+        else:
+            self.stats['hits'] += 1
+
+        parts = [self._read(key, month) for month in _months(start, end)]
+        parts = [p for p in parts if p is not None and not p.empty]
+        if not parts:
+            return pd.DataFrame()
+        data = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        t = data[self.time_column]
+        return data[(t >= start) & (t < end)].reset_index(drop=True)
+
+    def missing_ranges(self, symbol: str, interval: Interval | str, start, end) -> list[tuple]:
+        """[start, end) 中还没有被查询过的时间段"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self._ranges(_source_key(symbol, interval)):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def clear_memory(self):
+        self._lru.clear()
+
+    # =========================
+    # 分区读写
+    # =========================
+    def _partition_path(self, key: str, month: str) -> str:
+        return os.path.join(self.root, key, f'{month}.parquet')
+
+    def _read(self, key: str, month: str) -> pd.DataFrame | None:
+        path = self._partition_path(key, month)
+        if path in self._lru:
+            self._lru.move_to_end(path)
+            self.stats['lru_hits'] += 1
+            return self._lru[path]
+        if not os.path.exists(path):
+            return None
+        data = pd.read_parquet(path)
+        self.stats['disk_reads'] += 1
+        self._remember(path, data)
+        return data
+
+    def _remember(self, path: str, data: pd.DataFrame):
+        self._lru[path] = data
+        self._lru.move_to_end(path)
+        while len(self._lru) > self.max_partitions:
+            self._lru.popitem(last=False)
+
+    def _write(self, key: str, data: pd.DataFrame):
+        data = data.copy()
+        data[self.time_column] = pd.to_datetime(data[self.time_column])
+        month = data[self.time_column].dt.strftime('%Y-%m')
+        for name, part in data.groupby(month, sort=True):
+            path = self._partition_path(key, name)
+            old = self._read(key, name)
+            if old is not None and not old.empty:
+                part = pd.concat([old, part], ignore_index=True)
+            part = (part.drop_duplicates(self.time_column, keep='last')
+                    .sort_values(self.time_column, ignore_index=True))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            part.to_parquet(tmp, index=False, compression='zstd')
+            os.replace(tmp, path)
+            self._remember(path, part)
+
+    # =========================
+    # manifest：已覆盖的时间段（左闭右开，按开始时间排序且互不重叠）
+    # =========================
+    def _ranges(self, key: str) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in self._manifest.get(key, [])]
+
+    def _add_range(self, key: str, start: pd.Timestamp, end: pd.Timestamp):
+        ranges = sorted(self._ranges(key) + [(start, end)])
+        merged = [list(ranges[0])]
+        for s, e in ranges[1:]:
+            if s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self._manifest[key] = [[str(s), str(e)] for s, e in merged]
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._manifest_path)
+
+
+def _source_key(symbol: str, interval: Interval | str) -> str:
+    name = interval.name if isinstance(interval, Interval) else str(interval)
+    return f'{symbol}/{name}'
+
+
+def _months(start: pd.Timestamp, end: pd.Timestamp) -> list[str]:
+    """[start, end) 覆盖到的月份"""
+    if end <= start:
+        return []
+    last = end - pd.Timedelta(1, 'ns')
+    return [p.strftime('%Y-%m') for p in pd.period_range(start.to_period('M'), last.to_period('M'), freq='M')]
+
+
+def get_default_cache() -> BarCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BarCache()
+    return _default_cache
+
+
+def cached_kline(db_name, table_name, symbol, interval, start_date, end_date, cache: BarCache | None = None,
+                 engine=None) -> pd.DataFrame:
+    """
+    带本地缓存的数据库K线查询，返回 [start_date, end_date) 内的数据，列与数据库表相同
+    """
+    from data.db_query import fetch_kline_range
+
+    cache = cache or get_default_cache()
+    return cache.get(symbol, interval, start_date, end_date,
+                     fetch=lambda s, e: fetch_kline_range(db_name, table_name, s, e, engine=engine))
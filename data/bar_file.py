@@ -0,0 +1,200 @@
+"""
+内存映射K线文件 (.bar)
+
+定长记录的二进制格式，多年的 1m 等高频K线无需每次解码，直接用 np.memmap 零拷贝读取：
+
+    [0, 4096)      文件头：8 字节 magic + JSON（symbols、interval、记录格式），空格补齐
+    [4096, ...)    定长记录：datetime(int64 纳秒) + symbol_id(int64) + open/high/low/close/volume(float64)
+
+- 记录按 datetime 升序追加，时间区间切片用二分查找，O(log n)；同一时间可以有多个标的的bar，
+  多标的逐个追加同一时间的bar时不会互相覆盖
+- 文件以只读 memmap 打开，多个回测进程共享同一份页缓存，不各自持有私有副本
+- 记录数由文件长度推出，追加写到一半崩溃时末尾不完整的记录会被忽略
+
+用法示例：
+-----------
+writer = BarFileWriter('mhi_1m.bar', symbols=['HK.MHImain'], interval=Interval.K_1M)
+writer.append_frame(df, time_column='trade_time', symbol_column='code')
+
+bars = BarFile('mhi_1m.bar')
+view = bars.slice_time('2024-01-01', '2025-01-01')     # 结构化数组视图，不拷贝
+close = view['close']
+"""
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from coreutils.constant import Interval
+
+MAGIC = b'ATBAR001'
+HEADER_SIZE = 4096
+RECORD_DTYPE = np.dtype([('datetime', '<i8'), ('symbol_id', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                         ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')])
+
+
+def _read_header(path: str) -> dict:
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a bar file")
+    return json.loads(raw[len(MAGIC):].decode('utf-8'))
+
+
+def _encode_header(header: dict) -> bytes:
+    raw = MAGIC + json.dumps(header, ensure_ascii=False).encode('utf-8')
+    if len(raw) > HEADER_SIZE:
+        raise ValueError("bar file header is full (too many symbols)")
+    return raw.ljust(HEADER_SIZE, b' ')
+
+
+class BarFile:
+    """只读打开 .bar 文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        header = _read_header(path)
+        self.symbols: list[str] = header['symbols']
+        self.interval = Interval[header['interval']]
+        n = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if n > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, name: str) -> np.ndarray:
+        """单列视图（零拷贝，步长为记录长度）"""
+        return self.records[name]
+
+    def index_range(self, start=None, end=None) -> tuple[int, int]:
+        """[start, end) 对应的记录下标区间（二分查找）"""
+        datetime = self.records['datetime']
+        lo = 0 if start is None else int(np.searchsorted(datetime, _to_ns(start), side='left'))
+        hi = len(datetime) if end is None else int(np.searchsorted(datetime, _to_ns(end), side='left'))
+        return lo, max(lo, hi)
+
+    def slice_time(self, start=None, end=None) -> np.ndarray:
+        lo, hi = self.index_range(start, end)
+        return self.records[lo:hi]
+
+    def to_frame(self, start=None, end=None) -> pd.DataFrame:
+        view = self.slice_time(start, end)
+        symbols = np.asarray(self.symbols, dtype=object)
+        return pd.DataFrame({
+            'symbol': symbols[view['symbol_id']],
+            'datetime': pd.to_datetime(view['datetime']),
+            'open': view['open'], 'high': view['high'], 'low': view['low'], 'close': view['close'],
+            'volume': view['volume'],
+            'ktype': [self.interval] * len(view),
+        })
+
+
+class BarFileWriter:
+    """追加写入 .bar 文件；文件不存在时按 symbols / interval 创建文件头"""
+
+    def __init__(self, path: str, symbols: list[str] | None = None, interval: Interval | None = None):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            header = _read_header(path)
+            if interval is not None and header['interval'] != interval.name:
+                raise ValueError(f"{path} holds {header['interval']} bars, not {interval.name}")
+            self.symbols = header['symbols']
+            self.interval = Interval[header['interval']]
+            # 截掉崩溃时可能留下的不完整记录
+            size = os.path.getsize(path)
+            valid = HEADER_SIZE + (size - HEADER_SIZE) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            if valid != size:
+                os.truncate(path, valid)
+        else:
+            if interval is None:
+                raise ValueError("interval is required when creating a bar file")
+            self.symbols = list(symbols or [])
+            self.interval = interval
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(self._header())
+        for symbol in symbols or []:
+            self._symbol_id(symbol)
+        self.last_datetime, self._last_symbols = self._read_tail()
+
+    def _header(self) -> bytes:
+        return _encode_header({'symbols': self.symbols, 'interval': self.interval.name,
+                               'fields': list(RECORD_DTYPE.names)})
+
+    def _symbol_id(self, symbol: str) -> int:
+        if symbol not in self.symbols:
+            self.symbols.append(symbol)
+            with open(self.path, 'r+b') as f:
+                f.write(self._header())
+        return self.symbols.index(symbol)
+
+    def _read_tail(self) -> tuple[int | None, set[int]]:
+        """文件中最后的时间，以及该时间已写入的 symbol_id"""
+        n = (os.path.getsize(self.path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if n <= 0:
+            return None, set()
+        records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n,))
+        datetime = records['datetime']
+        last = int(datetime[-1])
+        start = int(np.searchsorted(datetime, last, side='left'))
+        return last, set(records['symbol_id'][start:].tolist())
+
+    def append(self, datetime, open, high, low, close, volume=0.0, symbol: str | None = None) -> int:
+        """
+        追加一根或多根bar（标量或等长数组）。时间不能早于文件中最后一根；与最后一根同一时间的，
+        只接受该时间还没有写入过的标的。更早或重复（同一时间同一标的）的bar会被跳过
+        :return: 实际写入的条数
+        """
+        ns = pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(datetime))).asi8
+        records = np.zeros(len(ns), dtype=RECORD_DTYPE)
+        records['datetime'] = ns
+        records['symbol_id'] = self._symbol_id(symbol if symbol is not None else self.symbols[0])
+        records['open'], records['high'], records['low'] = open, high, low
+        records['close'], records['volume'] = close, volume
+        return self._write(records)
+
+    def append_frame(self, data: pd.DataFrame, time_column: str = 'datetime', symbol_column: str = 'symbol') -> int:
+        """追加 DataFrame（需要 open/high/low/close，可选 volume 和 symbol 列）"""
+        if data.empty:
+            return 0
+        records = np.zeros(len(data), dtype=RECORD_DTYPE)
+        records['datetime'] = pd.to_datetime(data[time_column]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if symbol_column in data.columns:
+            records['symbol_id'] = [self._symbol_id(s) for s in data[symbol_column]]
+        else:
+            records['symbol_id'] = self._symbol_id(self.symbols[0])
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            if name in data.columns:
+                records[name] = data[name].to_numpy(dtype=np.float64)
+        return self._write(records)
+
+    def _write(self, records: np.ndarray) -> int:
+        records = records[np.argsort(records['datetime'], kind='stable')]
+        if len(records) > 1:
+            # 同一时间同一标的只保留第一条
+            pairs = np.stack([records['datetime'], records['symbol_id']], axis=1)
+            _, first = np.unique(pairs, axis=0, return_index=True)
+            records = records[np.sort(first)]
+        if self.last_datetime is not None:
+            datetime = records['datetime']
+            same = (datetime == self.last_datetime) & ~np.isin(records['symbol_id'], list(self._last_symbols))
+            records = records[(datetime > self.last_datetime) | same]
+        if len(records) == 0:
+            return 0
+        with open(self.path, 'ab') as f:
+            f.write(records.tobytes())
+        last = int(records['datetime'][-1])
+        symbols = set(records['symbol_id'][records['datetime'] == last].tolist())
+        self._last_symbols = self._last_symbols | symbols if last == self.last_datetime else symbols
+        self.last_datetime = last
+        return len(records)
+
+
+def _to_ns(value) -> int:
+    return pd.Timestamp(value).value
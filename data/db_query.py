@@ -2,7 +2,7 @@
 # get_engine 用于缓存数据库连接池，避免重复创建连接。
 # 新增数据源时，无需修改 get_engine 的逻辑，只需在 db_dict 中配置对应的库名和表名映射即可。
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from coreutils.config import DatabaseInfo
 _engine_cache = {}
 
@@ -73,6 +73,61 @@ def fetch_kline(db_name, table_name, start_date=None, end_date=None, limit=10, s
 
     return pd.read_sql_query(query_code, engine, params=params)
 
+def fetch_kline_range(db_name, table_name, start_date, end_date, engine=None):
+    """
+    查询 [start_date, end_date) 内的全部K线（左闭右开，不限条数），供 data.bar_cache 补齐缺口
+
+    返回:
+    --------
+    pd.DataFrame: 查询结果，按 trade_time 升序
+    """
+    if engine is None:
+        engine = get_engine(DatabaseInfo.user, DatabaseInfo.password,
+                            DatabaseInfo.host, DatabaseInfo.port, db_name)
+    query_code = text(f"SELECT * FROM {table_name} WHERE trade_time >= :start AND trade_time < :end "
+                      f"ORDER BY trade_time ASC")
+    return pd.read_sql_query(query_code, engine, params={'start': str(start_date), 'end': str(end_date)})
+
+
+def stream_kline(db_name, table_name, start_date=None, end_date=None, chunksize=100_000, engine=None,
+                 time_column='trade_time'):
+    """
+    按 trade_time 升序分块读取K线表（如 mhi_1m、mhi_15m），用于长周期回测
+
+    与 fetch_kline 不同，这里用服务端游标（stream_results）配合 chunksize 逐块返回，
+    客户端任一时刻只持有一块数据，不会把整张表读进内存
+
+    参数:
+    --------
+    start_date: str       # 起始时间（可选）
+    end_date: str         # 截止时间（可选）
+    chunksize: int        # 每块行数
+    engine:               # 可选，已有的 sqlalchemy engine，默认按 db_name 取连接池
+    time_column: str      # 时间列，K线表为 trade_time，逐笔成交表 mhi_tick 为 time
+
+    返回:
+    --------
+    Iterator[pd.DataFrame]: 按时间升序的数据块
+    """
+    if engine is None:
+        engine = get_engine(DatabaseInfo.user, DatabaseInfo.password,
+                            DatabaseInfo.host, DatabaseInfo.port, db_name)
+
+    where_clauses = []
+    params = {}
+    if start_date:
+        where_clauses.append(f"{time_column} >= :start")
+        params['start'] = start_date
+    if end_date:
+        where_clauses.append(f"{time_column} <= :end")
+        params['end'] = end_date
+    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+
+    query_code = text(f"SELECT * FROM {table_name} {where_sql} ORDER BY {time_column} ASC")
+    with engine.connect().execution_options(stream_results=True) as conn:
+        yield from pd.read_sql_query(query_code, conn, params=params, chunksize=chunksize)
+
+
 if __name__ == '__main__':
     data = fetch_kline(db_name='HKEX', table_name='mhi_15m', end_date='2025-01-01', limit=10)
     print(data)
@@ -8,10 +8,12 @@ import datetime
 import sys
 import warnings
 import traceback
+import os
 from conn import klinepubsub
 from coreutils.logger import get_logger
-from coreutils.config import DatabaseInfo
+from coreutils.config import DatabaseInfo, CacheInfo
 from coreutils.constant import Interval
+from data.bar_file import BarFileWriter
 warnings.filterwarnings('ignore')
 
 sys.path.append('//')
@@ -281,6 +283,27 @@ def trans_difffreq_data(data, block_time):
     return info_df
 
 
+# 内存映射K线文件：每张表一个 {table_name}.bar，供回测零拷贝读取（BAR_FILE_DIR 为空则不写）
+bar_file_writers = {}
+
+
+def append_bar_file(data, table_name, ktype):
+    if not CacheInfo.bar_file_dir:
+        return
+    # .bar 文件只是回测用的副本，写入失败（磁盘满、文件头已满、周期不符等）只记日志，不影响实时推送
+    try:
+        writer = bar_file_writers.get(table_name)
+        if writer is None:
+            writer = BarFileWriter(os.path.join(CacheInfo.bar_file_dir, f'{table_name}.bar'), symbols=[code],
+                                   interval=ktype)
+            bar_file_writers[table_name] = writer
+        writer.append_frame(data, time_column='trade_time', symbol_column='code')
+    except Exception:
+        # 下次重新打开文件（截掉写到一半的记录）
+        bar_file_writers.pop(table_name, None)
+        logger.error(f'append bar file {table_name} failed', exc_info=True)
+
+
 q_tick = queue.Queue()
 q_1m = queue.Queue()
 q_5m = queue.Queue()
@@ -357,6 +380,7 @@ def deal_data_1m(queue_put_list=None):
                 if not if_no_trade:
                     data_1m_sql.to_sql(name='mhi_1m', con=conn_to_sql, index=False, if_exists="append")
                     conn_to_sql.clear_compiled_cache()
+                    append_bar_file(data_1m_sql, 'mhi_1m', Interval.K_1M)
 
                     data_1m_sql['trade_time'] = data_1m_sql['trade_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
                     ktype = Interval.K_1M
@@ -445,6 +469,7 @@ def deal_difffreq_data(ktype, table_name, time_range, queue_get, queue_put_list=
                         data_freq2 = pd.concat([data_freq2, data_freq1])
                         data_freq2_sql = trans_difffreq_data(data=data_freq2, block_time=pre_block_time)
                     data_freq2_sql.to_sql(name=table_name, con=conn_to_sql, index=False, if_exists="append")
+                    append_bar_file(data_freq2_sql, table_name, ktype)
                     # 传递到cache
                     publish_kline.pubkline(data=data_freq2_sql, ktype=ktype)
 
@@ -476,6 +501,7 @@ def deal_difffreq_data(ktype, table_name, time_range, queue_get, queue_put_list=
                     # 进行数据整理，并写入
                     data_freq2_sql = trans_difffreq_data(data=data_freq2, block_time=pre_block_time)
                     data_freq2_sql.to_sql(name=table_name, con=conn_to_sql, index=False, if_exists="append")
+                    append_bar_file(data_freq2_sql, table_name, ktype)
 
                     # 传递到cache
                     publish_kline.pubkline(data=data_freq2_sql, ktype=ktype)
@@ -497,6 +523,7 @@ def deal_difffreq_data(ktype, table_name, time_range, queue_get, queue_put_list=
                 # 进行数据整理，并写入
                 data_freq2_sql = trans_difffreq_data(data=data_freq2, block_time=pre_block_time)
                 data_freq2_sql.to_sql(name=table_name, con=conn_to_sql, index=False, if_exists="append")
+                append_bar_file(data_freq2_sql, table_name, ktype)
 
                 # 传递到cache
                 publish_kline.pubkline(data=data_freq2_sql, ktype=ktype)
@@ -6,9 +6,11 @@ from collections import defaultdict
 from collections.abc import Callable
 from queue import Empty, Queue
 from threading import Thread
-from time import sleep
+from time import perf_counter_ns, sleep
 from typing import Any
 
+from engine.event_stats import EventStats
+
 EVENT_TIMER = "eTimer"
 EVENT_TICK = "eTick."
 EVENT_BAR = "eBar."
@@ -63,6 +65,8 @@ class EventEngine:
         self._timer: Thread = Thread(target=self._run_timer)
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: list = []
+        # 分发耗时统计，enable_stats 后才有
+        self.stats: EventStats | None = None
 
     def _run(self) -> None:
         """
@@ -83,12 +87,34 @@ class EventEngine:
         Then distribute event to those general handlers which listens
         to all types.
         """
+        if self.stats is not None:
+            self._process_timed(event, self.stats)
+            return
+
         if event.type in self._handlers:
             [handler(event) for handler in self._handlers[event.type]]
 
         if self._general_handlers:
             [handler(event) for handler in self._general_handlers]
 
+    def _process_timed(self, event: Event, stats: EventStats) -> None:
+        """与 _process 相同，另外记录排队时间和每个处理函数的耗时"""
+        put_ns = getattr(event, "put_ns", None)
+        if put_ns is not None:
+            stats.record_wait(event.type, perf_counter_ns() - put_ns)
+        for handler in self._handlers.get(event.type, []) + self._general_handlers:
+            start = perf_counter_ns()
+            handler(event)
+            stats.record(event.type, handler, perf_counter_ns() - start)
+
+    def enable_stats(self, enabled: bool = True) -> EventStats | None:
+        """开启/关闭分发耗时统计（见 engine.event_stats），返回统计对象"""
+        if not enabled:
+            self.stats = None
+        elif self.stats is None:
+            self.stats = EventStats()
+        return self.stats
+
     def _run_timer(self) -> None:
         """
         Sleep by interval second(s) and then generate a timer event.
@@ -118,6 +144,8 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
+        if self.stats is not None:
+            event.put_ns = perf_counter_ns()
         self._queue.put(event)
 
     def register(self, type: str, handler: HandlerType) -> None:
@@ -0,0 +1,140 @@
+"""
+事件引擎的分发耗时统计（EventEngine / BacktestEventEngine 的 enable_stats）
+
+按 (事件类型, 处理函数) 记录调用次数、累计耗时和耗时直方图；实盘引擎另外按事件类型记录排队等待时间
+（put 到开始处理之间，处理函数名记为 QUEUE_WAIT）。
+
+直方图采用 HDR 风格的对数-线性分桶：每个 2 的幂区间再等分为 SUB_BUCKETS 个子桶，
+相对误差不超过 1 / SUB_BUCKETS，从纳秒到小时都只需要几百个桶，按需保存在 dict 里。
+
+不启用时事件引擎不做任何计时，开销只是每批事件一次 None 判断。
+
+用法示例：
+-----------
+event_engine.enable_stats()
+...
+print(event_engine.stats.to_frame().sort_values("total_ms", ascending=False))
+"""
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+QUEUE_WAIT = "<queue wait>"
+# 输出的分位数
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_index(ns: int) -> int:
+    """耗时（纳秒）所在的桶：小于 SUB_BUCKETS 的值各占一个桶，之后每个 2 的幂区间 SUB_BUCKETS 个桶"""
+    if ns < SUB_BUCKETS:
+        return ns if ns > 0 else 0
+    shift = ns.bit_length() - SUB_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (ns >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """桶的取值范围 [low, high)"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    low = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class _Timing:
+    __slots__ = ("count", "total", "max", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.hist: dict[int, int] = {}
+
+    def add(self, ns: int):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        index = bucket_index(ns)
+        self.hist[index] = self.hist.get(index, 0) + 1
+
+
+def percentile(hist: dict[int, int], q: float, maximum: int) -> int:
+    """直方图中第 q 百分位所在桶的上界（纳秒），不超过最大值"""
+    rank = sum(hist.values()) * q / 100
+    seen = 0
+    for index in sorted(hist):
+        seen += hist[index]
+        if seen >= rank:
+            return min(bucket_bounds(index)[1] - 1, maximum)
+    return maximum
+
+
+class EventStats:
+    """
+    事件分发统计，由事件引擎的处理线程写入；snapshot / to_frame 可以在其他线程调用（如 stats.query 命令）。
+    """
+
+    def __init__(self):
+        self._timings: dict[tuple[str, str], _Timing] = {}
+        self._names: dict = {}
+        self._lock = threading.Lock()
+
+    def _timing(self, key: tuple[str, str]) -> _Timing:
+        timing = self._timings.get(key)
+        if timing is None:
+            with self._lock:
+                timing = self._timings.setdefault(key, _Timing())
+        return timing
+
+    def handler_name(self, handler) -> str:
+        name = self._names.get(handler)
+        if name is None:
+            owner = getattr(handler, "__self__", None)
+            if owner is not None and hasattr(handler, "__func__"):
+                # 绑定方法按实例的类命名（子类继承的处理函数也归到子类）
+                name = f"{type(owner).__name__}.{handler.__func__.__name__}"
+            else:
+                name = getattr(handler, "__qualname__", None) or repr(handler)
+            self._names[handler] = name
+        return name
+
+    def record(self, type: str, handler, ns: int):
+        """handler 处理一次 type 事件用了 ns 纳秒"""
+        self._timing((type, self.handler_name(handler))).add(ns)
+
+    def record_wait(self, type: str, ns: int):
+        """type 事件在队列中等待了 ns 纳秒"""
+        self._timing((type, QUEUE_WAIT)).add(ns)
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+
+    def snapshot(self) -> list[dict]:
+        """[{type, handler, count, total_ms, mean_us, p50_us, p90_us, p99_us, max_us, hist}]，hist 为 {桶下界 ns: 次数}"""
+        with self._lock:
+            items = list(self._timings.items())
+        rows = []
+        for (type, handler), timing in items:
+            # 处理线程可能同时在写，先复制直方图
+            hist = dict(timing.hist)
+            count, total, maximum = timing.count, timing.total, timing.max
+            if not count:
+                continue
+            row = {"type": type, "handler": handler, "count": count, "total_ms": total / 1e6,
+                   "mean_us": total / count / 1e3}
+            for q in PERCENTILES:
+                row[f"p{q}_us"] = percentile(hist, q, maximum) / 1e3
+            row["max_us"] = maximum / 1e3
+            row["hist"] = {bucket_bounds(index)[0]: n for index, n in sorted(hist.items())}
+            rows.append(row)
+        return rows
+
+    def to_frame(self) -> pd.DataFrame:
+        columns = ["type", "handler", "count", "total_ms", "mean_us", *(f"p{q}_us" for q in PERCENTILES), "max_us"]
+        return pd.DataFrame(self.snapshot(), columns=columns + ["hist"])[columns]
@@ -37,8 +37,9 @@ class OmsBase:
     - 通过事件引擎接收更新。
     """
 
-    def __init__(self, event_engine: EventEngine = EventEngine()):
-        self.event_engine = event_engine
+    def __init__(self, event_engine: EventEngine | None = None):
+        # 默认参数只在导入时求值一次，不能用 EventEngine() 作默认值，否则所有实例共享同一个事件引擎
+        self.event_engine = event_engine if event_engine is not None else EventEngine()
 
         # 数据缓存
         self.ticks: dict[str, TickData] = {}
@@ -198,7 +199,7 @@ class OmsBase:
 
 
 class OmsMhi(OmsBase):
-    def __init__(self, event_engine: EventEngine = EventEngine()):
+    def __init__(self, event_engine: EventEngine | None = None):
         super().__init__(event_engine)
     def process_position_event(self, event: Event):
         position: PositionData = event.data
@@ -0,0 +1,96 @@
+"""
+大回测作图用的降采样
+
+- lttb：Largest-Triangle-Three-Buckets，保留折线形状（峰谷、拐点）的降采样，返回保留点的下标
+- downsample_index：多条共用 x 轴的折线各自做 LTTB，取下标并集，每条线的形状都保留
+- aggregate_bars：K 线和交易数据按连续的 bucket 合并：open 取第一根、high 取最大、low 取最小、close 取最后一根，
+  买卖量求和、持仓取最后值，极值不会因为降采样丢失
+- truncate_rows：表格只保留开头和结尾的行，中间插入一行说明
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    从 len(x) 个点中选出 n_out 个点的下标（递增，含首尾）。x 需递增；y 中的 NaN 按 0 计算面积。
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    # 首尾各占一个点，中间 n - 2 个点分成 n_out - 2 个桶
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        # 下一个桶的平均点（最后一个桶用终点）
+        nxt_lo, nxt_hi = (edges[k + 1], edges[k + 2]) if k + 2 < len(edges) else (n - 1, n)
+        cx = x[nxt_lo:nxt_hi].mean()
+        cy = y[nxt_lo:nxt_hi].mean()
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(area.argmax())
+        out[k + 1] = a
+    return out
+
+
+def downsample_index(x, columns: list, n_out: int) -> np.ndarray:
+    """多条共用 x 的折线：每条按 n_out / 条数 做 LTTB，返回下标并集（不超过 n_out 个）"""
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+    x = _as_float(x)
+    per = max(n_out // max(len(columns), 1), 3)
+    return np.unique(np.concatenate([lttb(x, np.asarray(col, dtype=np.float64), per) for col in columns]))
+
+
+def aggregate_bars(df: pd.DataFrame, n_out: int, first: tuple = ("date", "open"), last: tuple = ("close",),
+                   high: tuple = ("high",), low: tuple = ("low",), total: tuple = (), keep_last: tuple = ()
+                   ) -> pd.DataFrame:
+    """
+    按行顺序把 df 合并成不超过 n_out 行：first / last 列取桶内第一个 / 最后一个非空值，high 取最大，low 取最小，
+    total 求和，keep_last 取桶内最后一个非空值（如持仓）
+    """
+    n = len(df)
+    if n <= n_out:
+        return df
+    size = -(-n // n_out)
+    bucket = np.arange(n) // size
+    spec = {}
+    for col in first:
+        spec[col] = (col, "first")
+    for cols, how in ((last, "last"), (high, "max"), (low, "min"), (total, "sum"), (keep_last, "last")):
+        for col in cols:
+            spec[col] = (col, how)
+    return df.groupby(bucket, sort=False).agg(**spec).reset_index(drop=True)[list(df.columns.intersection(spec))]
+
+
+def truncate_rows(df: pd.DataFrame, n_out: int, note: str = "") -> pd.DataFrame:
+    """超过 n_out 行时保留前后各一半，中间插入一行说明（写在第一列，默认为省略的行数）"""
+    n = len(df)
+    if n <= n_out:
+        return df
+    head = n_out // 2
+    note_row = pd.DataFrame([[note or f"... {n - n_out} rows omitted ..."] + [""] * (len(df.columns) - 1)],
+                            columns=df.columns)
+    return pd.concat([df.iloc[:head].astype(object), note_row, df.iloc[n - (n_out - head):].astype(object)],
+                     ignore_index=True)
+
+
+def _as_float(x) -> np.ndarray:
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if x.dtype == object:
+        return pd.to_datetime(pd.Series(x)).to_numpy().astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
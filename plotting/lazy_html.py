@@ -0,0 +1,145 @@
+"""
+分页懒加载的回测报告 HTML
+
+pyecharts 的 Tab.render 把所有分页的数据都写进同一个 HTML，数据量大时文件上百 MB、浏览器打开很慢。
+render_lazy 只在 HTML 里放分页按钮和加载代码，每个分页的数据（图表的 echarts option 或表格行）
+gzip 压缩后以 base64 写入 <html名>_files/ 下的一个 .js 文件，点开分页时才通过 <script> 加载
+（本地文件也能加载，不受 file:// 下 fetch 的跨域限制），再用浏览器的 DecompressionStream 解压。
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import html
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from pyecharts.globals import CurrentConfig
+
+_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>{title}</title>
+<script src="{echarts}"></script>
+<style>
+body {{ margin: 0; background: #100c2a; color: #ddd; font-family: sans-serif; }}
+.bt-tabs button {{ background: #222; color: #ddd; border: 1px solid #444; padding: 6px 14px; cursor: pointer; }}
+.bt-tabs button.active {{ background: #444; }}
+.bt-page {{ display: none; }}
+.bt-page table {{ border-collapse: collapse; font-size: 12px; margin: 8px; }}
+.bt-page td, .bt-page th {{ border: 1px solid #444; padding: 2px 6px; }}
+</style>
+</head>
+<body>
+<div class="bt-tabs">{buttons}</div>
+{pages}
+<script>
+window.__btData = {{}};
+var btPages = {pages_json};
+var btDir = {data_dir};
+function btDecode(b64) {{
+    var bytes = Uint8Array.from(atob(b64), function (c) {{ return c.charCodeAt(0); }});
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).json();
+}}
+function btRender(k, data) {{
+    var page = document.getElementById("bt-page-" + k);
+    if (btPages[k].kind === "chart") {{
+        var chart = echarts.init(page, btPages[k].theme, {{renderer: "canvas"}});
+        chart.setOption(data);
+        window.addEventListener("resize", function () {{ chart.resize(); }});
+    }} else {{
+        var esc = function (v) {{ return String(v === null ? "" : v).replace(/&/g, "&amp;").replace(/</g, "&lt;"); }};
+        var rows = ["<table><tr>" + data.columns.map(function (c) {{ return "<th>" + esc(c) + "</th>"; }}).join("") + "</tr>"];
+        data.rows.forEach(function (r) {{
+            rows.push("<tr>" + r.map(function (v) {{ return "<td>" + esc(v) + "</td>"; }}).join("") + "</tr>");
+        }});
+        page.innerHTML = rows.join("") + "</table>";
+    }}
+}}
+function btShow(k) {{
+    document.querySelectorAll(".bt-page").forEach(function (p, i) {{ p.style.display = i === k ? "block" : "none"; }});
+    document.querySelectorAll(".bt-tabs button").forEach(function (b, i) {{ b.className = i === k ? "active" : ""; }});
+    if (btPages[k].loaded) return;
+    btPages[k].loaded = true;
+    var script = document.createElement("script");
+    script.src = btDir + "/" + btPages[k].file;
+    script.onload = function () {{ btDecode(window.__btData[k]).then(function (d) {{ btRender(k, d); }}); }};
+    document.body.appendChild(script);
+}}
+btShow(0);
+</script>
+</body>
+</html>
+"""
+
+
+def render_lazy(tabs: list[tuple[str, object]], path: str, title: str = "backtest") -> list[str]:
+    """
+    :param tabs: [(分页名, pyecharts 图表 或 DataFrame)]，DataFrame 按表格显示
+    :param path: HTML 路径，数据文件写到同目录的 <文件名>_files/ 下
+    :return: 写出的全部文件路径
+    """
+    root, _ = os.path.splitext(path)
+    data_dir = root + "_files"
+    os.makedirs(data_dir, exist_ok=True)
+    files = [path]
+    pages = []
+    styles = []
+    for k, (name, item) in enumerate(tabs):
+        if isinstance(item, pd.DataFrame):
+            payload = {"columns": [str(c) for c in item.columns], "rows": _table_rows(item)}
+            page = {"kind": "table"}
+            styles.append("width: 100%;")
+        else:
+            payload = _finite(json.loads(item.dump_options()))
+            page = {"kind": "chart", "theme": item.theme}
+            styles.append(f"width: {item.width}; height: {item.height};")
+        page["file"] = f"tab_{k}.js"
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        encoded = base64.b64encode(gzip.compress(raw, compresslevel=6)).decode("ascii")
+        file = os.path.join(data_dir, page["file"])
+        with open(file, "w", encoding="ascii") as f:
+            f.write(f'window.__btData[{k}] = "{encoded}";\n')
+        files.append(file)
+        pages.append((name, page))
+
+    buttons = "".join(f'<button onclick="btShow({k})">{html.escape(name)}</button>'
+                      for k, (name, _) in enumerate(pages))
+    divs = "\n".join(f'<div class="bt-page" id="bt-page-{k}" style="{style}"></div>' for k, style in enumerate(styles))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_TEMPLATE.format(
+            title=html.escape(title), echarts=CurrentConfig.ONLINE_HOST + "echarts.min.js", buttons=buttons,
+            pages=divs, pages_json=json.dumps([page for _, page in pages]),
+            data_dir=json.dumps(os.path.basename(data_dir))))
+    return files
+
+
+def _table_rows(df: pd.DataFrame) -> list[list]:
+    return [[_cell(v) for v in row] for row in df.astype(object).to_numpy()]
+
+
+def _cell(v):
+    # 时间、枚举等转成字符串
+    if isinstance(v, np.generic):
+        v = v.item()
+    if v is None or isinstance(v, (bool, int, str)):
+        return v
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    return str(v)
+
+
+def _finite(obj):
+    """NaN / inf 不是合法 JSON，换成 null（echarts 按缺失值处理）"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, list):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    return obj
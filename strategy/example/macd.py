@@ -61,10 +61,27 @@ class MACDStrategy(StrategyBase):
             gateway_name="MACD",
         )
 
+    @staticmethod
+    def target_position(close: np.ndarray, volume: int = 1, fast: int = 12, slow: int = 26,
+                        signal: int = 9) -> np.ndarray:
+        """
+        on_bar 逻辑的向量化版本，供 BacktestEngine.run_vectorized 使用：
+        金叉后持有 volume 手多单，死叉后空仓。返回与 close 等长的目标仓位数组。
+        """
+        macd_df = macd(pd.Series(close, dtype=float), fast=fast, slow=slow, signal=signal)
+        curr_diff = (macd_df["DIF"] - macd_df["DEA"]).to_numpy()
+        prev_diff = np.r_[np.nan, curr_diff[:-1]]
+        # 与 on_bar 一致：至少 slow + signal + 1 根数据才开始判断
+        enough = np.arange(len(close)) >= slow + signal
+        golden = enough & (prev_diff <= 0) & (curr_diff > 0)
+        dead = enough & (prev_diff >= 0) & (curr_diff < 0)
+        target = pd.Series(np.where(golden, float(volume), np.where(dead, 0.0, np.nan)))
+        return target.ffill().fillna(0.0).to_numpy()
+
     # ===================== 事件回调 =====================
 
     def on_trade(self, trade: TradeData):
-        self.write_log(LogData(msg=f"[MACD] {self.data_time} 收到TradeData:{trade}"))
+        self.write_log(LogData("[MACD] %s 收到TradeData:%s", args=(self.data_time, trade)))
 
         if trade.symbol != self.symbol:
             return
@@ -92,7 +109,7 @@ class MACDStrategy(StrategyBase):
         arr = np.asarray(self._closes, dtype=float)
         # 计算 MACD
         s = pd.Series(arr, dtype=float)  # arr 是收盘价数组
-        macd_df = macd(s, fast=12, slow=26, signal=9)
+        macd_df = macd(s, fast=self.fast, slow=self.slow, signal=self.signal)
 
         if macd_df is not None:
             macd_line = macd_df["DIF"]
@@ -112,12 +129,12 @@ class MACDStrategy(StrategyBase):
 
         if golden and self.position.volume == 0:
             self._pending_signal = "buy"
-            self.write_log(LogData(msg=f"[MACD] {self.data_time} 金叉 -> BUY @ {close}"))
+            self.write_log(LogData("[MACD] %s 金叉 -> BUY @ %s", args=(self.data_time, close)))
             self._request_realign()
 
         if dead and self.position.volume > 0:
             self._pending_signal = "sell"
-            self.write_log(LogData(msg=f"[MACD] {self.data_time} 死叉 -> SELL @ {close}"))
+            self.write_log(LogData("[MACD] %s 死叉 -> SELL @ %s", args=(self.data_time, close)))
             self._request_realign()
 
     def on_tick(self, tick):
@@ -0,0 +1,32 @@
+from coreutils.logger import get_logger
+from coreutils.constant import Interval
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+import pandas as pd
+from strategy.example.macd import MACDStrategy
+
+# ==============1.读取数据=================
+df = pd.read_csv('c:/users/holy_/desktop/autotrade/strategy/example/1h_2023.csv')
+# 数据列必须有'symbol', 'open', 'high', 'low', 'close', 'datetime', 'ktype'
+df['ktype'] = Interval.K_1H
+df['symbol'] = 'HK.MHImain'
+df = df[['symbol', 'open', 'high', 'low', 'close', 'trade_date', 'ktype']]
+df.columns = ['symbol', 'open', 'high', 'low', 'close', 'datetime', 'ktype']
+
+# ==============2.回测引擎=================
+# 向量化模式不经过事件分发，不需要注册策略
+logger = get_logger(name='backtest', logfile='macd.log')
+engine = BacktestEngine(event_engine=BacktestEventEngine(), logger=logger, initial_cash=50000,
+                        daily_update_interval=Interval.K_1H)
+engine.load_data(data_list=[df])
+engine.set_contracts(contract_params={
+    "HK.MHImain": {"size": 10, "margin_rate": 0.1, "long_rate": 0.00006, "short_rate": 0.00006}
+})
+
+# ==============3.目标仓位=================
+# 与 engine 中 1h bar 一一对应（load_data 会丢掉最后一根没有 end_date 的 bar）
+close = engine.history.close[engine.history.source_rows("HK.MHImain", Interval.K_1H)]
+target = MACDStrategy.target_position(close, volume=1)
+# MACDStrategy 下市价单时 trigger_price 取信号 bar 的收盘价
+engine.run_vectorized(signals={"HK.MHImain": target}, trigger_prices={"HK.MHImain": close})
+engine.performance_plot(plot_path='macd_vectorized.html')
@@ -61,7 +61,8 @@ class StrategyBase:
         # —— 事件注册：统一对齐入口 ——
         self.ee.register(EVENT_RECONCILE, self._on_reconcile)
         # （如需要，也可注册 EVENT_ORDER/EVENT_TRADE 到 on_order/on_trade）
-        self.ee.start()
+        # BacktestEventEngine.put 本身就是同步排空队列的，不需要 start() 起后台线程；
+        # 起线程反而会和 put 抢同一个队列（多进程参数优化时会卡死）
 
     def initialize(self):
         self.register_event()
@@ -174,5 +175,19 @@ class StrategyBase:
             elif act == "cancel":
                 self.me.put(Event(EVENT_CANCEL_REQ, req))
 
+    # ===================== 检查点 =====================
+    # 不保存的属性：事件引擎等运行环境，恢复时由新的策略实例自己创建
+    STATE_EXCLUDE = ('me', 'ee')
+
+    def get_state(self) -> dict:
+        """
+        回测检查点保存的策略状态，默认为除 STATE_EXCLUDE 之外的全部属性（需要能被 pickle）。
+        子类有不能 pickle 的属性时，加入 STATE_EXCLUDE 或者重写 get_state / set_state。
+        """
+        return {name: value for name, value in vars(self).items() if name not in self.STATE_EXCLUDE}
+
+    def set_state(self, state: dict):
+        self.__dict__.update(state)
+
     def write_log(self, log_data: LogData):
         self.me.put(Event(EVENT_LOG, log_data))
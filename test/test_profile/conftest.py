@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import make_bar_frames
+from coreutils.config import CacheInfo
+from coreutils.constant import Interval
+
+# 各测试共用的合成行情（示例策略 TargetStrategy / FlipStrategy 见 benchmarks.synthetic）
+SYMBOL = "MHI"
+CONTRACTS = {SYMBOL: {"size": 10, "margin_rate": 0.1, "long_rate": 0.0002, "short_rate": 0.0001}}
+
+
+def make_bars(n=300, interval=Interval.K_15M, seed=0, sigma=20.0, symbol=SYMBOL) -> pd.DataFrame:
+    """单标的随机游走K线（load_data 格式），从 2024-01-02 09:15 起连续 n 根"""
+    return make_bar_frames(n, interval=interval, seed=seed, symbols=[symbol], sigma=sigma)[0]
+
+
+def make_targets(n, seed=11):
+    rng = np.random.default_rng(seed)
+    # 包含加仓、部分平仓和多空翻转
+    return rng.choice([-2, -1, 0, 1, 2, 3], size=n, p=[.1, .1, .4, .2, .1, .1]).astype(float)
+
+
+@pytest.fixture(autouse=True)
+def no_default_result_cache(monkeypatch):
+    # 参数扫描默认使用 RESULT_CACHE_DIR 下的结果缓存，测试中关闭，需要时由用例自己设置
+    monkeypatch.setattr(CacheInfo, "result_cache_dir", "")
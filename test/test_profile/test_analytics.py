@@ -0,0 +1,64 @@
+import warnings
+import numpy as np
+import pandas as pd
+from backtest.analytics import equity_metrics, trade_metrics, rolling_sharpe, format_metrics
+
+
+def reference(equity, initial_cash, risk_free=0.02, annual_days=240):
+    """原 calculate_statistics 的逐点实现"""
+    equity = pd.Series(equity)
+    daily_return = equity.pct_change().dropna()
+    sharpe = (daily_return.mean() - risk_free / annual_days) / (daily_return.std() + 1e-9) * np.sqrt(annual_days)
+    peak, max_dd = equity.iloc[0], 0
+    for x in equity:
+        peak = max(peak, x)
+        max_dd = max(max_dd, (peak - x) / peak)
+    return {"total_return": equity.iloc[-1] / initial_cash - 1, "sharpe": sharpe, "max_drawdown": max_dd,
+            "annual_return": (1 + daily_return.mean()) ** annual_days - 1}
+
+
+def test_equity_metrics_match_reference_and_batch():
+    curves = 1000 * np.cumprod(1 + np.random.default_rng(3).normal(0, 0.01, (4, 500)), axis=1)
+    batch = equity_metrics(curves, 1000)
+    for n, curve in enumerate(curves):
+        single = equity_metrics(curve, 1000)
+        for key, value in reference(curve, 1000).items():
+            assert np.isclose(single[key], value, rtol=1e-9)
+            assert np.isclose(batch[key][n], value, rtol=1e-9)
+        assert single["max_drawdown_duration"] == batch["max_drawdown_duration"][n]
+
+    equity = np.array([100, 110, 105, 100, 108, 111, 90, 95])
+    assert equity_metrics(equity, 100)["max_drawdown_duration"] == 3
+    assert np.isnan(rolling_sharpe(equity, 3)[:2]).all()
+
+
+def test_equity_metrics_degenerate_curves():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        single = equity_metrics(np.array([100.0]), 100)
+        assert set(single) == set(equity_metrics(np.array([100.0, 101.0]), 100))
+        assert all(np.isnan(value) for value in single.values())
+        assert equity_metrics(np.ones((3, 1)), 1, margin=np.zeros((3, 1)))["exposure"].shape == (3,)
+        # 高频短曲线年化溢出不告警
+        assert np.isinf(equity_metrics(np.array([100.0, 200.0, 400.0]), 100, annual_days=240 * 390)["annual_return"])
+
+
+def test_trade_metrics_round_trips():
+    t = pd.to_datetime(["2024-01-01 10:00", "2024-01-01 11:00", "2024-01-01 12:00", "2024-01-01 14:00"]).asi8
+    # 买 2 -> 卖 3（平 2 反手空 1）-> 买 1 平仓 -> 买 1 开多（未平）
+    metrics = trade_metrics(np.array(["A"] * 4, dtype=object), t, np.array([2, -3, 1, 1.0]),
+                            np.array([100, 110, 115, 120.0]), sizes={"A": 10}, mean_equity=10_000)
+    assert metrics["round_trips"] == 2
+    assert metrics["win_rate"] == 0.5
+    assert metrics["profit_factor"] == 200 / 50
+    assert metrics["avg_holding_seconds"] == 3600
+    assert np.isclose(metrics["turnover"], (200 + 330 + 115 + 120) * 10 / 10_000)
+    assert format_metrics(metrics)["win_rate"] == "50.00%"
+
+    # 分批平仓：买 2 -> 卖 1（+10）-> 卖 1（-10），每笔平仓都计入
+    metrics = trade_metrics(np.array(["A"] * 3, dtype=object), t[:3], np.array([2, -1, -1.0]),
+                            np.array([100, 110, 90.0]))
+    assert metrics["round_trips"] == 2
+    assert metrics["win_rate"] == 0.5
+    assert metrics["profit_factor"] == 1.0
+    assert metrics["avg_holding_seconds"] == (3600 + 7200) / 2
@@ -0,0 +1,81 @@
+import logging
+import threading
+import pandas as pd
+from coreutils.constant import Interval
+from engine.event_engine import EVENT_TIMER, EVENT_BAR
+from backtest.backtest_event_engine import BacktestEventEngine, Event
+from backtest.backtest_engine import BacktestEngine
+
+
+def test_nested_puts_are_queued_in_fifo_order():
+    ee = BacktestEventEngine()
+    seen = []
+
+    def first(event):
+        seen.append(("first", event.data))
+        if event.data == 0:
+            ee.put(Event("a", 1))
+            ee.put(Event("b", 2))
+
+    ee.register("a", first)
+    ee.register("a", lambda e: seen.append(("second", e.data)))
+    ee.register("b", lambda e: seen.append(("b", e.data)))
+    ee.register_general(lambda e: seen.append(("general", e.data)))
+    ee.put(Event("a", 0))
+    # 处理函数里 put 的事件在当前事件全部处理完之后按顺序处理
+    assert seen == [("first", 0), ("second", 0), ("general", 0),
+                    ("first", 1), ("second", 1), ("general", 1),
+                    ("b", 2), ("general", 2)]
+
+
+def test_deep_event_chains_do_not_recurse():
+    ee = BacktestEventEngine()
+    count = []
+
+    def chain(event):
+        count.append(event.data)
+        if event.data < 20_000:
+            ee.put(Event("a", event.data + 1))
+
+    ee.register("a", chain)
+    threads = threading.active_count()
+    ee.start()
+    ee.put(Event("a", 0))
+    ee.stop()
+    assert len(count) == 20_001
+    assert threading.active_count() == threads
+
+
+def test_unregister_updates_dispatch():
+    ee = BacktestEventEngine()
+    seen = []
+    handler = seen.append
+    ee.register("a", handler)
+    ee.register("a", handler)
+    ee.put(Event("a", 1))
+    ee.unregister("a", handler)
+    ee.put(Event("a", 2))
+    assert [e.data for e in seen] == [1]
+
+
+def test_simulated_timer_follows_bar_time():
+    bars = pd.DataFrame({
+        "symbol": "MHI", "datetime": pd.date_range("2024-01-02 09:15", periods=6, freq="1min"),
+        "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.0, "ktype": [Interval.K_1M] * 6,
+    })
+    logger = logging.getLogger("test_backtest_event_engine")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine(interval=30, timer=True)
+    engine = BacktestEngine(event_engine=ee, logger=logger)
+    engine.load_data([bars])
+    seen = []
+    ee.register(EVENT_TIMER, lambda e: seen.append(("timer", e.data)))
+    ee.register(EVENT_BAR, lambda e: seen.append(("bar", e.data.datetime)))
+    engine.run()
+
+    # 5 根 bar（最后一根没有 end_date 被丢弃），收盘 09:16 ~ 09:20；第一根只设定起点
+    timers = [t for kind, t in seen if kind == "timer"]
+    assert timers == list(pd.date_range("2024-01-02 09:16:30", "2024-01-02 09:20", freq="30s"))
+    # 定时器在收盘时刻不晚于它的 bar 之前发出
+    assert seen.index(("timer", pd.Timestamp("2024-01-02 09:17"))) < \
+        seen.index(("bar", pd.Timestamp("2024-01-02 09:16")))
@@ -0,0 +1,43 @@
+import pandas as pd
+from sqlalchemy import create_engine
+from coreutils.constant import Interval
+from data.bar_cache import BarCache, cached_kline
+
+
+def make_engine():
+    engine = create_engine("sqlite://")
+    times = pd.date_range("2024-01-30", "2024-03-02", freq="1h", inclusive="left")
+    pd.DataFrame({"code": "MHI", "trade_time": times, "open": range(len(times)), "close": range(len(times)),
+                  "high": 1.0, "low": 1.0, "volume": 1.0}).to_sql("mhi_1h", engine, index=False)
+    return engine
+
+
+def test_cache_fetches_only_missing_ranges(tmp_path):
+    engine = make_engine()
+    cache = BarCache(root=str(tmp_path), max_partitions=2)
+
+    first = cached_kline("HKEX", "mhi_1h", "MHI", Interval.K_1H, "2024-02-01", "2024-02-10", cache=cache, engine=engine)
+    assert len(first) == 9 * 24
+    assert cache.stats["misses"] == 1 and cache.stats["fetches"] == 1
+
+    # 完全命中：不再查询数据库
+    again = cached_kline("HKEX", "mhi_1h", "MHI", Interval.K_1H, "2024-02-03", "2024-02-05", cache=cache, engine=engine)
+    assert cache.stats["hits"] == 1 and cache.stats["fetches"] == 1
+    assert again["trade_time"].iloc[0] == pd.Timestamp("2024-02-03")
+
+    # 部分重叠：只补两端缺口，跨月分区
+    assert cache.missing_ranges("MHI", Interval.K_1H, "2024-01-30", "2024-02-15") == [
+        (pd.Timestamp("2024-01-30"), pd.Timestamp("2024-02-01")),
+        (pd.Timestamp("2024-02-10"), pd.Timestamp("2024-02-15"))]
+    wide = cached_kline("HKEX", "mhi_1h", "MHI", Interval.K_1H, "2024-01-30", "2024-02-15", cache=cache, engine=engine)
+    assert cache.stats["fetches"] == 3
+    assert len(wide) == 16 * 24
+    assert wide["trade_time"].is_monotonic_increasing and wide["trade_time"].is_unique
+    assert sorted(p.name for p in (tmp_path / "MHI" / "K_1H").iterdir()) == ["2024-01.parquet", "2024-02.parquet"]
+
+    # 新进程：manifest 和分区从磁盘恢复
+    reopened = BarCache(root=str(tmp_path))
+    cached = cached_kline("HKEX", "mhi_1h", "MHI", Interval.K_1H, "2024-01-30", "2024-02-15", cache=reopened,
+                          engine=engine)
+    assert reopened.stats["hits"] == 1 and reopened.stats["fetches"] == 0
+    pd.testing.assert_frame_equal(cached, wide)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from coreutils.constant import Interval
+from coreutils.ta import _to_series
+from backtest.bar_store import BarStore
+from data.bar_file import BarFile, BarFileWriter, HEADER_SIZE
+
+
+def make_frame(n=100):
+    times = pd.date_range("2024-01-02 09:15", periods=n, freq="1min")
+    close = 100 + np.arange(n, dtype=float)
+    return pd.DataFrame({"code": "MHI", "trade_time": times, "open": close - 0.5, "high": close + 1,
+                         "low": close - 1, "close": close, "volume": 1.0})
+
+
+def test_writer_appends_and_reader_slices(tmp_path):
+    path = str(tmp_path / "mhi_1m.bar")
+    df = make_frame()
+    writer = BarFileWriter(path, symbols=["MHI"], interval=Interval.K_1M)
+    assert writer.append_frame(df.iloc[:60], time_column="trade_time", symbol_column="code") == 60
+    # 重复的bar被跳过
+    assert writer.append_frame(df.iloc[50:], time_column="trade_time", symbol_column="code") == 40
+
+    # 模拟写到一半崩溃：重新打开时截掉不完整的记录
+    with open(path, "ab") as f:
+        f.write(b"\0" * 10)
+    writer = BarFileWriter(path)
+    assert writer.append(pd.Timestamp("2024-01-02 10:55"), 1, 2, 0, 1.5, 3) == 1
+
+    bars = BarFile(path)
+    assert len(bars) == 101
+    assert bars.symbols == ["MHI"] and bars.interval == Interval.K_1M
+    view = bars.slice_time("2024-01-02 09:20", "2024-01-02 09:30")
+    assert len(view) == 10
+    assert view["close"][0] == 105.0
+    assert np.shares_memory(view["close"], bars.records)
+    assert bars.records.offset == HEADER_SIZE
+
+
+def test_symbols_appended_one_at_a_time_share_timestamps(tmp_path):
+    path = str(tmp_path / "multi_1m.bar")
+    times = pd.date_range("2024-01-02 09:15", periods=5, freq="1min")
+    writer = BarFileWriter(path, symbols=["A", "B"], interval=Interval.K_1M)
+    for n, t in enumerate(times):
+        assert writer.append(t, 1, 2, 0, 100 + n, symbol="A") == 1
+        assert writer.append(t, 1, 2, 0, 200 + n, symbol="B") == 1
+        # 同一时间同一标的重复写入被跳过
+        assert writer.append(t, 1, 2, 0, 0, symbol="A") == 0
+    # 重新打开后仍记得最后一个时间已写入的标的
+    writer = BarFileWriter(path)
+    assert writer.append(times[-1], 1, 2, 0, 0, symbol="B") == 0
+    frame = pd.DataFrame({"datetime": [times[-1], times[-1]], "symbol": ["C", "C"], "open": 1.0, "high": 2.0,
+                          "low": 0.0, "close": [300.0, 301.0]})
+    assert writer.append_frame(frame) == 1
+    # 早于最后时间的bar仍被跳过，文件保持有序
+    assert writer.append(times[0], 1, 2, 0, 0, symbol="C") == 0
+
+    df = BarFile(path).to_frame()
+    assert len(df) == 11 and df["datetime"].is_monotonic_increasing
+    assert df.groupby("symbol")["close"].apply(list).to_dict() == {
+        "A": [100.0, 101, 102, 103, 104], "B": [200.0, 201, 202, 203, 204], "C": [300.0]}
+
+
+def test_bar_store_from_bar_file_is_zero_copy(tmp_path):
+    path = str(tmp_path / "mhi_1m.bar")
+    df = make_frame()
+    BarFileWriter(path, symbols=["MHI"], interval=Interval.K_1M).append_frame(df, time_column="trade_time",
+                                                                              symbol_column="code")
+    bars = BarFile(path)
+    store = BarStore.from_bar_file(bars, "2024-01-02 09:30", "2024-01-02 10:00")
+    assert np.shares_memory(store.close, bars.records)
+
+    frame = df.rename(columns={"code": "symbol", "trade_time": "datetime"})
+    frame["ktype"] = Interval.K_1M
+    expected = BarStore.from_frames([frame[(frame.datetime >= "2024-01-02 09:30") &
+                                           (frame.datetime <= "2024-01-02 10:00")]])
+    assert len(store) == len(expected) == 30
+    np.testing.assert_array_equal(store.end_date, expected.end_date)
+    np.testing.assert_array_equal(store.close, expected.close)
+
+    # 技术指标直接在 memmap 视图上计算，不拷贝输入
+    series = _to_series(store.close)
+    assert np.shares_memory(series.to_numpy(), bars.records)
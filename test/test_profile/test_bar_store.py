@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from coreutils.constant import Interval
+from backtest.bar_store import BarStore
+
+
+def make_df(symbol, start, periods, freq, ktype, base=100.0):
+    dates = pd.date_range(start, periods=periods, freq=freq)
+    prices = base + np.arange(periods, dtype=float)
+    return pd.DataFrame({
+        "symbol": symbol,
+        "datetime": dates,
+        "open": prices,
+        "high": prices + 1,
+        "low": prices - 1,
+        "close": prices + 0.5,
+        "ktype": [ktype] * periods,
+    })
+
+
+def test_from_frames_drops_last_bar_and_encodes_columns():
+    df = make_df("MHI", "2025-01-01 09:15", 5, "15min", Interval.K_15M)
+    store = BarStore.from_frames([df])
+
+    # 最后一根没有 end_date，被丢弃
+    assert len(store) == 4
+    assert store.symbols == ["MHI"]
+    assert store.intervals == [Interval.K_15M]
+    assert store.datetime.dtype == np.int64
+    assert (store.end_date - store.datetime == (15 * 60 - 1) * 1_000_000_000).all()
+
+
+def test_iter_bars_follows_end_date_then_interval_order():
+    df_1m = make_df("MHI", "2025-01-01 09:15", 31, "1min", Interval.K_1M)
+    df_15m = make_df("MHI", "2025-01-01 09:15", 3, "15min", Interval.K_15M, base=200.0)
+    store = BarStore.from_frames([df_15m, df_1m])
+
+    bars = list(store.iter_bars("backtest"))
+    assert len(bars) == 30 + 2
+    # 09:15 的 15m bar 在 09:29 的 1m bar 之后
+    idx_15m = [i for i, b in enumerate(bars) if b.interval == Interval.K_15M]
+    assert idx_15m == [15, 31]
+    assert bars[14].datetime == datetime(2025, 1, 1, 9, 29)
+    assert bars[15].close_price == 200.5
+    assert isinstance(bars[0].open_price, float)
+
+
+def test_to_frame_and_concat():
+    a = make_df("MHI", "2025-01-01 09:15", 4, "15min", Interval.K_15M)
+    b = make_df("HSI", "2025-01-01 09:15", 4, "15min", Interval.K_15M)
+    store = BarStore.concat([BarStore.from_frames([a]), BarStore.from_frames([b])])
+
+    assert store.symbols == ["MHI", "HSI"]
+    frame = store.to_frame(symbol="HSI")
+    assert len(frame) == 3
+    assert (frame["symbol"] == "HSI").all()
+    assert frame["datetime"].iloc[0] == pd.Timestamp("2025-01-01 09:15")
+
+
+def test_iter_bars_merge_matches_global_sort(monkeypatch):
+    import backtest.bar_store as bar_store
+    # 每个数据源每次只转换几行，验证跨块归并
+    monkeypatch.setattr(bar_store, "_MIN_MERGE_CHUNK", 3)
+    monkeypatch.setattr(bar_store, "_ITER_CHUNK", 8)
+    frames = [
+        make_df("MHI", "2025-01-01 09:15", 61, "1min", Interval.K_1M),
+        make_df("HSI", "2025-01-01 09:15", 61, "1min", Interval.K_1M, base=300.0),
+        make_df("MHI", "2025-01-01 09:15", 5, "15min", Interval.K_15M, base=200.0),
+        make_df("HSI", "2025-01-01 09:00", 4, "30min", Interval.K_30M, base=400.0),
+    ]
+    store = BarStore.from_frames(frames)
+    assert store._order is None
+
+    bars = list(store.iter_bars("backtest"))
+    expected = store.order
+    assert len(bars) == len(store)
+    assert [b.close_price for b in bars] == store.close[expected].tolist()
+    assert [store.symbols.index(b.symbol) for b in bars] == store.symbol_id[expected].tolist()
+    assert [b.interval for b in bars] == [store.intervals[i] for i in store.interval_id[expected]]
+
+
+def test_slice_time_keeps_lazy_order():
+    frames = [make_df("MHI", "2025-01-01 09:15", 61, "1min", Interval.K_1M),
+              make_df("MHI", "2025-01-01 09:15", 5, "15min", Interval.K_15M, base=200.0)]
+    store = BarStore.from_frames(frames)
+    lazy = store.slice_time("2025-01-01 09:30", "2025-01-01 10:00")
+    assert lazy._order is None
+
+    store.order
+    eager = store.slice_time("2025-01-01 09:30", "2025-01-01 10:00")
+    assert eager._order is not None
+    assert eager.order.tolist() == np.lexsort((eager.interval_id, eager.end_date)).tolist()
+    assert [b.close_price for b in lazy.iter_bars("backtest")] == lazy.close[eager.order].tolist()
@@ -0,0 +1,73 @@
+import logging
+import pandas as pd
+from sqlalchemy import create_engine
+from coreutils.constant import Interval
+from backtest.bar_store import BarStore
+from backtest.bar_stream import BarStream
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from benchmarks.synthetic import TargetStrategy
+from test.test_profile.conftest import SYMBOL, make_bars, make_targets
+
+
+def make_table(n, interval, seed):
+    """数据库K线表格式"""
+    return make_bars(n, interval, seed=seed).drop(columns="ktype").rename(
+        columns={"symbol": "code", "datetime": "trade_time"})
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    make_table(600, Interval.K_1M, 1).to_sql("mhi_1m", engine, index=False)
+    make_table(40, Interval.K_15M, 2).to_sql("mhi_15m", engine, index=False)
+    return engine
+
+
+def to_frames(engine):
+    frames = []
+    for table, interval in (("mhi_1m", Interval.K_1M), ("mhi_15m", Interval.K_15M)):
+        df = pd.read_sql_table(table, engine).rename(columns={"trade_time": "datetime", "code": "symbol"})
+        df["ktype"] = interval
+        frames.append(df)
+    return frames
+
+
+def test_stream_blocks_follow_full_load_order():
+    db = make_db()
+    stream = BarStream.from_db("HKEX", SYMBOL, {Interval.K_1M: "mhi_1m", Interval.K_15M: "mhi_15m"},
+                               chunksize=37, engine=db)
+    assert stream.intervals == [Interval.K_1M, Interval.K_15M]
+
+    streamed = [bar for block in stream for bar in block.iter_bars("backtest")]
+    full = list(BarStore.from_frames(to_frames(db)).iter_bars("backtest"))
+    assert len(streamed) == len(full)
+    assert [(b.datetime, b.interval, b.close_price) for b in streamed] == \
+           [(b.datetime, b.interval, b.close_price) for b in full]
+
+
+def make_engine(ee):
+    logger = logging.getLogger("test_bar_stream")
+    logger.addHandler(logging.NullHandler())
+    engine = BacktestEngine(event_engine=ee, logger=logger, initial_cash=1_000_000)
+    engine.set_contracts({SYMBOL: {"size": 10, "margin_rate": 0.1}})
+    return engine
+
+
+def test_run_stream_matches_run():
+    db = make_db()
+    targets = make_targets(700)  # 1m 与 15m bar 都会推进下标
+
+    ee = BacktestEventEngine()
+    TargetStrategy(ee, targets)
+    full = make_engine(ee)
+    full.load_data(to_frames(db))
+    full.run()
+
+    ee = BacktestEventEngine()
+    TargetStrategy(ee, targets)
+    streamed = make_engine(ee)
+    streamed.run_stream(BarStream.from_db("HKEX", SYMBOL, {Interval.K_1M: "mhi_1m", Interval.K_15M: "mhi_15m"},
+                                          chunksize=50, engine=db))
+
+    pd.testing.assert_frame_equal(streamed.get_account_daily_df(), full.get_account_daily_df())
+    assert len(streamed.oms.trade_log) == len(full.oms.trade_log)
@@ -0,0 +1,70 @@
+import logging
+import numpy as np
+import pandas as pd
+from coreutils.constant import Interval
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from benchmarks.synthetic import TargetStrategy
+from test.test_profile.conftest import CONTRACTS, make_bars, make_targets
+
+# 1m 上调仓，下单后下一根 1m bar 才成交，检查点时可能有未完成订单
+FRAMES = [make_bars(600, Interval.K_1M, seed=1), make_bars(40, Interval.K_15M, seed=2)]
+
+
+def make_engine(frames=None):
+    logger = logging.getLogger("test_checkpoint")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine()
+    strategy = TargetStrategy(ee, make_targets(700), interval=Interval.K_1M)
+    engine = BacktestEngine(event_engine=ee, logger=logger, initial_cash=1_000_000)
+    engine.add_strategy(strategy)
+    if frames is not None:
+        engine.load_data(frames)
+    engine.set_contracts(CONTRACTS)
+    return engine
+
+
+def test_resume_with_extra_bars_matches_full_run(tmp_path):
+    full = make_engine(FRAMES)
+    full.run()
+
+    # 先回测前半段，检查点写在最后一个窗口 flush 之前
+    path = str(tmp_path / "bt.ckpt")
+    head = [df[df["datetime"] < "2024-01-02 13:00"] for df in FRAMES]
+    first = make_engine(head)
+    first.run(checkpoint_path=path)
+
+    # 新进程：新的策略实例 + 追加后的全量数据（与已回放部分重叠）
+    resumed = make_engine()
+    resumed.run(resume_from=path, extra_bars=FRAMES)
+
+    pd.testing.assert_frame_equal(resumed.get_account_daily_df(), full.get_account_daily_df())
+    assert len(resumed.oms.trade_log) == len(full.oms.trade_log)
+    assert resumed.strategy.count == full.strategy.count
+    assert resumed.statistics["sharpe"] == full.statistics["sharpe"]
+
+
+def test_resume_from_periodic_checkpoint(tmp_path):
+    full = make_engine(FRAMES)
+    full.run()
+
+    # 记录第一次定期检查点，模拟回测中途被中断
+    saved = []
+    interrupted = make_engine(FRAMES)
+    interrupted.save_checkpoint = lambda path: saved.append(interrupted.checkpoint())
+    interrupted.run(checkpoint_path=str(tmp_path / "bt.ckpt"), checkpoint_every=250)
+    assert len(saved) == 3
+
+    resumed = make_engine(FRAMES)
+    resumed.run(resume_from=saved[0])
+    pd.testing.assert_frame_equal(resumed.get_account_daily_df(), full.get_account_daily_df())
+    assert [t.price for t in resumed.oms.trade_log] == [t.price for t in full.oms.trade_log]
+
+
+def test_after_skips_replayed_bars():
+    engine = make_engine(FRAMES)
+    store = engine.history
+    key = store.replay_key(100)
+    rest = store.after(*key)
+    assert len(rest) == len(store) - 101
+    np.testing.assert_array_equal(rest.close[rest.order], store.close[store.order][101:])
@@ -0,0 +1,91 @@
+import threading
+from engine.oms_engine import OmsBase
+from backtest.backtest_oms_engine import BacktestOms
+from backtest.bar_store import BarStore
+from backtest.context import BacktestContext
+from backtest.scheduler import LatencyModel
+from benchmarks.synthetic import FlipStrategy
+from test.test_profile.conftest import CONTRACTS, make_bars
+
+
+def make_store(n=300, seed=5):
+    return BarStore.from_frames([make_bars(n, seed=seed)])
+
+
+def make_context(store, **kwargs):
+    ctx = BacktestContext(initial_cash=100_000, **kwargs)
+    ctx.engine.load_store(store)
+    ctx.engine.set_contracts(CONTRACTS)
+    return ctx
+
+
+def result(engine):
+    return ([(t.datetime, t.direction, t.price) for t in engine.oms.trade_log],
+            engine.get_account_daily_df()["equity"].tolist())
+
+
+def test_default_engines_are_not_shared():
+    assert OmsBase().event_engine is not OmsBase().event_engine
+    assert BacktestOms().event_engine is not BacktestOms().event_engine
+    a, b = BacktestContext(), BacktestContext()
+    assert a.logger is not b.logger and a.logger.name == b.logger.name
+    assert a.event_engine is not b.event_engine and a.oms is not b.oms
+
+
+def test_reset_reuses_context():
+    store = make_store()
+    fresh = {}
+    for every in (3, 5):
+        ctx = make_context(store)
+        ctx.add_strategy(FlipStrategy, every=every)
+        fresh[every] = result(ctx.run())
+
+    ctx = make_context(store)
+    handlers = None
+    for every in (3, 5, 3):
+        ctx.reset()
+        ctx.add_strategy(FlipStrategy, every=every)
+        assert result(ctx.run()) == fresh[every]
+        # 处理函数不会随复用次数累积
+        count = sum(len(h) for h in ctx.event_engine._handlers.values())
+        assert handlers is None or count == handlers
+        handlers = count
+    assert len(fresh[3][0]) > 20
+
+
+def test_reset_restarts_latency_and_cash():
+    store = make_store()
+    ctx = make_context(store)
+    ctx.engine.set_latency(LatencyModel(order=("exponential", 600.0), seed=1))
+    ctx.add_strategy(FlipStrategy)
+    first = result(ctx.run())
+    ctx.reset()
+    ctx.add_strategy(FlipStrategy)
+    assert result(ctx.run()) == first
+
+    ctx.reset(initial_cash=200_000)
+    ctx.add_strategy(FlipStrategy)
+    ctx.run()
+    assert ctx.engine.get_account_daily_df()["cash"].iloc[0] > 150_000
+    assert [t[:2] for t in result(ctx.engine)[0]] == [t[:2] for t in first[0]]
+
+
+def test_contexts_run_concurrently_in_threads():
+    store = make_store()
+    ctx = make_context(store)
+    ctx.add_strategy(FlipStrategy)
+    expected = result(ctx.run())
+
+    results = [None] * 4
+
+    def work(n):
+        c = make_context(store)
+        c.add_strategy(FlipStrategy)
+        results[n] = result(c.run())
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(r == expected for r in results)
@@ -0,0 +1,81 @@
+import time
+from engine.event_engine import EventEngine, Event
+from engine.event_stats import bucket_index, bucket_bounds, QUEUE_WAIT, SUB_BUCKETS
+from backtest.backtest_event_engine import BacktestEventEngine
+from conn.engine_mes_adapter import EngineMesAdapter
+
+
+def test_buckets_cover_values_with_bounded_error():
+    previous = -1
+    for ns in list(range(200)) + [10 ** k + d for k in range(3, 13) for d in (-1, 0, 1)]:
+        index = bucket_index(ns)
+        low, high = bucket_bounds(index)
+        assert low <= ns < high
+        assert (high - low) <= max(1, low / SUB_BUCKETS)
+        assert index >= previous
+        previous = index
+
+
+class Handlers:
+    def __init__(self, ee):
+        self.ee = ee
+        self.n = 0
+
+    def on_a(self, event):
+        self.n += 1
+        if event.data < 3:
+            self.ee.put(Event("b", event.data))
+
+    def on_b(self, event):
+        time.sleep(0.001)
+
+
+def test_backtest_engine_stats_per_handler():
+    ee = BacktestEventEngine()
+    handlers = Handlers(ee)
+    ee.register("a", handlers.on_a)
+    ee.register("b", handlers.on_b)
+    ee.put(Event("a", 0))
+    assert ee.stats is None
+
+    stats = ee.enable_stats()
+    for n in range(5):
+        ee.put(Event("a", n))
+    frame = stats.to_frame().set_index("handler")
+    assert frame.loc["Handlers.on_a", "count"] == 5
+    assert frame.loc["Handlers.on_b", "count"] == 3
+    assert frame.loc["Handlers.on_b", "p50_us"] >= 1000
+    assert frame.loc["Handlers.on_b", "max_us"] >= frame.loc["Handlers.on_b", "p99_us"]
+
+    ee.enable_stats(False)
+    ee.put(Event("a", 0))
+    assert stats.to_frame()["count"].sum() == 8 and handlers.n == 7
+
+
+def test_live_engine_records_queue_wait():
+    ee = EventEngine()
+    seen = []
+    ee.register("x", seen.append)
+    stats = ee.enable_stats()
+    ee.put(Event("x", 1))
+    time.sleep(0.002)
+    # 不启动线程，直接取出处理
+    ee._process(ee._queue.get_nowait())
+    rows = {row["handler"]: row for row in stats.snapshot()}
+    assert rows[QUEUE_WAIT]["count"] == 1 and rows[QUEUE_WAIT]["max_us"] >= 2000
+    assert rows["list.append"]["count"] == 1 and len(seen) == 1
+
+
+def test_stats_query_command():
+    ee = EventEngine()
+    adapter = EngineMesAdapter("unit", ee, oms=None)
+    adapter._handle_stats_query({"enable": True})
+    _, payload, _ = adapter._send_q.get_nowait()
+    assert payload["type"] == "stats" and payload["data"] == {"enabled": True, "rows": []}
+
+    ee.register("x", lambda event: None)
+    ee._process(Event("x"))
+    adapter._handle_stats_query({"reset": True})
+    _, payload, _ = adapter._send_q.get_nowait()
+    assert [row["count"] for row in payload["data"]["rows"]] == [1]
+    assert ee.stats.snapshot() == []
@@ -0,0 +1,160 @@
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from coreutils.constant import Direction, OrderType, Exchange, Interval
+from coreutils.object import BarData, OrderRequest, CancelRequest
+from backtest.backtest_gateway import BacktestGateway
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from backtest.bar_store import BarStore
+from backtest.intrabar import IntrabarPath, PathModel, bar_path
+
+SYMBOL = "MHI"
+
+
+class BracketEngine:
+    """记录成交；一腿成交后撤掉另一腿（OCO）"""
+
+    def __init__(self):
+        self.trades = []
+        self.gateway = None
+        self.bracket = []
+
+    def on_order(self, order):
+        pass
+
+    def on_trade(self, trade):
+        self.trades.append((trade.reference, trade.price))
+        for oid in self.bracket:
+            if oid != trade.orderid:
+                self.gateway.cancel_order(CancelRequest(orderid=oid, symbol=SYMBOL, exchange=Exchange.HKFE))
+
+    def on_position(self, position):
+        pass
+
+
+def make_gateway(path=None):
+    engine = BracketEngine()
+    gateway = BacktestGateway(gateway_name="backtest", backtest_engine=engine)
+    gateway.intrabar_path = path
+    engine.gateway = gateway
+    return gateway, engine
+
+
+def send(gateway, direction, order_type, price=0.0, trigger_price=0.0, reference=""):
+    return gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=direction,
+                                           type=order_type, volume=1, price=price,
+                                           trigger_price=trigger_price, reference=reference))
+
+
+def bar(open_, high, low, close, minute=0, interval=Interval.K_15M):
+    return BarData(symbol=SYMBOL, exchange=Exchange.HKFE, datetime=datetime(2024, 1, 2, 9, 15 + minute),
+                   interval=interval, open_price=open_, high_price=high, low_price=low, close_price=close,
+                   gateway_name="backtest")
+
+
+def run_bracket(path, coarse):
+    """多头持仓的止盈（限价卖 105，先下）和止损（止损卖 95）同在一根 bar 内"""
+    gateway, engine = make_gateway(path)
+    engine.bracket = [send(gateway, Direction.SHORT, OrderType.LIMIT, price=105, reference="tp"),
+                      send(gateway, Direction.SHORT, OrderType.STP_MKT, trigger_price=95, reference="sl")]
+    gateway.on_bar(coarse)
+    assert not gateway.get_orders()
+    return engine.trades
+
+
+def test_bracket_resolved_by_path_model():
+    coarse = bar(101, 106, 94, 100)
+    assert run_bracket(None, coarse) == [("tp", 105)]  # 默认按下单顺序
+    assert run_bracket(IntrabarPath(PathModel.OHLC), coarse) == [("tp", 105)]
+    assert run_bracket(IntrabarPath(PathModel.OLHC), coarse) == [("sl", 95)]
+    # open 离 high 更近
+    assert run_bracket(IntrabarPath(PathModel.NEAREST), coarse) == [("tp", 105)]
+    assert run_bracket(IntrabarPath(PathModel.NEAREST), bar(99, 106, 94, 100)) == [("sl", 95)]
+
+
+def make_fine_and_coarse():
+    times = pd.date_range("2024-01-02 09:15", periods=31, freq="1min")
+    # 前 15 分钟先跌到 94 再涨到 106；open 离 high 更近，NEAREST 会判断成止盈
+    path = np.r_[np.linspace(101, 94, 5), np.linspace(94, 106, 10), np.full(16, 100.0)]
+    close = np.r_[path[1:], path[-1]]
+    fine = BarStore.from_frames([pd.DataFrame({
+        "symbol": SYMBOL, "datetime": times, "open": path, "high": np.maximum(path, close) + 0.5,
+        "low": np.minimum(path, close) - 0.5, "close": close, "ktype": [Interval.K_1M] * 31})])
+    coarse_times = pd.date_range("2024-01-02 09:15", periods=3, freq="15min")
+    coarse = BarStore.from_frames([pd.DataFrame({
+        "symbol": SYMBOL, "datetime": coarse_times, "open": [101.0, 100.0, 100.0], "high": [106.5, 100.5, 100.5],
+        "low": [93.5, 99.5, 99.5], "close": [106.0, 100.0, 100.0], "ktype": [Interval.K_15M] * 3})])
+
+    return fine, coarse
+
+
+def test_fine_bars_decide_order_inside_coarse_bar():
+    fine, coarse = make_fine_and_coarse()
+    fine_path = IntrabarPath(PathModel.FINE, fine)
+    fine_path.prepare(coarse, Interval.K_15M)
+    first = next(coarse.iter_bars("backtest"))
+    # 预先算好的行区间与按周期长度二分查找的结果一致
+    assert fine_path._ranges[SYMBOL][first.datetime.value] == (0, 15)
+    fine_path._ranges = {}
+    assert fine_path._fine_rows(first) == (0, 15)
+
+    assert run_bracket(IntrabarPath(PathModel.NEAREST), first) == [("tp", 105)]
+    assert run_bracket(fine_path, first) == [("sl", 95)]
+
+
+def test_gap_sweep_and_stop_limit_fills():
+    gateway, engine = make_gateway(IntrabarPath(PathModel.OHLC))
+    send(gateway, Direction.SHORT, OrderType.STP_MKT, trigger_price=99, reference="gap")
+    send(gateway, Direction.LONG, OrderType.STP_MKT, trigger_price=103, reference="sweep")
+    # 上行 104 触发，回落到 101 才按限价成交
+    send(gateway, Direction.LONG, OrderType.STP_LMT, price=101, trigger_price=104, reference="stp_lmt")
+    send(gateway, Direction.LONG, OrderType.LIMIT, price=97, reference="never")
+    gateway.on_bar(bar(98, 105, 100.5, 102))
+
+    assert engine.trades == [("gap", 98), ("sweep", 103), ("stp_lmt", 101)]
+    assert [o.reference for o in gateway.get_orders()] == ["never"]
+
+
+def test_orders_sent_mid_bar_wait_for_next_bar():
+    gateway, engine = make_gateway(IntrabarPath(PathModel.OHLC))
+
+    def on_trade(trade):
+        engine.trades.append((trade.reference, trade.price))
+        if trade.reference == "first":
+            send(gateway, Direction.SHORT, OrderType.LIMIT, price=95, reference="late")
+
+    engine.on_trade = on_trade
+    send(gateway, Direction.LONG, OrderType.LIMIT, price=99, reference="first")
+    gateway.on_bar(bar(100, 101, 98, 100))
+    assert engine.trades == [("first", 99)]
+    gateway.on_bar(bar(100, 101, 98, 100, minute=15))
+    assert engine.trades == [("first", 99), ("late", 100)]
+
+
+def test_bar_path_models():
+    assert [p for p, _ in bar_path(10, 12, 7, 9, PathModel.OHLC)] == [10, 12, 7, 9]
+    assert [p for p, _ in bar_path(10, 12, 7, 9, PathModel.OLHC)] == [10, 7, 12, 9]
+    assert [p for p, _ in bar_path(10, 12, 7, 9, PathModel.NEAREST)] == [10, 12, 7, 9]
+    assert [p for p, _ in bar_path(8, 12, 7, 9, PathModel.NEAREST)] == [8, 7, 12, 9]
+
+
+def test_engine_fine_path_uses_fine_bars():
+    fine, coarse = make_fine_and_coarse()
+    logger = logging.getLogger("test_intrabar_path")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine()
+    engine = BacktestEngine(event_engine=ee, logger=logger)
+    engine.load_store(coarse)
+    engine.set_contracts({SYMBOL: {"size": 10}})
+    engine.set_intrabar_path(PathModel.FINE, fine)
+
+    # 多单的止盈和止损在回测开始前挂好，没有 OCO，两腿都会成交
+    for order_type, price, trigger in ((OrderType.LIMIT, 105, 0), (OrderType.STP_MKT, 0, 95)):
+        engine.gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.SHORT,
+                                               type=order_type, volume=1, price=price, trigger_price=trigger))
+    engine.run()
+
+    assert engine.gateway.intrabar_path._ranges[SYMBOL]
+    assert [t.price for t in engine.oms.trade_log] == [95, 105]
@@ -0,0 +1,150 @@
+import logging
+import numpy as np
+import pandas as pd
+from coreutils.constant import Direction, OrderType, OrderStatus, Exchange, Interval
+from coreutils.object import OrderRequest
+from engine.event_engine import Event, EVENT_BAR, EVENT_ORDER, EVENT_TRADE, EVENT_ORDER_REQ
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from backtest.scheduler import LatencyModel, SimScheduler
+from backtest.tick_store import TickStore
+from test.test_profile.conftest import SYMBOL, make_bars
+
+START = pd.Timestamp("2024-01-02 09:15")
+
+
+def minute_bars(n=40):
+    return make_bars(n, Interval.K_1M, sigma=5.0)
+
+
+def make_engine(latency=None, every=None, ticks=None, n=40):
+    """every 根 bar 翻一次仓（市价单），记录策略看到的事件"""
+    logger = logging.getLogger("test_latency")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine()
+    engine = BacktestEngine(event_engine=ee, logger=logger)
+    engine.load_data([minute_bars(n)])
+    engine.set_contracts({SYMBOL: {"size": 10}})
+    if ticks is not None:
+        engine.load_ticks([ticks])
+    if latency is not None:
+        engine.set_latency(latency)
+    seen = []
+
+    def on_bar(event: Event):
+        bar = event.data
+        seen.append(("bar", bar.datetime))
+        # 按 bar 序号决定方向，策略无状态，检查点恢复后行为一致
+        k = (bar.datetime - START) // pd.Timedelta(minutes=1)
+        if every and k % every == 0:
+            direction = Direction.LONG if (k // every) % 2 == 0 else Direction.SHORT
+            ee.put(Event(EVENT_ORDER_REQ, OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=direction,
+                                                       type=OrderType.MARKET, volume=1, price=0)))
+
+    ee.register(EVENT_BAR, on_bar)
+    ee.register(EVENT_ORDER, lambda e: seen.append(("order", e.data.status)))
+    ee.register(EVENT_TRADE, lambda e: seen.append(("trade", e.data.datetime)))
+    return engine, seen
+
+
+def trades(engine):
+    return [(t.datetime, t.direction, t.price) for t in engine.oms.trade_log]
+
+
+def test_latency_model_is_seeded():
+    spec = ("lognormal", 0.02, 0.5)
+    a = LatencyModel(order=spec, report=("uniform", 0.001, 0.002), seed=7)
+    b = LatencyModel(order=spec, report=("uniform", 0.001, 0.002), seed=7)
+    # 不同种类的抽样顺序不影响各自的序列
+    first = [a.sample("order") for _ in range(5000)]
+    [b.sample("report") for _ in range(100)]
+    assert first == [b.sample("order") for _ in range(5000)]
+    assert all(1_000_000 <= a.sample("report") <= 2_000_000 for _ in range(100))
+    assert LatencyModel(order=0.25).sample("cancel") == 250_000_000
+
+
+def test_scheduler_channels_are_fifo():
+    out = []
+    scheduler = SimScheduler([out.append])
+    scheduler.submit(0, 50, 0, "slow")
+    scheduler.submit(0, 10, 0, "fast")  # 同一通道不能超过前一条
+    scheduler.submit(1, 10, 0, "other")
+    scheduler.submit(1, 0, 0, "queued")  # 通道里还有消息，不能同步处理
+    assert out == []
+    scheduler.run_until(10)
+    assert out == ["other", "queued"]
+    scheduler.run_until(100)
+    assert out == ["other", "queued", "slow", "fast"]
+    scheduler.submit(0, 0, 0, "now")
+    assert out[-1] == "now"
+
+
+def test_zero_latency_matches_synchronous_run():
+    base, base_seen = make_engine(every=3)
+    base.run()
+    zero, zero_seen = make_engine(LatencyModel(), every=3)
+    zero.run()
+    assert trades(zero) == trades(base)
+    assert zero_seen == base_seen
+    assert len(trades(base)) > 5
+
+
+def test_order_latency_delays_matching_by_bars():
+    bars = minute_bars()
+    for latency, lag in ((0.0, 0), (30.0, 1), (90.0, 2)):
+        engine, _ = make_engine(LatencyModel(order=latency), every=10)
+        engine.run()
+        # 第 0 根 bar 收盘发单；同步时同一根 bar 撮合，延迟 30s 在下一根，90s 在下下根，按该 bar 开盘价成交
+        first = engine.oms.trade_log[0]
+        assert first.datetime == bars["datetime"][lag]
+        assert first.price == bars["open"][lag]
+
+
+def test_reports_arrive_after_latency_in_order():
+    engine, seen = make_engine(LatencyModel(report=0.5), every=10)
+    engine.run()
+    # 每张单：SUBMITTING 委托回报、成交回报、ALLTRADED 委托回报，与同步处理时顺序相同
+    assert [kind for kind, _ in seen if kind != "bar"] == ["order", "trade", "order"] * 4
+    statuses = [s for kind, s in seen if kind == "order"]
+    assert statuses[:2] == [OrderStatus.SUBMITTING, OrderStatus.ALLTRADED]
+    # 回报晚于下一根 bar 之前到达：第 0 根 bar 的成交在第 1 根 bar 推送之前
+    assert seen.index(("bar", START + pd.Timedelta(minutes=1))) > seen.index(("order", OrderStatus.ALLTRADED))
+    assert len(engine.oms.trade_log) == 4
+
+
+def test_tick_matching_interleaves_arrivals():
+    n = 400
+    rng = np.random.default_rng(1)
+    ticks = TickStore.from_frame(pd.DataFrame({
+        "code": SYMBOL, "time": pd.date_range(START, periods=n, freq="1s"),
+        "price": 20000 + np.arange(n, dtype=float), "volume": 100.0,
+        "ticker_direction": rng.choice(["BUY", "SELL"], n),
+    }))
+    engine, _ = make_engine(LatencyModel(order=10.5), every=100, ticks=ticks, n=6)
+    engine.run()
+    # 第 0 根 bar 收盘 09:16:00 发单，09:16:10.5 到达，按之后第一笔 09:16:11 成交
+    first = engine.oms.trade_log[0]
+    assert first.datetime == pd.Timestamp("2024-01-02 09:16:11")
+    assert first.price == 20071
+
+
+def test_seeded_latency_is_reproducible_and_resumable():
+    model = dict(order=("exponential", 40.0), report=("uniform", 1.0, 20.0), seed=3)
+    full, _ = make_engine(LatencyModel(**model), every=2)
+    full.run()
+    again, _ = make_engine(LatencyModel(**model), every=2)
+    again.run()
+    assert trades(full) == trades(again)
+    sync, _ = make_engine(every=2)
+    sync.run()
+    assert trades(full) != trades(sync)
+
+    # 检查点保存途中的消息和延迟随机数状态，恢复后结果一致
+    saved = []
+    interrupted, _ = make_engine(LatencyModel(**model), every=2)
+    interrupted.save_checkpoint = lambda path: saved.append(interrupted.checkpoint())
+    interrupted.run(checkpoint_path="unused", checkpoint_every=15)
+    resumed, _ = make_engine(every=2)
+    resumed.run(resume_from=saved[0])
+    assert resumed.latency is not None
+    assert trades(resumed) == trades(full)
@@ -0,0 +1,106 @@
+import logging
+import numpy as np
+import pandas as pd
+from coreutils.constant import Direction, OrderType, Interval, Exchange, LogLevel
+from coreutils.object import OrderRequest, LogData
+from engine.event_engine import Event, EVENT_BAR, EVENT_ORDER_REQ, EVENT_LOG
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from backtest.log_sink import BacktestLogSink
+
+SYMBOL = "MHI"
+
+
+class Loud:
+    """记录 __repr__ 被调用的次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "loud"
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append((record.levelno, record.getMessage()))
+
+
+def make_logger(name, level=logging.INFO):
+    logger = logging.Logger(name, level)
+    handler = ListHandler()
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_level_gate_skips_formatting():
+    logger, handler = make_logger("test_log_sink.gate")
+    sink = BacktestLogSink(logger)
+    arg = Loud()
+    sink.log("t0", LogLevel.DEBUG, "debug %s", (arg,))
+    sink.log("t1", LogLevel.INFO, "info %s", (arg,))
+    assert len(sink) == 1 and arg.calls == 0
+    sink.flush()
+    assert handler.lines == [(logging.INFO, "BackTestTime:t1 info loud")] and arg.calls == 1
+
+    off = BacktestLogSink(logger, mode="off")
+    off.log("t2", LogLevel.ERROR, "error %s", (arg,))
+    assert len(off) == 0 and not off.enabled(LogLevel.ERROR)
+
+
+def test_buffer_flushes_at_capacity_and_ring_keeps_last():
+    logger, handler = make_logger("test_log_sink.modes")
+    buffer = BacktestLogSink(logger, capacity=3)
+    for n in range(7):
+        buffer.log(n, LogLevel.INFO, "n=%d", (n,))
+    assert len(handler.lines) == 6 and len(buffer) == 1
+
+    ring = BacktestLogSink(logger, mode="ring", level=LogLevel.DEBUG, capacity=3)
+    for n in range(7):
+        ring.log(n, LogLevel.DEBUG, "n=%d", (n,))
+    frame = ring.to_frame()
+    assert frame["msg"].tolist() == ["n=4", "n=5", "n=6"] and frame["level"].tolist() == ["DEBUG"] * 3
+    assert len(handler.lines) == 6
+
+
+def run_engine(mode=None):
+    logger, handler = make_logger("test_log_sink.engine")
+    ee = BacktestEventEngine()
+    engine = BacktestEngine(event_engine=ee, logger=logger)
+    if mode is not None:
+        engine.set_log(mode)
+    n = 20
+    close = 20000 + np.arange(n, dtype=float)
+    engine.load_data([pd.DataFrame({
+        "symbol": SYMBOL, "datetime": pd.date_range("2024-01-02 09:15", periods=n, freq="15min"),
+        "open": close, "high": close + 5, "low": close - 5, "close": close, "ktype": [Interval.K_15M] * n})])
+    engine.set_contracts({SYMBOL: {"size": 10}})
+
+    def on_bar(event: Event):
+        bar = event.data
+        ee.put(Event(EVENT_LOG, LogData("bar %s", args=(bar.close_price,))))
+        if bar.close_price == 20005:
+            ee.put(Event(EVENT_ORDER_REQ, OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.LONG,
+                                                       type=OrderType.MARKET, volume=1, price=bar.close_price)))
+
+    ee.register(EVENT_BAR, on_bar)
+    engine.run()
+    return engine, handler.lines
+
+
+def test_engine_logs_flushed_at_end():
+    engine, lines = run_engine()
+    assert len(lines) == 20 and len(engine.log_sink) == 0
+    assert lines[0] == (logging.INFO, "BackTestTime:2024-01-02 09:15:00 bar 20000.0")
+    assert any("收到发送订单请求OrderRequest(" in msg for _, msg in lines)
+    assert len(engine.oms.trade_log) == 1
+
+    engine, lines = run_engine("off")
+    assert lines == [] and len(engine.oms.trade_log) == 1
+    engine, lines = run_engine("ring")
+    assert lines == [] and len(engine.log_sink) == 20
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from coreutils.constant import Interval
+from backtest.context import BacktestContext
+from backtest.scheduler import LatencyModel
+from strategy.example.macd import MACDStrategy
+from benchmarks.synthetic import FlipStrategy
+from test.test_profile.conftest import SYMBOL, CONTRACTS
+from test.test_profile.test_context import make_store
+
+STRATEGIES = {
+    "macd8": (MACDStrategy, dict(symbol=SYMBOL, work_interval=Interval.K_15M, fast=8)),
+    "macd12": (MACDStrategy, dict(symbol=SYMBOL, work_interval=Interval.K_15M, fast=12)),
+    "flip": (FlipStrategy, dict(every=7)),
+}
+
+
+def make_context(store):
+    ctx = BacktestContext(initial_cash=100_000)
+    ctx.engine.load_store(store)
+    ctx.engine.set_contracts(CONTRACTS)
+    return ctx
+
+
+def trades(oms):
+    return [(t.datetime, t.direction, t.price, t.volume) for t in oms.trade_log]
+
+
+def standalone(store):
+    out = {}
+    for name, (cls, kwargs) in STRATEGIES.items():
+        ctx = make_context(store)
+        ctx.add_strategy(cls, **kwargs)
+        engine = ctx.run()
+        out[name] = (trades(engine.oms), engine.get_account_daily_df()["equity"].to_numpy())
+    return out
+
+
+def add_all(ctx, capital=None, names=tuple(STRATEGIES)):
+    for name in names:
+        cls, kwargs = STRATEGIES[name]
+        ctx.add_strategy(cls, name=name, capital=capital, **kwargs)
+
+
+def test_sub_accounts_match_standalone_runs():
+    store = make_store(800)
+    expected = standalone(store)
+    assert all(len(t) > 10 for t, _ in expected.values())
+
+    ctx = make_context(store)
+    handlers = None
+    for _ in range(2):
+        # reset 后复用同一个上下文，结果不变
+        ctx.reset()
+        add_all(ctx)
+        engine = ctx.run()
+        equity = engine.strategy_equity()
+        assert list(equity.columns) == list(STRATEGIES) + ["portfolio"]
+        for name, (trade_list, curve) in expected.items():
+            assert trades(engine.oms.sub_accounts[name]) == trade_list
+            np.testing.assert_array_equal(equity[name].to_numpy(), curve)
+            assert engine.strategy_statistics()[name]["trade_count"] == len(trade_list)
+            assert len(engine.get_trade_log_df(name)) == len(trade_list)
+        # 组合账户记全部成交，盈亏等于各子账户之和
+        assert len(engine.oms.trade_log) == sum(len(t) for t, _ in expected.values())
+        pnl = sum(equity[name] - 100_000 for name in STRATEGIES)
+        np.testing.assert_allclose(equity["portfolio"] - 100_000, pnl, rtol=0, atol=1e-6)
+        # 处理函数不会随复用次数累积
+        count = sum(len(h) for bus in engine.buses.values() for h in bus._handlers.values())
+        assert handlers is None or count == handlers
+        handlers = count
+
+
+def test_reports_routed_with_latency_and_capital():
+    store = make_store(600)
+    ctx = make_context(store)
+    ctx.engine.set_latency(LatencyModel(order=("exponential", 600.0), report=300.0, seed=3))
+    add_all(ctx, capital=50_000)
+    engine = ctx.run()
+    for name, sub in engine.oms.sub_accounts.items():
+        orders = {t.orderid for t in sub.trade_log}
+        assert orders and all(engine._order_owner[oid] == name for oid in orders)
+        assert engine.get_account_daily_df(name)["equity"].iloc[0] <= 50_000
+    assert len(engine.oms.trade_log) == sum(len(sub.trade_log) for sub in engine.oms.sub_accounts.values())
+
+
+def test_checkpoint_restores_sub_accounts(tmp_path):
+    # 检查点保存各策略的 get_state（StrategyBase 子类）、子账户和订单归属
+    names = ("macd8", "macd12")
+    store = make_store(600)
+    full = make_context(store)
+    add_all(full, names=names)
+    full.run()
+
+    saved = []
+    interrupted = make_context(store)
+    add_all(interrupted, names=names)
+    interrupted.engine.save_checkpoint = lambda path: saved.append(interrupted.engine.checkpoint())
+    interrupted.run(checkpoint_path=str(tmp_path / "bt.ckpt"), checkpoint_every=250)
+
+    resumed = make_context(store)
+    add_all(resumed, names=names)
+    resumed.run(resume_from=saved[0])
+    pd.testing.assert_frame_equal(resumed.engine.strategy_equity(), full.engine.strategy_equity())
+    for name in names:
+        assert trades(resumed.engine.oms.sub_accounts[name]) == trades(full.engine.oms.sub_accounts[name])
@@ -0,0 +1,44 @@
+import pandas as pd
+from backtest.optimize import run_grid, expand_grid
+from benchmarks.synthetic import FlipStrategy
+from test.test_profile.conftest import CONTRACTS, make_bars
+
+def test_expand_grid():
+    assert expand_grid({"a": [1, 2], "b": [3]}) == [{"a": 1, "b": 3}, {"a": 2, "b": 3}]
+
+
+def test_run_grid_serial_and_process_pool_agree():
+    data = [make_bars()]
+    grid = {"every": [2, 3, 4]}
+    serial = run_grid(FlipStrategy, grid, data, CONTRACTS, workers=1, progress=False, sort_by="every")
+    pooled = run_grid(FlipStrategy, grid, data, CONTRACTS, workers=2, progress=False, sort_by="every")
+
+    assert (serial["status"] == "ok").all()
+    pd.testing.assert_frame_equal(serial.drop(columns="elapsed"), pooled.drop(columns="elapsed"))
+
+    top = run_grid(FlipStrategy, grid, data, CONTRACTS, workers=1, progress=False, sort_by="sharpe", top_k=2)
+    assert len(top) == 2
+    assert top["sharpe"].iloc[0] >= top["sharpe"].iloc[1]
+
+
+def test_walk_forward_stitches_out_of_sample_curves():
+    from backtest.walk_forward import walk_forward, make_windows
+
+    windows = make_windows("2024-01-01", "2024-01-11", train="4D", test="2D")
+    assert windows[0] == (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-05"),
+                          pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-07"))
+    assert len(windows) == 3
+    anchored = make_windows("2024-01-01", "2024-01-11", train="4D", test="2D", anchored=True)
+    assert all(w[0] == pd.Timestamp("2024-01-01") for w in anchored)
+
+    data = [make_bars(n=600)]
+    res = walk_forward(FlipStrategy, {"every": [2, 3]}, data, CONTRACTS, train="2D", test="1D",
+                       workers=1, progress=False)
+    assert len(res.windows) == len(res.in_sample) // 2
+    assert res.windows["params"].notna().all()
+    account = res.account_daily
+    assert account.index.is_monotonic_increasing
+    # 拼接后每段首尾相接：段与段之间的权益跳变只来自各段自己的盈亏
+    assert list(account.columns) == ["cash", "margin", "realized_pnl", "unrealized_pnl", "equity", "available"]
+    test_starts = res.windows["test_start"]
+    assert account.index[0] >= test_starts.iloc[0]
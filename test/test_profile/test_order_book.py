@@ -0,0 +1,129 @@
+import numpy as np
+from datetime import datetime, timedelta
+from coreutils.constant import Direction, OrderType, OrderStatus, Exchange, Interval
+from coreutils.object import BarData, OrderRequest, CancelRequest, ModifyRequest
+from backtest.backtest_gateway import BacktestGateway
+
+SYMBOL = "MHI"
+
+
+class LinearGateway(BacktestGateway):
+    """原先逐个遍历全部挂单的撮合，作为对照（成交回调中撤掉自身时不再 KeyError）"""
+
+    def on_bar(self, bar: BarData):
+        symbol = bar.symbol
+        self.current_date = bar.datetime
+        for oid, order in list(self.inactive_orders.get(symbol, {}).items()):
+            if self._stop_trigger(order, bar):
+                order.status = OrderStatus.PENDING
+                order.datetime = self.current_date
+                order.triggered_bar = bar.datetime
+                self.active_orders[symbol][oid] = order
+                del self.inactive_orders[symbol][oid]
+                self.on_order(order)
+
+        for oid, order in list(self.active_orders.get(symbol, {}).items()):
+            if order.status in [OrderStatus.ALLTRADED, OrderStatus.ALLCANCELLED]:
+                continue
+            if order.type in [OrderType.MARKET, OrderType.STP_MKT]:
+                if order.direction == Direction.LONG:
+                    close_price = max(order.trigger_price, bar.open_price)
+                else:
+                    close_price = min(order.trigger_price, bar.open_price)
+                self._fill_order(order, close_price)
+                self.active_orders[symbol].pop(oid, None)
+            elif order.type in [OrderType.LIMIT, OrderType.STP_LMT]:
+                if self._can_fill(order, bar):
+                    if order.type == OrderType.STP_LMT and getattr(order, "triggered_bar", None) == bar.datetime:
+                        self._fill_order(order, order.price)
+                    else:
+                        self._fill_order(order, self._get_fill_price(order, bar))
+                    self.active_orders[symbol].pop(oid, None)
+
+
+class ReactiveEngine:
+    """记录回调；成交时按固定随机序列撤单、改单或追加新单，覆盖撮合过程中订单簿被修改的情况"""
+
+    def __init__(self, seed):
+        self.rng = np.random.default_rng(seed)
+        self.events = []
+        self.gateway = None
+        self.count = 0
+
+    def send(self, price):
+        self.count += 1
+        order_type = [OrderType.LIMIT, OrderType.MARKET, OrderType.STP_LMT, OrderType.STP_MKT][
+            self.rng.choice(4, p=[.5, .1, .2, .2])]
+        direction = Direction.LONG if self.rng.random() < 0.5 else Direction.SHORT
+        offset = float(np.round(self.rng.normal(0, 30)))
+        self.gateway.send_order(OrderRequest(
+            symbol=SYMBOL, exchange=Exchange.HKFE, direction=direction, type=order_type, volume=1,
+            price=price + offset, trigger_price=price + offset + (5 if direction == Direction.LONG else -5),
+            reference=f"o{self.count}"))
+
+    def on_order(self, order):
+        # 改单失败的回报里带随机 orderid，只比较状态
+        reference = "rejected" if order.status == OrderStatus.REJECTED else order.reference
+        self.events.append(("order", reference, order.status, order.price))
+
+    def on_trade(self, trade):
+        self.events.append(("trade", trade.reference, trade.price))
+        action = self.rng.random()
+        orders = self.gateway.get_orders()
+        if orders and action < 0.3:
+            order = orders[self.rng.integers(len(orders))]
+            self.gateway.cancel_order(CancelRequest(orderid=order.orderid, symbol=SYMBOL, exchange=Exchange.HKFE))
+        elif orders and action < 0.6:
+            order = orders[self.rng.integers(len(orders))]
+            price = order.price + float(np.round(self.rng.normal(0, 20)))
+            self.gateway.modify_order(ModifyRequest(orderid=order.orderid, symbol=SYMBOL, qty=order.volume,
+                                                    price=price, trigger_price=price, exchange=Exchange.HKFE))
+        elif action < 0.8:
+            self.send(trade.price)
+
+    def on_position(self, position):
+        pass
+
+
+def run(gateway_cls, n_bars=400, seed=3):
+    engine = ReactiveEngine(seed)
+    gateway = gateway_cls(gateway_name="backtest", backtest_engine=engine)
+    engine.gateway = gateway
+    rng = np.random.default_rng(seed + 1)
+    close = 20000 + np.cumsum(rng.normal(0, 10, n_bars))
+    start = datetime(2024, 1, 2, 9, 15)
+    for i, price in enumerate(close):
+        for _ in range(rng.integers(0, 4)):
+            engine.send(price)
+        open_ = price + rng.normal(0, 5)
+        gateway.on_bar(BarData(symbol=SYMBOL, exchange=Exchange.HKFE, datetime=start + timedelta(minutes=i),
+                               interval=Interval.K_1M, open_price=open_, close_price=price,
+                               high_price=max(open_, price) + abs(rng.normal(0, 8)),
+                               low_price=min(open_, price) - abs(rng.normal(0, 8)), gateway_name="backtest"))
+    return engine.events, gateway
+
+
+def test_indexed_matching_matches_linear_scan():
+    for seed in range(5):
+        expected, linear = run(LinearGateway, seed=seed)
+        events, indexed = run(BacktestGateway, seed=seed)
+        assert events == expected
+        assert sum(e[0] == "trade" for e in events) > 50
+        assert [o.reference for o in indexed.get_orders()] == [o.reference for o in linear.get_orders()]
+
+
+def test_book_only_touches_reachable_orders():
+    engine = ReactiveEngine(0)
+    gateway = BacktestGateway(gateway_name="backtest", backtest_engine=engine)
+    for k in range(100):
+        gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.LONG,
+                                        type=OrderType.LIMIT, volume=1, price=19000 - k, reference=f"b{k}"))
+        gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=Direction.LONG,
+                                        type=OrderType.STP_MKT, volume=1, trigger_price=21000 + k,
+                                        reference=f"s{k}"))
+    book = gateway._books[SYMBOL]
+    references = {o.orderid: o.reference for o in gateway.get_orders()}
+    assert [references[oid] for _, oid in book.fill_candidates(high=19010, low=18990)] == \
+           [f"b{k}" for k in range(11)]
+    assert [references[oid] for _, oid in book.stop_candidates(high=21004, low=20990)] == \
+           [f"s{k}" for k in range(5)]
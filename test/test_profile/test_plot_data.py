@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from coreutils.constant import Direction, Interval
+from benchmarks.suite import _engine, _Phases
+from benchmarks.synthetic import make_bar_frames
+
+
+def _reference(engine):
+    """原来逐标的 pd.cut + groupby 的对齐方式"""
+    trade_log = engine.get_trade_log_df()
+    out = {}
+    for symbol in engine.recorder.symbols:
+        detail = engine.recorder.contract_frame(symbol)
+        spec = trade_log[trade_log["symbol"] == symbol].copy()
+        spec["datetime_fit"] = pd.cut(spec["datetime"], bins=detail.index, right=False,
+                                      labels=detail.index[0:-1], ordered=False)
+        detail["buy_log"] = spec[spec["direction"] == Direction.LONG] \
+            .groupby("datetime_fit", observed=False)["volume"].sum()
+        detail["sell_log"] = spec[spec["direction"] == Direction.SHORT] \
+            .groupby("datetime_fit", observed=False)["volume"].sum()
+        out[symbol] = detail
+    return out
+
+
+def test_trade_alignment_matches_pd_cut():
+    frames = make_bar_frames(6_000, 3, Interval.K_15M)
+    # 标的在不同时点出现
+    frames[1] = frames[1].iloc[300:].reset_index(drop=True)
+    frames[2] = frames[2].iloc[1_200:].reset_index(drop=True)
+    engine = _engine(frames, _Phases(), every=3)
+    engine.run()
+    assert len(engine.oms.trade_log) > 1_000
+
+    plot_data, table_data = engine._prepare_plot_data()
+    expected = _reference(engine)
+    assert list(plot_data) == list(expected)
+    for symbol, frame in plot_data.items():
+        pd.testing.assert_frame_equal(frame, expected[symbol].astype({"buy_log": float, "sell_log": float}))
+        assert np.isnan(frame["buy_log"].iloc[-1]) and frame["buy_log"].iloc[:-1].notna().all()
+    total = sum(f["buy_log"].sum() + f["sell_log"].sum() for f in plot_data.values())
+    assert 0.99 * table_data["trade_log"]["volume"].sum() < total <= table_data["trade_log"]["volume"].sum()
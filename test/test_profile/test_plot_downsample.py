@@ -0,0 +1,77 @@
+import base64
+import gzip
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from coreutils.constant import Interval
+from plotting.downsample import lttb, downsample_index, aggregate_bars, truncate_rows
+from benchmarks.suite import _engine, _Phases
+from benchmarks.synthetic import make_bar_frames
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(0, 1, 10_000))
+    y[3_333] += 500
+    y[7_777] -= 500
+    idx = lttb(np.arange(len(y)), y, 200)
+    assert len(idx) == 200 and idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 3_333 in idx and 7_777 in idx
+    assert len(lttb(np.arange(50), y[:50], 200)) == 50
+
+    x = pd.date_range("2024-01-01", periods=len(y), freq="15min")
+    both = downsample_index(x, [y, np.sin(np.arange(len(y)) / 50)], 400)
+    assert len(both) <= 400 and 3_333 in both
+
+
+def test_aggregate_bars_preserves_extremes_and_totals():
+    n = 1_000
+    df = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=n, freq="15min"),
+                       "open": np.arange(n, dtype=float), "high": np.arange(n) + 1.0, "low": np.arange(n) - 1.0,
+                       "close": np.arange(n) + 0.5, "buy_log": np.where(np.arange(n) % 7 == 0, 1.0, np.nan),
+                       "volume": np.arange(n) % 3})
+    df.loc[500, "high"] = 1e6
+    out = aggregate_bars(df, 100, total=("buy_log",), keep_last=("volume",))
+    assert len(out) == 100 and list(out.columns) == list(df.columns)
+    assert out["high"].max() == 1e6 and out["low"].min() == -1
+    assert out["buy_log"].sum() == df["buy_log"].sum()
+    assert out["open"].iloc[1] == 10 and out["close"].iloc[0] == 9.5 and out["volume"].iloc[0] == 9 % 3
+
+
+def test_compact_lazy_plot(tmp_path):
+    frames = make_bar_frames(20_000, 1, Interval.K_15M)
+    engine = _engine(frames, _Phases(), every=5)
+    engine.run()
+    full = tmp_path / "full.html"
+    engine.performance_plot(plot_path=str(full))
+    compact = tmp_path / "compact.html"
+    engine.performance_plot(plot_path=str(compact), max_points=1_000, lazy=True)
+
+    files = sorted(os.listdir(tmp_path / "compact_files"))
+    assert files == [f"tab_{k}.js" for k in range(4)]
+    total = compact.stat().st_size + sum((tmp_path / "compact_files" / f).stat().st_size for f in files)
+    assert total * 5 < full.stat().st_size
+    assert compact.stat().st_size < 20_000
+
+    # 每个分页的数据文件解压后是 echarts option / 表格
+    text = (tmp_path / "compact_files" / "tab_3.js").read_text()
+    option = json.loads(gzip.decompress(base64.b64decode(re.search(r'"(.*)"', text).group(1))))
+    assert all(len(series["data"]) <= 1_000 for series in option["series"])
+    text = (tmp_path / "compact_files" / "tab_2.js").read_text()
+    table = json.loads(gzip.decompress(base64.b64decode(re.search(r'"(.*)"', text).group(1))))
+    # 成交记录表只保留首尾，完整记录在 csv 里
+    assert len(engine.oms.trade_log) > 1_000 and len(table["rows"]) == 1_001
+    assert "compact_trade_log.csv" in table["rows"][500][0]
+    assert len(pd.read_csv(tmp_path / "compact_trade_log.csv")) == len(engine.oms.trade_log)
+    assert not (tmp_path / "full_trade_log.csv").exists()
+
+
+def test_truncate_rows():
+    df = pd.DataFrame({"a": np.arange(10), "b": list("abcdefghij")})
+    assert truncate_rows(df, 10) is df
+    out = truncate_rows(df, 4)
+    assert out["a"].tolist() == [0, 1, "... 6 rows omitted ...", 8, 9]
+    assert out["b"].tolist() == ["a", "b", "", "i", "j"]
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from coreutils.constant import Direction, Exchange
+from coreutils.object import AccountData, PositionData
+from backtest.recorder import BacktestRecorder
+
+
+def make_account(cash):
+    account = AccountData(gateway_name="BACKTEST", accountid="BACKTEST")
+    account.cash = account.equity = account.available = cash
+    return account
+
+
+def contract(volume):
+    return {"volume": volume, "margin": 1.0, "realized_pnl": 0.0, "unrealized_pnl": 0.0, "cost": 1.0,
+            "turnover": 1.0}
+
+
+def test_record_grows_and_handles_symbols_appearing_mid_run():
+    recorder = BacktestRecorder(capacity=2)
+    times = pd.date_range("2024-01-01", periods=5, freq="D")
+    contracts = {}
+    positions = {}
+    for n, t in enumerate(times):
+        if n == 3:
+            contracts["HSI"] = contract(2)
+            positions["HSI"] = PositionData(gateway_name="BACKTEST", symbol="HSI", exchange=Exchange.HKFE,
+                                            direction=Direction.NET, volume=2, price=100)
+        contracts["MHI"] = contract(n)
+        recorder.record(t, make_account(100.0 + n), contracts, positions)
+
+    assert len(recorder) == 5
+    frame = recorder.account_frame()
+    assert list(frame.index) == list(times)
+    assert frame["cash"].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    # HSI 在第 4 个时点才出现
+    assert recorder.contract_frame("MHI")["volume"].tolist() == [0, 1, 2, 3, 4]
+    assert list(recorder.contract_frame("HSI").index) == list(times[3:])
+    assert np.isnan(recorder.position_frame("HSI")["volume"].iloc[:3]).all()
+    assert set(recorder.contract_dict()[times[0]]) == {"MHI"}
+    assert recorder.position_dict()[times[4]]["HSI"].volume == 2
+
+
+def test_same_time_overwrites_last_row():
+    recorder = BacktestRecorder()
+    t = pd.Timestamp("2024-01-01")
+    recorder.record(t, make_account(1.0), {}, {})
+    recorder.record(t, make_account(2.0), {}, {})
+    assert len(recorder) == 1
+    assert recorder.account_dict() == {t: {"cash": 2.0, "margin": 0.0, "realized_pnl": 0.0, "unrealized_pnl": 0.0,
+                                           "equity": 2.0, "available": 2.0}}
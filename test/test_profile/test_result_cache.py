@@ -0,0 +1,99 @@
+import os
+import pandas as pd
+from backtest.bar_store import BarStore
+from backtest.optimize import run_backtest, run_grid
+from backtest.result_cache import ResultCache, cache_key
+from backtest.walk_forward import walk_forward
+from benchmarks.synthetic import FlipStrategy
+from coreutils.config import CacheInfo
+from test.test_profile.conftest import CONTRACTS, make_bars
+
+
+class PatchedFlip(FlipStrategy):
+    def on_bar(self, event):
+        super().on_bar(event)
+
+
+def test_fingerprint_and_key(tmp_path):
+    store = BarStore.from_frames([make_bars()])
+    store.save(str(tmp_path / "store"))
+    assert BarStore.load(str(tmp_path / "store")).fingerprint() == store.fingerprint()
+    assert BarStore.from_frames([make_bars(seed=4)]).fingerprint() != store.fingerprint()
+
+    key = cache_key(store, FlipStrategy, {"every": 3}, CONTRACTS)
+    assert key == cache_key(store, FlipStrategy, {"every": 3}, CONTRACTS, engine_kwargs={})
+    assert key != cache_key(store, FlipStrategy, {"every": 4}, CONTRACTS)
+    assert key != cache_key(store, PatchedFlip, {"every": 3}, CONTRACTS)
+    assert key != cache_key(store, FlipStrategy, {"every": 3}, {"MHI": {"size": 50, "margin_rate": 0.1}})
+    assert key != cache_key(store, FlipStrategy, {"every": 3}, CONTRACTS, engine_kwargs={"initial_cash": 1})
+    assert key != cache_key(store, FlipStrategy, {"every": 3}, CONTRACTS, time_range=("2024-01-03", None))
+
+
+def test_round_trip(tmp_path):
+    store = BarStore.from_frames([make_bars()])
+    engine = run_backtest(store, FlipStrategy, {"every": 2}, CONTRACTS)
+    assert len(engine.oms.trade_log) > 5
+    cache = ResultCache(str(tmp_path))
+    cache.put_engine("k", engine)
+
+    result = cache.get("k")
+    assert result.statistics == engine.statistics
+    pd.testing.assert_frame_equal(result.account_daily, engine.get_account_daily_df(), check_freq=False)
+    pd.testing.assert_frame_equal(result.trade_log, engine.get_trade_log_df())
+    assert cache.get_statistics("k") == engine.statistics
+    assert cache.get("missing") is None
+
+
+def test_sweeps_consult_cache(tmp_path):
+    data = [make_bars()]
+    grid = {"every": [2, 3, 4]}
+    cache = ResultCache(str(tmp_path))
+    kwargs = dict(workers=1, progress=False, sort_by="every", cache=cache)
+    first = run_grid(FlipStrategy, grid, data, CONTRACTS, **kwargs)
+    assert not first["cached"].any() and len(os.listdir(tmp_path)) == 3
+    second = run_grid(FlipStrategy, grid, data, CONTRACTS, **kwargs)
+    assert second["cached"].all()
+    pd.testing.assert_frame_equal(first.drop(columns=["elapsed", "cached"]), second.drop(columns=["elapsed", "cached"]))
+
+    # 只有新的参数组合需要回测
+    third = run_grid(FlipStrategy, {"every": [3, 5]}, data, CONTRACTS, **kwargs)
+    assert third["cached"].tolist() == [True, False]
+
+    wf_kwargs = dict(train="2D", test="1D", workers=1, progress=False, cache=str(tmp_path / "wf"))
+    wf_data = [make_bars(n=600)]
+    fresh = walk_forward(FlipStrategy, {"every": [2, 3]}, wf_data, CONTRACTS, **wf_kwargs)
+    again = walk_forward(FlipStrategy, {"every": [2, 3]}, wf_data, CONTRACTS, **wf_kwargs)
+    assert again.in_sample["cached"].all() and again.windows["oos_cached"].all()
+    pd.testing.assert_frame_equal(fresh.account_daily, again.account_daily, check_freq=False)
+
+
+def test_sweeps_use_default_cache_unless_disabled(tmp_path, monkeypatch):
+    data = [make_bars()]
+    monkeypatch.setattr(CacheInfo, "result_cache_dir", str(tmp_path))
+    kwargs = dict(workers=1, progress=False, sort_by="every")
+    assert not run_grid(FlipStrategy, {"every": [2]}, data, CONTRACTS, **kwargs)["cached"].any()
+    assert run_grid(FlipStrategy, {"every": [2]}, data, CONTRACTS, **kwargs)["cached"].all()
+    assert "cached" not in run_grid(FlipStrategy, {"every": [2]}, data, CONTRACTS, cache=False, **kwargs)
+    assert len(os.listdir(tmp_path)) == 1
+
+    monkeypatch.setattr(CacheInfo, "result_cache_dir", "")
+    assert "cached" not in run_grid(FlipStrategy, {"every": [2]}, data, CONTRACTS, **kwargs)
+
+
+def test_lru_eviction(tmp_path):
+    store = BarStore.from_frames([make_bars()])
+    engine = run_backtest(store, FlipStrategy, {"every": 2}, CONTRACTS)
+    cache = ResultCache(str(tmp_path))
+    cache.put_engine("a", engine)
+    size = cache.nbytes
+    cache.max_bytes = int(size * 3.5)
+    for n, key in enumerate("abc"):
+        cache.put_engine(key, engine)
+        os.utime(os.path.join(str(tmp_path), f"{key}.npz"), (1_000 + n, 1_000 + n))
+    # 读取 a 后，b 是最久未使用的
+    assert cache.get("a") is not None
+    cache.put_engine("d", engine)
+    assert "b" not in cache and all(key in cache for key in "acd")
+    assert cache.nbytes <= cache.max_bytes
+    cache.clear()
+    assert cache.nbytes == 0
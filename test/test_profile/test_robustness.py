@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from backtest.analytics import equity_metrics
+from backtest.robustness import monte_carlo, summarize, trade_pnl
+from benchmarks.synthetic import FlipStrategy
+from test.test_profile.test_context import make_store, make_context
+
+def run_engine():
+    ctx = make_context(make_store(600))
+    ctx.add_strategy(FlipStrategy, every=4)
+    return ctx.run()
+
+
+def test_trade_pnl_matches_oms_cash():
+    engine = run_engine()
+    oms = engine.oms
+    pnl = trade_pnl(oms.trade_log, oms.sizes, oms.long_rates, oms.short_rates)
+    assert len(pnl) == len(oms.trade_log) > 100
+    np.testing.assert_allclose(pnl.sum(), oms.get_account("BACKTEST").cash - engine.initial_cash)
+
+
+def test_distributions():
+    engine = run_engine()
+    result = engine.robustness(n_sims=300, skip_prob=0.2, block=10)
+    assert set(result) == {"shuffle", "skip", "bootstrap"}
+    assert all(len(frame) == 300 for frame in result.values())
+    assert {"sharpe", "max_drawdown", "total_return", "calmar"} <= set(result["shuffle"].columns)
+
+    # 重排不改变总收益，只改变路径
+    shuffle = result["shuffle"]
+    assert np.allclose(shuffle["total_return"], shuffle["total_return"].iloc[0])
+    assert shuffle["max_drawdown"].std() > 0
+    assert result["skip"]["total_return"].std() > 0
+
+    # 不跳过任何成交 = 原始成交序列；块长等于全长的自助法 = 原始资金曲线
+    exact = engine.robustness(n_sims=5, methods=("skip", "bootstrap"), skip_prob=0.0, block=10_000)
+    equity = engine.recorder.account_column("equity")
+    np.testing.assert_allclose(exact["bootstrap"]["sharpe"],
+                               equity_metrics(equity, engine.initial_cash)["sharpe"])
+    assert exact["skip"]["total_return"].nunique() == 1
+
+    table = summarize(result, ("sharpe", "max_drawdown"))
+    assert list(table.columns) == ["mean", "q5", "q50", "q95"] and len(table) == 6
+    assert (table["q5"] <= table["q95"]).all()
+
+
+def test_chunks_and_workers_are_deterministic(monkeypatch):
+    engine = run_engine()
+    args = (engine.oms.trade_log, engine.recorder, engine.initial_cash)
+    serial = monte_carlo(*args, n_sims=200, seed=7)
+    # 分成更多块、用进程池计算，结果不变
+    monkeypatch.setattr("backtest.robustness.CHUNK_ELEMENTS", 5_000)
+    parallel = monte_carlo(*args, n_sims=200, seed=7)
+    pooled = monte_carlo(*args, n_sims=200, seed=7, workers=2)
+    for method in serial:
+        pd.testing.assert_frame_equal(parallel[method], pooled[method])
+        assert len(parallel[method]) == 200
+    assert not serial["shuffle"].equals(monte_carlo(*args, n_sims=200, seed=8)["shuffle"])
@@ -0,0 +1,139 @@
+import logging
+import numpy as np
+import pandas as pd
+from coreutils.constant import Direction, OrderType, OrderStatus, Exchange, Interval
+from coreutils.object import BarData, OrderRequest, CancelRequest
+from engine.event_engine import Event, EVENT_BAR, EVENT_ORDER_REQ
+from backtest.backtest_gateway import BacktestGateway
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from backtest.tick_store import TickStore
+
+SYMBOL = "MHI"
+
+
+class DummyEngine:
+    def __init__(self):
+        self.orders = []
+        self.trades = []
+
+    def on_order(self, order):
+        self.orders.append((order.reference, order.status, order.traded))
+
+    def on_trade(self, trade):
+        self.trades.append((trade.reference, trade.price, trade.volume))
+
+    def on_position(self, position):
+        pass
+
+
+def make_ticks(rows):
+    """rows: [(price, volume, ticker_direction)]，每秒一笔"""
+    return TickStore.from_frame(pd.DataFrame({
+        "code": SYMBOL,
+        "time": pd.date_range("2024-01-02 09:15", periods=len(rows), freq="1s"),
+        "price": [r[0] for r in rows],
+        "volume": [r[1] for r in rows],
+        "ticker_direction": [r[2] for r in rows],
+    }))
+
+
+def send(gateway, direction, order_type, volume, price=0.0, trigger_price=0.0, reference=""):
+    return gateway.send_order(OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE, direction=direction,
+                                           type=order_type, volume=volume, price=price,
+                                           trigger_price=trigger_price, reference=reference))
+
+
+def make_gateway():
+    engine = DummyEngine()
+    return BacktestGateway(gateway_name="backtest", backtest_engine=engine), engine
+
+
+def test_market_order_fills_across_ticks():
+    gateway, engine = make_gateway()
+    send(gateway, Direction.LONG, OrderType.MARKET, 5, reference="m")
+    ticks = make_ticks([(100, 2, "BUY"), (101, 1, "SELL"), (102, 4, "BUY"), (103, 9, "BUY")])
+    gateway.on_ticks(ticks, 0, len(ticks))
+
+    assert engine.trades == [("m", 100, 2), ("m", 101, 1), ("m", 102, 2)]
+    assert [s for _, s, _ in engine.orders[1:]] == [OrderStatus.PARTTRADED, OrderStatus.PARTTRADED,
+                                                     OrderStatus.ALLTRADED]
+    assert not gateway.get_orders()
+
+
+def test_limit_order_waits_for_queue_ahead():
+    gateway, engine = make_gateway()
+    gateway.initial_queue = 5
+    oid = send(gateway, Direction.LONG, OrderType.LIMIT, 4, price=100, reference="b")
+    ticks = make_ticks([
+        (101, 10, "SELL"),  # 高于限价
+        (100, 3, "BUY"),  # 主动买不消耗买方排队
+        (100, 3, "SELL"),  # 排队 5 -> 2
+        (100, 3, "SELL"),  # 排队耗尽，成交 1
+        (100, 2, "NEUTRAL"),  # 成交 2
+        (99, 10, "SELL"),  # 穿价，剩余 1 按限价成交
+    ])
+    gateway.on_ticks(ticks, 0, len(ticks))
+
+    assert engine.trades == [("b", 100, 1), ("b", 100, 2), ("b", 100, 1)]
+    assert oid not in gateway.active_orders[SYMBOL]
+
+
+def test_stop_triggers_then_fills_from_next_tick_and_cancel_is_partial():
+    gateway, engine = make_gateway()
+    sid = send(gateway, Direction.SHORT, OrderType.STP_MKT, 3, trigger_price=95, reference="s")
+    oid = send(gateway, Direction.SHORT, OrderType.LIMIT, 5, price=105, reference="a")
+    ticks = make_ticks([(100, 1, "BUY"), (95, 2, "SELL"), (94, 2, "SELL"), (106, 1, "BUY")])
+    gateway.on_ticks(ticks, 0, len(ticks))
+
+    assert engine.trades == [("s", 94, 2), ("a", 105, 1)]
+    # 与按 bar 触发一致，记录触发时点
+    stop = gateway.active_orders[SYMBOL][sid]
+    assert stop.triggered_bar == pd.Timestamp("2024-01-02 09:15:01")
+    gateway.cancel_order(CancelRequest(orderid=oid, symbol=SYMBOL, exchange=Exchange.HKFE))
+    assert engine.orders[-1] == ("a", OrderStatus.PARTCANCELLED, 1)
+
+
+def test_engine_tick_mode_books_partial_fills():
+    bars = pd.DataFrame({
+        "symbol": SYMBOL,
+        "datetime": pd.date_range("2024-01-02 09:15", periods=6, freq="1min"),
+        "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.0,
+        "ktype": [Interval.K_1M] * 6,
+    })
+    rng = np.random.default_rng(0)
+    n = 300
+    ticks = TickStore.from_frame(pd.DataFrame({
+        "code": SYMBOL,
+        "time": pd.date_range("2024-01-02 09:15", periods=n, freq="1s"),
+        "price": 100 + rng.integers(-2, 3, n).astype(float),
+        "volume": rng.integers(1, 3, n).astype(float),
+        "ticker_direction": rng.choice(["BUY", "SELL", "NEUTRAL"], n),
+    }))
+
+    logger = logging.getLogger("test_tick_matching")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine()
+    engine = BacktestEngine(event_engine=ee, logger=logger)
+    engine.load_data([bars])
+    engine.load_ticks([ticks])
+    engine.set_contracts({SYMBOL: {"size": 10}})
+
+    sent = []
+
+    def on_bar(event: Event):
+        bar: BarData = event.data
+        if not sent:
+            sent.append(bar.datetime)
+            ee.put(Event(EVENT_ORDER_REQ, OrderRequest(symbol=SYMBOL, exchange=Exchange.HKFE,
+                                                       direction=Direction.LONG, type=OrderType.MARKET,
+                                                       volume=20, price=bar.close_price)))
+    ee.register(EVENT_BAR, on_bar)
+    engine.run()
+
+    trades = engine.oms.trade_log
+    assert len(trades) > 1
+    # 第一根 bar 看到后才下单，只用之后的逐笔成交撮合
+    assert min(t.datetime for t in trades) >= pd.Timestamp("2024-01-02 09:16")
+    assert sum(t.volume for t in trades) == 20
+    assert engine.oms.positions[SYMBOL].volume == 20
@@ -0,0 +1,37 @@
+import logging
+import numpy as np
+from coreutils.constant import Interval
+from backtest.backtest_event_engine import BacktestEventEngine
+from backtest.backtest_engine import BacktestEngine
+from benchmarks.synthetic import TargetStrategy
+from test.test_profile.conftest import SYMBOL, CONTRACTS, make_bars, make_targets
+
+def make_engine(df):
+    logger = logging.getLogger("test_vectorized")
+    logger.addHandler(logging.NullHandler())
+    ee = BacktestEventEngine()
+    engine = BacktestEngine(event_engine=ee, logger=logger, initial_cash=1_000_000)
+    engine.load_data([df])
+    engine.set_contracts(CONTRACTS)
+    return ee, engine
+
+
+def test_run_vectorized_matches_event_driven_run():
+    df = make_bars()
+    targets = make_targets(len(df) - 1)
+
+    ee, event_engine_bt = make_engine(df)
+    TargetStrategy(ee, targets)
+    event_engine_bt.run()
+
+    _, vector_bt = make_engine(df)
+    close = vector_bt.history.close[vector_bt.history.source_rows(SYMBOL, Interval.K_15M)]
+    vector_bt.run_vectorized({SYMBOL: targets}, trigger_prices={SYMBOL: close})
+
+    expected = event_engine_bt.get_account_daily_df()
+    result = vector_bt.get_account_daily_df()
+    assert list(result.index) == list(expected.index)
+    for column in ["cash", "margin", "realized_pnl", "unrealized_pnl", "equity"]:
+        np.testing.assert_allclose(result[column], expected[column], rtol=0, atol=1e-6)
+    assert len(vector_bt.oms.trade_log) == len(event_engine_bt.oms.trade_log)
+    assert vector_bt.backtest_res["total_return"] == event_engine_bt.backtest_res["total_return"]